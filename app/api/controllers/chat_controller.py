@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app.schemas.chat import ChatCreate, Chat
-from app.schemas.message import Message
-from app.schemas.group import GroupCreate, Group
+from datetime import datetime
+from typing import List, Optional
+from app.schemas.chat import ChatCreate, Chat, InboxChat, UnreadCount
+from app.schemas.message import Message, MessageSearchResult
+from app.schemas.group import GroupCreate, Group, GroupMembersUpdate, GroupMembersChange
 from app.services.chat_service import ChatService
 from app.core.database import get_db
 from app.core.auth import get_current_user
 from app.models.user import User
+from app.core.pagination import Direction, decode_cursor, decode_inbox_cursor, decode_search_cursor
+from app.core.responses import ListEncoder
+from app.core.settings import settings
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
+# Кодировщики для FAST_RESPONSES: строки из базы сразу в байты без response_model
+message_list = ListEncoder(Message)
+search_result_list = ListEncoder(MessageSearchResult)
+inbox_list = ListEncoder(InboxChat)
+
 @router.post("/", response_model=Chat)
 async def create_chat(
     chat_data: ChatCreate,
@@ -18,7 +28,24 @@ async def create_chat(
     db: AsyncSession = Depends(get_db)
 ):
     chat_service = ChatService(db)
-    return await chat_service.create_chat(chat_data)
+    return await chat_service.create_chat(chat_data, current_user.id)
+
+@router.get("/", response_model=List[InboxChat])
+async def get_inbox(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    before = decode_inbox_cursor(cursor) if cursor is not None else None
+    chats, next_cursor = await chat_service.get_inbox(current_user, limit, before=before)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if settings.FAST_RESPONSES:
+        return inbox_list.response(chats, response)
+    return chats
 
 @router.post("/groups/", response_model=Group)
 async def create_group(
@@ -29,13 +56,139 @@ async def create_group(
     chat_service = ChatService(db)
     return await chat_service.create_group(group_data, current_user.id)
 
+@router.post("/groups/{group_id}/members", response_model=GroupMembersChange)
+async def add_group_members(
+    group_id: int,
+    members: GroupMembersUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    added = await chat_service.add_group_members(group_id, members.user_ids, current_user)
+    return {"group_id": group_id, "user_ids": added}
+
+@router.delete("/groups/{group_id}/members", response_model=GroupMembersChange)
+async def remove_group_members(
+    group_id: int,
+    members: GroupMembersUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    removed = await chat_service.remove_group_members(group_id, members.user_ids, current_user)
+    return {"group_id": group_id, "user_ids": removed}
+
+@router.get("/unread", response_model=List[UnreadCount])
+async def get_unread_counts(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    return await chat_service.get_unread_counts(current_user)
+
 @router.get("/{chat_id}/history", response_model=List[Message])
 async def get_chat_history(
     chat_id: int,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    direction: Optional[Direction] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    keyset = (before_id, after_id, direction, cursor)
+    if all(param is None for param in keyset):
+        # Режим offset оставлен для совместимости со старыми клиентами
+        messages = await chat_service.get_chat_history(chat_id, limit, offset, current_user)
+        if settings.FAST_RESPONSES:
+            return message_list.response(messages, response)
+        return messages
+
+    if sum(param is not None for param in (before_id, after_id, cursor)) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use only one of before_id, after_id and cursor"
+        )
+
+    message_id = message_ts = None
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        try:
+            message_id = int(position["id"])
+            direction = Direction(position["d"])
+            # Курсоры без времени (выданы до партиционирования) тоже принимаем
+            if "ts" in position:
+                message_ts = datetime.fromisoformat(position["ts"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    elif before_id is not None:
+        message_id, direction = before_id, Direction.BACKWARD
+    elif after_id is not None:
+        message_id, direction = after_id, Direction.FORWARD
+
+    messages, next_cursor, prev_cursor = await chat_service.get_chat_history_page(
+        chat_id,
+        limit,
+        current_user,
+        message_id=message_id,
+        direction=direction or Direction.BACKWARD,
+        message_ts=message_ts
+    )
+    # Курсоры следующей и предыдущей страниц отдаем в заголовках, тело остается списком
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    if settings.FAST_RESPONSES:
+        return message_list.response(messages, response)
+    return messages
+
+@router.get("/{chat_id}/search", response_model=List[MessageSearchResult])
+async def search_chat_messages(
+    chat_id: int,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    after = decode_search_cursor(cursor) if cursor is not None else None
+    results, next_cursor = await chat_service.search_chat_messages(
+        chat_id, q, limit, current_user, after=after, since=since, until=until
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if settings.FAST_RESPONSES:
+        return search_result_list.response(results, response)
+    return results
+
+@router.get("/{chat_id}/export")
+async def export_chat_history(
+    chat_id: int,
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     chat_service = ChatService(db)
-    return await chat_service.get_chat_history(chat_id, limit, offset, current_user) 
+    chunks = await chat_service.export_chat_history(
+        chat_id, current_user, compress=gzip, since=since, until=until
+    )
+    filename = f"chat-{chat_id}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
+from app.schemas.message import MessageSearchResult
+from app.services.chat_service import ChatService
+from app.core.database import get_db
+from app.core.auth import get_current_user
+from app.models.user import User
+from app.core.pagination import decode_search_cursor
+from app.core.responses import ListEncoder
+from app.core.settings import settings
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+search_result_list = ListEncoder(MessageSearchResult)
+
+@router.get("", response_model=List[MessageSearchResult])
+async def search_messages(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chat_service = ChatService(db)
+    after = decode_search_cursor(cursor) if cursor is not None else None
+    results, next_cursor = await chat_service.search_messages(
+        q, limit, current_user, after=after, since=since, until=until
+    )
+    # Курсор следующей страницы в заголовке, как в истории чата
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if settings.FAST_RESPONSES:
+        return search_result_list.response(results, response)
+    return results
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.schemas.sync import SyncPage
+from app.services.sync_service import SyncService
+from app.core.database import get_db
+from app.core.auth import get_current_user
+from app.models.user import User
+from app.core.pagination import decode_sync_cursor
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+@router.get("", response_model=SyncPage)
+async def sync(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    sync_service = SyncService(db)
+    position = decode_sync_cursor(since) if since is not None else None
+    return await sync_service.sync(current_user, position, limit)
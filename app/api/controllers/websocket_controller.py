@@ -1,20 +1,73 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from typing import Optional
 from app.services.chat_service import ChatService
-from app.core.database import get_db
+from app.core.auth import authenticate_token
+from app.core.auth_cache import AuthenticatedUser
+from app.core.database import AsyncSessionLocal
 from app.core.websocket_manager import manager
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
-@router.websocket("/{user_id}")
+@router.websocket("")
 async def websocket_endpoint(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None
+):
+    # Токен передается параметром token или заголовком Authorization: Bearer
+    await serve_websocket(websocket, token, last_event_id)
+
+@router.websocket("/{user_id}")
+async def user_websocket_endpoint(
     websocket: WebSocket,
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None
 ):
-    await manager.connect(websocket, user_id)
+    # Старый адрес: id в пути должен совпадать с пользователем из токена
+    await serve_websocket(websocket, token, last_event_id, expected_user_id=user_id)
+
+async def serve_websocket(
+    websocket: WebSocket,
+    token: Optional[str],
+    last_event_id: Optional[str],
+    expected_user_id: Optional[int] = None
+):
+    user = await authenticate_websocket(websocket, token)
+    if user is None or (expected_user_id is not None and user.id != expected_user_id):
+        # Закрытие до accept: клиент получает отказ в рукопожатии
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # last_event_id — id последнего полученного события для досылки пропущенных
+    connection = await manager.connect(websocket, user.id, last_event_id)
     try:
-        chat_service = ChatService(db)
-        await chat_service.handle_websocket_connection(websocket, user_id)
+        if connection.holding:
+            async with AsyncSessionLocal() as db:
+                await ChatService(db).replay_missed_messages(connection, last_event_id)
+        while True:
+            data = await websocket.receive_json()
+            # Сессия живет только на время обработки события: соединение
+            # с базой берется из пула и сразу возвращается, а простаивающий
+            # сокет не держит ни одного
+            async with AsyncSessionLocal() as db:
+                await ChatService(db).handle_websocket_event(connection, data)
     except WebSocketDisconnect:
-        manager.disconnect(user_id) 
\ No newline at end of file
+        pass
+    finally:
+        # Останавливаем задачу-писателя соединения
+        manager.disconnect(user.id, connection.id)
+
+async def authenticate_websocket(websocket: WebSocket, token: Optional[str]) -> Optional[AuthenticatedUser]:
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    if not token:
+        return None
+    try:
+        # Повторные подключения с тем же токеном обслуживает кэш без базы
+        async with AsyncSessionLocal() as db:
+            return await authenticate_token(token, db)
+    except HTTPException:
+        return None
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.controllers import user_controller, chat_controller, websocket_controller
+from app.api.controllers import user_controller, chat_controller, search_controller, sync_controller, websocket_controller
 from app.core.settings import settings
 
 api_router = APIRouter()
@@ -13,6 +13,14 @@ api_router.include_router(
     chat_controller.router,
     prefix=settings.API_V1_STR
 )
+api_router.include_router(
+    search_controller.router,
+    prefix=settings.API_V1_STR
+)
+api_router.include_router(
+    sync_controller.router,
+    prefix=settings.API_V1_STR
+)
 api_router.include_router(
     websocket_controller.router,
     prefix=settings.API_V1_STR
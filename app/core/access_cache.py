@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.core.settings import settings
+
+class AccessCache:
+    """Кэш решений о доступе пользователя к чату с коротким TTL и LRU-вытеснением.
+
+    Запоминает и разрешения, и отказы. При изменении состава чата записи
+    этого чата сбрасываются; изменения на других воркерах видны не позже
+    чем через ttl секунд.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        # (user_id, chat_id) -> (время истечения, решение)
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, bool]]" = OrderedDict()
+        # chat_id -> пользователи с записями в кэше, для сброса по чату
+        self._by_chat: Dict[int, Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, chat_id: int) -> Optional[bool]:
+        key = (user_id, chat_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id: int, chat_id: int, allowed: bool):
+        key = (user_id, chat_id)
+        self._entries[key] = (time.monotonic() + self.ttl, allowed)
+        self._entries.move_to_end(key)
+        self._by_chat.setdefault(chat_id, set()).add(user_id)
+        while len(self._entries) > self.max_size:
+            (old_user_id, old_chat_id), _ = self._entries.popitem(last=False)
+            self._forget(old_user_id, old_chat_id)
+
+    def invalidate_chat(self, chat_id: int):
+        for user_id in self._by_chat.pop(chat_id, ()):
+            self._entries.pop((user_id, chat_id), None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_chat.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _forget(self, user_id: int, chat_id: int):
+        users = self._by_chat.get(chat_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._by_chat[chat_id]
+
+# Создаем глобальный кэш решений о доступе
+access_cache = AccessCache(
+    max_size=settings.CHAT_ACCESS_CACHE_SIZE,
+    ttl=settings.CHAT_ACCESS_CACHE_TTL_SECONDS
+)
@@ -5,6 +5,7 @@ from sqlalchemy import select
 from jose import jwt
 from app.core.database import get_db
 from app.core.settings import settings
+from app.core.auth_cache import AuthenticatedUser, auth_cache
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -12,7 +13,19 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> AuthenticatedUser:
+    return await authenticate_token(token, db)
+
+async def authenticate_token(token: str, db: AsyncSession) -> AuthenticatedUser:
+    """Пользователь по JWT; при неверном токене — HTTPException 401.
+
+    Сессия используется только при промахе кэша.
+    """
+    # Уже проверенный токен: без проверки подписи и запроса в базу
+    user = auth_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -27,9 +40,13 @@ async def get_current_user(
         raise credentials_exception
     
     result = await db.execute(
-        select(User).where(User.username == username)
+        select(User.id, User.username, User.email, User.created_at)
+        .where(User.username == username)
     )
-    user = result.scalar_one_or_none()
-    if user is None:
+    row = result.one_or_none()
+    if row is None:
         raise credentials_exception
-    return user 
\ No newline at end of file
+    user = AuthenticatedUser(*row)
+    # Токены без exp живут в кэше не дольше его ttl
+    auth_cache.set(token, user, expires_at=payload.get("exp", float("inf")))
+    return user
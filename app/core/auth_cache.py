@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+from app.core.settings import settings
+
+class AuthenticatedUser(NamedTuple):
+    """Облегченная запись пользователя для зависимостей API, без ORM-объекта."""
+    id: int
+    username: str
+    email: str
+    created_at: Optional[datetime]
+
+class AuthCache:
+    """LRU-кэш проверенных токенов: токен -> пользователь.
+
+    Запись живет не дольше ttl секунд и не дольше срока действия токена (exp),
+    поэтому истекший токен не принимается и из кэша. При изменении
+    пользователя его записи сбрасываются через invalidate_user.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        # токен -> (время истечения по time.time(), пользователь)
+        self._entries: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        # user_id -> токены в кэше, для сброса при изменении пользователя
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, user: AuthenticatedUser, expires_at: float):
+        expires_at = min(expires_at, time.time() + self.ttl)
+        self._remove(token)
+        self._entries[token] = (expires_at, user)
+        self._by_user.setdefault(user.id, set()).add(token)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        for token in self._by_user.pop(user_id, ()):
+            self._entries.pop(token, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions
+        }
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry[1].id]
+
+# Создаем глобальный кэш токенов
+auth_cache = AuthCache(
+    max_size=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
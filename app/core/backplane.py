@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.core import serialization
+from app.core.settings import settings
+from app.core.database.connection import engine
+
+logger = logging.getLogger(__name__)
+
+# Обработчик события: (chat_id, закодированное в JSON событие)
+Handler = Callable[[int, bytes], Awaitable[None]]
+# Загрузчик события о сообщении по его id: закодированное событие или None
+EventLoader = Callable[[int], Awaitable[Optional[bytes]]]
+# Слушатель пропуска событий: chat_id или None, если могли пропасть события любых чатов
+GapListener = Callable[[Optional[int]], None]
+
+class EventTooLarge(ValueError):
+    """Событие не помещается в шину и не может быть передано ссылкой."""
+
+class Backplane(ABC):
+    """Шина доставки событий чатов между воркерами.
+
+    Воркер публикует событие один раз, а шина передает его всем воркерам
+    (включая отправителя), каждый из которых доставляет событие только
+    своим локальным сокетам.
+    """
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+        self._loader: Optional[EventLoader] = None
+        self._gap_listeners: List[GapListener] = []
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    def set_loader(self, loader: EventLoader):
+        """Загрузчик сообщений из базы для событий, переданных ссылкой."""
+        self._loader = loader
+
+    def add_gap_listener(self, listener: GapListener):
+        """Слушатель событий, которые шина не смогла доставить воркеру."""
+        self._gap_listeners.append(listener)
+
+    def _notify_gap(self, chat_id: Optional[int]):
+        for listener in self._gap_listeners:
+            listener(chat_id)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, chat_id: int, payload: bytes):
+        ...
+
+class InProcessBackplane(Backplane):
+    """Шина внутри одного процесса: событие сразу уходит локальным сокетам."""
+
+    async def publish(self, chat_id: int, payload: bytes):
+        await self._handler(chat_id, payload)
+
+class PostgresBackplane(Backplane):
+    """Шина на Postgres LISTEN/NOTIFY поверх существующего asyncpg-движка.
+
+    Для LISTEN держится одно выделенное соединение из пула на воркер. При
+    обрыве соединения шина переподключается с нарастающей паузой; события,
+    опубликованные за время обрыва, клиенты догружают при возобновлении сессии.
+    """
+
+    # Postgres ограничивает payload NOTIFY 8000 байтами
+    MAX_PAYLOAD_SIZE = 7999
+    # Паузы между попытками переподключения LISTEN, в секундах
+    RECONNECT_MIN_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30.0
+    # Ссылка на сообщение вместо события: "<chat_id>:@<message_id>"
+    REFERENCE_PREFIX = "@"
+
+    def __init__(self, engine: AsyncEngine, channel: str):
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        self._connection: Optional[AsyncConnection] = None
+        self._driver_connection = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._tasks: Set[asyncio.Task] = set()
+        # chat_id -> уведомления, ожидающие доставки. События чата доставляются
+        # по порядку одной задачей: ссылка, загружаемая из базы, не пропускает
+        # вперед себя более поздние события того же чата
+        self._pending: Dict[int, deque] = {}
+
+    async def start(self):
+        self._stopping = False
+        await self._listen()
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        if self._connection is None:
+            return
+        await self._driver_connection.remove_listener(self.channel, self._on_notify)
+        self._driver_connection.remove_termination_listener(self._on_terminate)
+        await self._connection.close()
+        self._connection = None
+        self._driver_connection = None
+
+    async def publish(self, chat_id: int, payload: bytes):
+        try:
+            message = f"{chat_id}:{payload.decode('utf-8')}"
+            if len(message.encode("utf-8")) > self.MAX_PAYLOAD_SIZE:
+                # Слишком большое событие не проходит через NOTIFY: все воркеры,
+                # включая этот, получают ссылку и загружают сообщение из базы
+                message = self._reference(chat_id, payload)
+
+            # NOTIFY доставляется подписчикам после commit транзакции
+            async with self.engine.begin() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": message}
+                )
+        except Exception:
+            # Событие не ушло ни одному воркеру, включая этот
+            self._notify_gap(chat_id)
+            raise
+
+    def _reference(self, chat_id: int, payload: bytes) -> str:
+        message_id = None
+        if payload.startswith(b'{"type":"message"'):
+            message_id = serialization.loads(payload).get("id")
+        if self._loader is None or not isinstance(message_id, int):
+            raise EventTooLarge(
+                f"Event for chat {chat_id} exceeds NOTIFY payload limit"
+            )
+        return f"{chat_id}:{self.REFERENCE_PREFIX}{message_id}"
+
+    async def _listen(self):
+        self._connection = await self.engine.connect()
+        raw_connection = await self._connection.get_raw_connection()
+        self._driver_connection = raw_connection.driver_connection
+        await self._driver_connection.add_listener(self.channel, self._on_notify)
+        self._driver_connection.add_termination_listener(self._on_terminate)
+
+    def _on_terminate(self, connection):
+        if self._stopping or self._reconnect_task is not None:
+            return
+        logger.warning("Backplane LISTEN connection lost, reconnecting")
+        self._notify_gap(None)
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        # Оборванное соединение не возвращаем в пул
+        connection, self._connection, self._driver_connection = self._connection, None, None
+        if connection is not None:
+            try:
+                await connection.invalidate()
+            except Exception:
+                pass
+        delay = self.RECONNECT_MIN_DELAY
+        try:
+            while not self._stopping:
+                try:
+                    await self._listen()
+                    # События, опубликованные за время обрыва, до воркера не дошли
+                    self._notify_gap(None)
+                    logger.info("Backplane LISTEN connection restored")
+                    return
+                except Exception:
+                    logger.warning(
+                        "Backplane reconnect failed, retrying in %.1fs", delay, exc_info=True
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+        finally:
+            self._reconnect_task = None
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        chat_id, _, event = payload.partition(":")
+        chat_id = int(chat_id)
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            # Задача чата уже работает и доставит событие следом
+            pending.append(event)
+            return
+        self._pending[chat_id] = deque([event])
+        task = asyncio.create_task(self._drain(chat_id))
+        # Храним ссылку на задачу, чтобы ее не собрал сборщик мусора
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, chat_id: int):
+        pending = self._pending[chat_id]
+        try:
+            while pending:
+                event = pending.popleft()
+                try:
+                    if event.startswith(self.REFERENCE_PREFIX):
+                        await self._deliver_reference(chat_id, int(event[1:]))
+                    else:
+                        await self._handler(chat_id, event.encode("utf-8"))
+                except Exception:
+                    # Ошибка одного события не должна задерживать остальные события чата
+                    logger.exception("Failed to deliver backplane event for chat %s", chat_id)
+        finally:
+            del self._pending[chat_id]
+
+    async def _deliver_reference(self, chat_id: int, message_id: int):
+        payload = await self._loader(message_id) if self._loader is not None else None
+        if payload is None:
+            logger.warning("Referenced message %s for chat %s not found", message_id, chat_id)
+            return
+        await self._handler(chat_id, payload)
+
+def create_backplane() -> Backplane:
+    if settings.WS_BACKPLANE == "postgres":
+        return PostgresBackplane(engine, settings.WS_BACKPLANE_CHANNEL)
+    return InProcessBackplane()
@@ -1,4 +1,5 @@
 from .connection import get_db, engine, AsyncSessionLocal
+from .unit_of_work import UnitOfWork
 from app.models import Base
 
-__all__ = ['get_db', 'engine', 'AsyncSessionLocal', 'Base'] 
+__all__ = ['get_db', 'engine', 'AsyncSessionLocal', 'Base', 'UnitOfWork'] 
@@ -1,15 +1,63 @@
+from datetime import datetime
 from sqlalchemy import text
 from app.core.database.connection import engine
+from app.core.database.partitions import create_partitions
+from app.core.settings import settings
 from app.models.base import Base
 from app.models.user import User
 from app.models.chat import Chat
 from app.models.message import Message
 from app.models.group import Group
+from app.models.read_cursor import ReadCursor
+from app.models.membership_event import MembershipEvent
 
 async def create_tables():
     """Create all tables in the database."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade_group_members(conn)
+        await backfill_chat_participants(conn)
+        await create_partitions(conn, datetime.utcnow(), settings.MESSAGE_PARTITIONS_AHEAD)
+
+async def upgrade_group_members(conn):
+    """Добавляет ключ и обратный индекс в group_members, созданную без них.
+
+    create_all не меняет существующие таблицы, поэтому дубликаты удаляются
+    и ограничения добавляются здесь; на новой базе шаг ничего не делает.
+    """
+    has_key = await conn.execute(text(
+        "SELECT 1 FROM pg_constraint "
+        "WHERE conrelid = 'group_members'::regclass AND contype = 'p'"
+    ))
+    if has_key.first() is None:
+        await conn.execute(text(
+            "DELETE FROM group_members a USING group_members b "
+            "WHERE a.ctid > b.ctid AND a.group_id = b.group_id AND a.user_id = b.user_id"
+        ))
+        await conn.execute(text(
+            "DELETE FROM group_members WHERE group_id IS NULL OR user_id IS NULL"
+        ))
+        await conn.execute(text(
+            "ALTER TABLE group_members ADD PRIMARY KEY (group_id, user_id)"
+        ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_group_members_user_id ON group_members (user_id)"
+    ))
+
+async def backfill_chat_participants(conn):
+    """Заполняет участников приватных чатов, созданных до chat_participants.
+
+    Доступ к приватному чату проверяется по chat_participants, поэтому
+    авторы сообщений старых чатов без участников становятся участниками.
+    """
+    await conn.execute(text(
+        "INSERT INTO chat_participants (chat_id, user_id) "
+        "SELECT DISTINCT m.chat_id, m.sender_id FROM messages m "
+        "JOIN chats c ON c.id = m.chat_id "
+        "WHERE c.type = 'PRIVATE' AND m.sender_id IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM chat_participants p WHERE p.chat_id = c.id) "
+        "ON CONFLICT DO NOTHING"
+    ))
 
 async def drop_tables():
     """Drop all tables from the database."""
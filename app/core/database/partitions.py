@@ -0,0 +1,77 @@
+import re
+from datetime import datetime
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.models.message import Message
+
+PARTITIONED_TABLE = Message.__tablename__
+_PARTITION_NAME = re.compile(rf"^{PARTITIONED_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y_%m}"
+
+def partition_month(name: str):
+    """Месяц партиции по ее имени или None для чужих таблиц."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table ORDER BY child.relname"
+        ),
+        {"table": PARTITIONED_TABLE}
+    )
+    return list(result.scalars().all())
+
+async def create_partitions(conn: AsyncConnection, start: datetime, months_ahead: int) -> List[str]:
+    """Создает недостающие партиции с месяца start на months_ahead месяцев вперед."""
+    existing = set(await list_partitions(conn))
+    created = []
+    first = month_start(start)
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        # Границы партиций в DDL нельзя передать параметрами
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARTITIONED_TABLE} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+        ))
+        created.append(name)
+    return created
+
+async def detach_partitions(engine: AsyncEngine, before: datetime) -> List[str]:
+    """Отсоединяет партиции, целиком лежащие раньше месяца before.
+
+    DETACH ... CONCURRENTLY не блокирует запись в остальные партиции и не
+    трогает строки: отсоединенные таблицы остаются в базе для архивации или DROP.
+    """
+    cutoff = month_start(before)
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        detached = []
+        for name in await list_partitions(conn):
+            month = partition_month(name)
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+            await conn.execute(text(
+                f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name} CONCURRENTLY"
+            ))
+            detached.append(name)
+    return detached
@@ -0,0 +1,62 @@
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+
+class UnitOfWork:
+    """Одна транзакция на несколько вызовов репозиториев.
+
+    Внутри `async with UnitOfWork(db):` репозитории вместо commit делают flush
+    (первичные ключи и серверные значения приходят через RETURNING), а commit
+    выполняется один раз на выходе, при исключении — rollback. Вложенный блок
+    с той же сессией присоединяется к внешнему.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._callbacks: List[Callable[[], None]] = []
+        self._token = None
+        self._joined = False
+
+    async def __aenter__(self) -> "UnitOfWork":
+        current = _current.get()
+        if current is not None and current.db is self.db:
+            self._joined = True
+            return current
+        self._token = _current.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self._joined:
+            return False
+        _current.reset(self._token)
+        if exc_type is not None:
+            await self.db.rollback()
+            return False
+        await self.db.commit()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return False
+
+def _active(db: AsyncSession) -> Optional[UnitOfWork]:
+    current = _current.get()
+    if current is not None and current.db is db:
+        return current
+    return None
+
+async def commit(db: AsyncSession):
+    """Фиксирует изменения репозитория: flush внутри единицы работы, commit вне ее."""
+    if _active(db) is not None:
+        await db.flush()
+    else:
+        await db.commit()
+
+def after_commit(db: AsyncSession, callback: Callable[[], None]):
+    """Выполняет callback после фиксации транзакции (например, сброс кэшей)."""
+    current = _active(db)
+    if current is not None:
+        current._callbacks.append(callback)
+    else:
+        callback()
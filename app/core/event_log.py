@@ -0,0 +1,139 @@
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.core import serialization
+from app.core.settings import settings
+
+class EventPosition(NamedTuple):
+    epoch: str
+    seq: int
+    message_id: int
+
+class _UserLog:
+    __slots__ = ("events", "since_seq", "disconnected_at")
+
+    def __init__(self, maxlen: int, since_seq: int):
+        # (seq, кадр) в порядке рассылки
+        self.events: deque = deque(maxlen=maxlen)
+        # Журнал полон для всех событий с seq > since_seq
+        self.since_seq = since_seq
+        self.disconnected_at: Optional[float] = None
+
+class EventLog:
+    """Журнал последних событий пользователей для возобновления WebSocket-сессий.
+
+    Каждое событие, дошедшее до воркера, получает id вида
+    "<эпоха воркера>:<номер события>:<последний id сообщения>". Кадры событий
+    общие для всех получателей, в журналы пользователей кладутся ссылки на них.
+    Журнал ведется, пока у пользователя есть соединение, и еще retention
+    секунд после отключения. Если пропуск не помещается в журнал или клиент
+    был подключен к другому воркеру, по последнему id сообщения из id события
+    можно догрузить сообщения из базы.
+    """
+
+    def __init__(self, per_user: int = 1000, max_users: int = 100_000, retention: float = 300):
+        self.per_user = per_user
+        self.max_users = max_users
+        self.retention = retention
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._message_id = 0
+        self._users: "OrderedDict[int, _UserLog]" = OrderedDict()
+
+    @property
+    def has_users(self) -> bool:
+        return bool(self._users)
+
+    def current_event_id(self) -> str:
+        return self._format(self._seq)
+
+    def stamp(self, payload: bytes) -> Tuple[int, bytes]:
+        """Присваивает событию следующий номер и вписывает его id в JSON-кадр."""
+        self._seq += 1
+        if payload.startswith(b'{"type":"message"'):
+            # Сообщение: запоминаем его id для догрузки из базы
+            message_id = serialization.loads(payload).get("id")
+            if isinstance(message_id, int) and message_id > self._message_id:
+                self._message_id = message_id
+        event_id = serialization.dumps(self._format(self._seq))
+        rest = payload[1:]
+        separator = b"," if rest != b"}" else b""
+        return self._seq, b'{"event_id":' + event_id + separator + rest
+
+    def record(self, user_id: int, seq: int, frame):
+        log = self._users.get(user_id)
+        if log is not None:
+            log.events.append((seq, frame))
+
+    def track(self, user_id: int):
+        """Начинает (или продолжает) вести журнал подключенного пользователя."""
+        log = self._users.get(user_id)
+        if log is None or self._expired(log):
+            log = _UserLog(self.per_user, self._seq)
+            self._users[user_id] = log
+        log.disconnected_at = None
+        self._users.move_to_end(user_id)
+        self._evict()
+
+    def untrack(self, user_id: int):
+        """Пользователь отключился: журнал хранится еще retention секунд."""
+        log = self._users.get(user_id)
+        if log is not None:
+            log.disconnected_at = time.monotonic()
+        self._evict()
+
+    def replay(self, user_id: int, position: EventPosition) -> Optional[List]:
+        """Кадры после position или None, если журнал не покрывает пропуск."""
+        log = self._users.get(user_id)
+        if position.epoch != self.epoch or log is None or self._expired(log):
+            return None
+        if position.seq > self._seq:
+            return None
+        # Начало журнала: либо начало ведения, либо самое старое вытесненное событие
+        start = log.since_seq
+        if len(log.events) == log.events.maxlen:
+            start = max(start, log.events[0][0] - 1)
+        if position.seq < start:
+            return None
+        return [frame for seq, frame in log.events if seq > position.seq]
+
+    @staticmethod
+    def parse(event_id: str) -> Optional[EventPosition]:
+        try:
+            epoch, seq, message_id = event_id.split(":")
+            return EventPosition(epoch, int(seq), int(message_id))
+        except (AttributeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._users),
+            "events": sum(len(log.events) for log in self._users.values()),
+            "seq": self._seq
+        }
+
+    def _format(self, seq: int) -> str:
+        return f"{self.epoch}:{seq}:{self._message_id}"
+
+    def _expired(self, log: _UserLog) -> bool:
+        return (
+            log.disconnected_at is not None and
+            time.monotonic() - log.disconnected_at > self.retention
+        )
+
+    def _evict(self):
+        # Журналы отключившихся пользователей удаляются по истечении retention,
+        # при переполнении — самые давно использованные
+        while self._users:
+            user_id, log = next(iter(self._users.items()))
+            if len(self._users) <= self.max_users and not self._expired(log):
+                break
+            del self._users[user_id]
+
+# Создаем глобальный журнал событий воркера
+event_log = EventLog(
+    per_user=settings.WS_EVENT_LOG_PER_USER,
+    max_users=settings.WS_EVENT_LOG_MAX_USERS,
+    retention=settings.WS_EVENT_LOG_RETENTION_SECONDS
+)
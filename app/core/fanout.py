@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+class FanoutPool:
+    """Пул фоновых задач рассылки событий в большие чаты.
+
+    Участники чата делятся на пачки, между пачками задача отдает управление
+    циклу событий, поэтому рассылка в группу на десятки тысяч человек не
+    задерживает остальные чаты. Все события одного чата обрабатывает одна
+    и та же задача по порядку: получатели видят их в порядке отправки.
+    """
+
+    def __init__(self, workers: int = 4, history: int = 1024):
+        self.workers = workers
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        # chat_id -> число рассылок в очереди или в работе
+        self._pending: Dict[int, int] = {}
+        # За один оборот цикла событий доставляется одна пачка на весь пул
+        self._turn: Optional[asyncio.Lock] = None
+        # Задержки последних пачек и рассылок целиком (с ожиданием в очереди), в секундах
+        self.chunk_latencies: deque = deque(maxlen=history)
+        self.broadcast_latencies: deque = deque(maxlen=history)
+        self.broadcasts = 0
+        self.chunks = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._turn = asyncio.Lock()
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._run(queue)) for queue in self._queues]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+        self._pending.clear()
+
+    def has_pending(self, chat_id: int) -> bool:
+        return chat_id in self._pending
+
+    def submit(self, chat_id: int, chunks: Sequence, deliver: Callable[[object], None]):
+        """Ставит рассылку в очередь задачи, закрепленной за чатом."""
+        queue = self._queues[zlib.crc32(str(chat_id).encode()) % len(self._queues)]
+        self._pending[chat_id] = self._pending.get(chat_id, 0) + 1
+        queue.put_nowait((chat_id, chunks, deliver, time.perf_counter()))
+
+    async def run_inline(self, chunks: Sequence, deliver: Callable[[object], None]):
+        """Рассылка пачками в текущей задаче, когда пул не запущен."""
+        started = time.perf_counter()
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(0)
+            self._deliver(chunk, deliver)
+        self._finish(started)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "workers": len(self._tasks),
+            "queued": sum(self._pending.values()),
+            "broadcasts": self.broadcasts,
+            "chunks": self.chunks,
+            "chunk_p50_ms": self._percentile(self.chunk_latencies, 0.50),
+            "chunk_p99_ms": self._percentile(self.chunk_latencies, 0.99),
+            "chunk_max_ms": self._percentile(self.chunk_latencies, 1.0),
+            "broadcast_p99_ms": self._percentile(self.broadcast_latencies, 0.99)
+        }
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            chat_id, chunks, deliver, queued_at = await queue.get()
+            try:
+                for chunk in chunks:
+                    async with self._turn:
+                        self._deliver(chunk, deliver)
+                        # Отдаем управление циклу событий между пачками
+                        await asyncio.sleep(0)
+                self._finish(queued_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Ошибка одной рассылки не должна останавливать задачу пула
+                logger.exception("Failed to fan out event to chat %s", chat_id)
+            finally:
+                self._release(chat_id)
+
+    def _deliver(self, chunk, deliver: Callable[[object], None]):
+        started = time.perf_counter()
+        deliver(chunk)
+        self.chunk_latencies.append(time.perf_counter() - started)
+        self.chunks += 1
+
+    def _finish(self, started: float):
+        self.broadcast_latencies.append(time.perf_counter() - started)
+        self.broadcasts += 1
+
+    def _release(self, chat_id: int):
+        left = self._pending.get(chat_id, 0) - 1
+        if left > 0:
+            self._pending[chat_id] = left
+        else:
+            self._pending.pop(chat_id, None)
+
+    @staticmethod
+    def _percentile(values, p: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
@@ -0,0 +1,224 @@
+import bisect
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Set
+from app.core import serialization
+from app.core.settings import settings
+from app.schemas.message import Message
+
+class _ChatHistory:
+    __slots__ = ("messages", "ids", "has_all", "expires_at")
+
+    def __init__(self, maxlen: int, expires_at: float):
+        self.messages: deque = deque(maxlen=maxlen)
+        self.ids: deque = deque(maxlen=maxlen)
+        # True, если в буфере вся история чата, а не только ее хвост
+        self.has_all = False
+        # Буфер заводится заново из базы не реже раза в ttl
+        self.expires_at = expires_at
+
+class _Seeding:
+    __slots__ = ("readers", "messages", "read_ids", "valid")
+
+    def __init__(self):
+        # Число незавершенных чтений последней страницы из базы
+        self.readers = 0
+        # Сообщения, разосланные за время чтения
+        self.messages: List[dict] = []
+        # Сообщения, отмеченные прочитанными за время чтения
+        self.read_ids: Set[int] = set()
+        self.valid = True
+
+class RecentMessagesCache:
+    """Кольцевые буферы последних сообщений активных чатов.
+
+    Буфер чата заводится при чтении последней страницы из базы и дальше
+    пополняется новыми сообщениями, поэтому всегда содержит непрерывный
+    хвост истории. Сообщения, разосланные, пока страница читается из базы
+    (между begin_seed и seed), копятся отдельно и доливаются в затравку.
+    Общее число сообщений ограничено max_messages, при превышении
+    вытесняются давно не использованные чаты. Потерянное шиной событие
+    оставило бы разрыв в хвосте, поэтому при сообщениях о пропуске (forget)
+    буферы сбрасываются, а без них живут не дольше ttl секунд.
+    """
+
+    def __init__(self, per_chat: int = 100, max_messages: int = 200_000, ttl: float = 300):
+        self.per_chat = per_chat
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._chats: "OrderedDict[int, _ChatHistory]" = OrderedDict()
+        self._seeding: Dict[int, _Seeding] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_latest(self, chat_id: int, limit: int, before_id: Optional[int] = None) -> Optional[List[Message]]:
+        """Последние limit сообщений старше before_id или None, если буфера недостаточно."""
+        history = self._chats.get(chat_id)
+        if history is not None and history.expires_at <= time.monotonic():
+            self._drop(chat_id)
+            history = None
+        if history is None:
+            self.misses += 1
+            return None
+
+        end = len(history.ids)
+        if before_id is not None:
+            end = bisect.bisect_left(history.ids, before_id)
+        if end < limit and not history.has_all:
+            self.misses += 1
+            return None
+
+        self._chats.move_to_end(chat_id)
+        self.hits += 1
+        start = max(end - limit, 0)
+        return [history.messages[i] for i in range(start, end)]
+
+    def begin_seed(self, chat_id: int):
+        """Вызывается до чтения последней страницы из базы, которой затем будет seed."""
+        seeding = self._seeding.get(chat_id)
+        if seeding is None:
+            seeding = self._seeding[chat_id] = _Seeding()
+        seeding.readers += 1
+
+    def cancel_seed(self, chat_id: int):
+        """Чтение страницы не удалось: затравки не будет."""
+        self._end_seed(chat_id)
+
+    def seed(self, chat_id: int, messages: Iterable, requested: int):
+        """Запоминает последнюю страницу истории, прочитанную из базы после begin_seed."""
+        seeding = self._end_seed(chat_id)
+        if seeding is None or not seeding.valid:
+            # Чат сброшен во время чтения или пропущено слишком много событий
+            return
+        messages = [Message.model_validate(message) for message in messages]
+        self._drop(chat_id)
+        history = _ChatHistory(self.per_chat, time.monotonic() + self.ttl)
+        # База вернула меньше, чем просили: в буфере вся история чата
+        history.has_all = len(messages) < requested and len(messages) <= self.per_chat
+        for message in messages[-self.per_chat:]:
+            history.messages.append(message)
+            history.ids.append(message.id)
+        self._chats[chat_id] = history
+        self._size += len(history.ids)
+        # Доливаем разосланное во время чтения; более старые, чем страница,
+        # сообщения оставили бы разрыв в хвосте истории
+        for message in seeding.messages:
+            if history.has_all or not history.ids or message["id"] > history.ids[0]:
+                self.add(chat_id, message)
+        for message_id in seeding.read_ids:
+            self.mark_read(chat_id, message_id)
+        self._evict()
+
+    def _end_seed(self, chat_id: int) -> Optional[_Seeding]:
+        seeding = self._seeding.get(chat_id)
+        if seeding is None:
+            return None
+        seeding.readers -= 1
+        if seeding.readers <= 0:
+            del self._seeding[chat_id]
+        return seeding
+
+    def add(self, chat_id: int, message: dict):
+        history = self._chats.get(chat_id)
+        if history is None:
+            # Без затравки из базы хвост истории был бы неполным
+            return
+        message = Message.model_validate(message)
+        # Сообщения с разных воркеров могут прийти не по порядку id
+        position = bisect.bisect_left(history.ids, message.id)
+        if position < len(history.ids) and history.ids[position] == message.id:
+            return
+        if len(history.ids) == history.ids.maxlen:
+            if position == 0:
+                return
+            # Самое старое сообщение выпадает из буфера
+            history.ids.popleft()
+            history.messages.popleft()
+            history.has_all = False
+            self._size -= 1
+            position -= 1
+        history.ids.insert(position, message.id)
+        history.messages.insert(position, message)
+        self._size += 1
+        self._evict()
+
+    def mark_read(self, chat_id: int, message_id: int):
+        history = self._chats.get(chat_id)
+        if history is None:
+            return
+        position = bisect.bisect_left(history.ids, message_id)
+        if position < len(history.ids) and history.ids[position] == message_id:
+            message = history.messages[position]
+            if not message.is_read:
+                history.messages[position] = message.model_copy(update={"is_read": True})
+
+    def observe(self, chat_id: int, payload: bytes):
+        """Слушатель рассылки: новые сообщения и отметки read_receipt отслеживаемых чатов."""
+        seeding = self._seeding.get(chat_id)
+        if chat_id not in self._chats and seeding is None:
+            return
+        event = serialization.loads(payload)
+        if event.get("type") == "read_receipt":
+            if seeding is not None:
+                seeding.read_ids.add(event["message_id"])
+            self.mark_read(chat_id, event["message_id"])
+            return
+        if event.get("type") != "message":
+            return
+        if seeding is not None and seeding.valid:
+            seeding.messages.append(event)
+            if len(seeding.messages) > self.per_chat:
+                # Страница из базы уже не войдет в буфер целиком
+                seeding.valid = False
+                seeding.messages = []
+        self.add(chat_id, event)
+
+    def invalidate(self, chat_id: int):
+        self._drop(chat_id)
+        seeding = self._seeding.get(chat_id)
+        if seeding is not None:
+            seeding.valid = False
+
+    def forget(self, chat_id: Optional[int] = None):
+        """Слушатель пропуска событий шины: сбрасывает чат или, без chat_id, все чаты."""
+        if chat_id is None:
+            self.clear()
+        else:
+            self.invalidate(chat_id)
+
+    def clear(self):
+        self._chats.clear()
+        for seeding in self._seeding.values():
+            seeding.valid = False
+        self._size = 0
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "chats": len(self._chats),
+            "messages": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions
+        }
+
+    def _drop(self, chat_id: int):
+        history = self._chats.pop(chat_id, None)
+        if history is not None:
+            self._size -= len(history.ids)
+
+    def _evict(self):
+        while self._size > self.max_messages and self._chats:
+            _, history = self._chats.popitem(last=False)
+            self._size -= len(history.ids)
+            self.evictions += 1
+
+# Создаем глобальный кэш последних сообщений
+history_cache = RecentMessagesCache(
+    per_chat=settings.HISTORY_CACHE_PER_CHAT,
+    max_messages=settings.HISTORY_CACHE_MAX_MESSAGES,
+    ttl=settings.HISTORY_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from app.core.settings import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.chat_repository import ChatRepository
+
+# Загрузчик участников чата: chat_id -> множество user_id
+Loader = Callable[[int], Awaitable[Set[int]]]
+
+class ChatMembershipIndex:
+    """Кэш участников чатов с LRU-вытеснением.
+
+    Участники загружаются из базы при первой рассылке в чат. Без загрузчика
+    индекс работает как обычный словарь в памяти и заполняется только через add().
+    TTL ограничивает устаревание записей, измененных на других воркерах.
+    """
+
+    def __init__(self, loader: Optional[Loader] = None, max_size: int = 500_000, ttl: float = 60):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        # chat_id -> (время истечения, участники); порядок — от давно использованных к недавним
+        self._entries: "OrderedDict[int, Tuple[float, Set[int]]]" = OrderedDict()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, chat_id: int) -> Set[int]:
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(chat_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        if self.loader is None:
+            return entry[1] if entry is not None else set()
+
+        # Параллельные промахи по одному чату ждут одну и ту же загрузку
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[chat_id] = future
+        try:
+            members = await self.loader(chat_id)
+        except Exception as exc:
+            if self._pending.get(chat_id) is future:
+                del self._pending[chat_id]
+            future.set_exception(exc)
+            # Исключение получит вызывающий, ожидающим его не помечаем как потерянное
+            future.exception()
+            raise
+
+        # Не сохраняем результат, если чат инвалидировали во время загрузки
+        if self._pending.get(chat_id) is future:
+            del self._pending[chat_id]
+            self._store(chat_id, members)
+        future.set_result(members)
+        return members
+
+    def add(self, chat_id: int, user_id: int):
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            entry[1].add(user_id)
+        elif self.loader is None:
+            self._store(chat_id, {user_id})
+
+    def discard(self, chat_id: int, user_id: int):
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            entry[1].discard(user_id)
+
+    def invalidate(self, chat_id: int):
+        self._entries.pop(chat_id, None)
+        self._pending.pop(chat_id, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def _store(self, chat_id: int, members: Set[int]):
+        ttl = self.ttl if self.loader is not None else float("inf")
+        self._entries[chat_id] = (time.monotonic() + ttl, members)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+async def load_chat_members(chat_id: int) -> Set[int]:
+    async with AsyncSessionLocal() as db:
+        return await ChatRepository(db).get_member_ids(chat_id)
+
+# Создаем глобальный индекс участников чатов
+membership_index = ChatMembershipIndex(
+    loader=load_chat_members,
+    max_size=settings.CHAT_MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.CHAT_MEMBERSHIP_CACHE_TTL_SECONDS
+)
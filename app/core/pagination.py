@@ -0,0 +1,70 @@
+import base64
+import binascii
+import enum
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException, status
+from app.core import serialization
+
+class Direction(str, enum.Enum):
+    BACKWARD = "backward"  # к более старым сообщениям
+    FORWARD = "forward"    # к более новым сообщениям
+
+def encode_cursor(data: dict) -> str:
+    """Упаковывает позицию страницы в непрозрачную для клиента строку."""
+    return base64.urlsafe_b64encode(serialization.dumps(data)).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = serialization.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        data = None
+    if not isinstance(data, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return data
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Позиция в результатах поиска: (rank, id) последнего результата страницы."""
+    position = decode_cursor(cursor)
+    try:
+        return float(position["r"]), int(position["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def decode_inbox_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Позиция в списке чатов: (last_activity_at, id) последнего чата страницы."""
+    position = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(position["at"]), int(position["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def decode_sync_cursor(cursor: str) -> dict:
+    """Позиция синхронизации: последние выданные id сообщения, seq курсора прочтения и события участников.
+
+    at — время выдачи, от него перечитываются записи, зафиксированные с опозданием.
+    """
+    position = decode_cursor(cursor)
+    try:
+        return {
+            "m": int(position["m"]),
+            "ts": datetime.fromisoformat(position["ts"]) if position.get("ts") else None,
+            "r": int(position["r"]),
+            "e": int(position["e"]),
+            "at": datetime.fromisoformat(position["at"]) if position.get("at") else None
+        }
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
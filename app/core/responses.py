@@ -0,0 +1,43 @@
+from collections.abc import Mapping
+from typing import Any, Iterable, Type
+from fastapi import Response
+from pydantic import BaseModel
+from app.core import serialization
+
+class JSONBytesResponse(Response):
+    """JSON-ответ, тело которого уже закодировано в байты."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return serialization.dumps(content)
+
+class ListEncoder:
+    """Быстрое кодирование списков для ответов API.
+
+    Берет из ORM-объектов, строк результата или готовых моделей только поля
+    схемы и кодирует их одним вызовом serialization.dumps, минуя повторную
+    валидацию pydantic и jsonable_encoder в FastAPI.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.fields = tuple(schema.model_fields)
+
+    def encode(self, items: Iterable) -> bytes:
+        fields = self.fields
+        return serialization.dumps([
+            {field: item[field] for field in fields}
+            if isinstance(item, Mapping)
+            else {field: getattr(item, field) for field in fields}
+            for item in items
+        ])
+
+    def response(self, items: Iterable, response: Response) -> JSONBytesResponse:
+        # Заголовки, выставленные обработчиком (курсоры страниц), переносим в ответ
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name != "content-length"
+        }
+        return JSONBytesResponse(self.encode(items), headers=headers)
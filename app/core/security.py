@@ -1,13 +1,104 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from app.core.settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Хеши с любой другой стоимостью считаются устаревшими и пересчитываются при входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+class PasswordHasherBusy(Exception):
+    """Очередь хеширования переполнена."""
+
+class PasswordHasher:
+    """Хеширование и проверка паролей bcrypt в отдельном пуле потоков.
+
+    Одна операция занимает сотни миллисекунд; в пуле она не блокирует цикл
+    событий и WebSocket-рассылку. Одновременно выполняется не больше workers
+    операций, остальные ждут в очереди; при max_pending ожидающих новые
+    запросы отклоняются PasswordHasherBusy.
+    """
+
+    def __init__(self, context: CryptContext, workers: int = 4, max_pending: int = 1000, history: int = 1024):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Операции в очереди и в работе
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        # Время ожидания свободного потока последних операций, в секундах
+        self.wait_times: deque = deque(maxlen=history)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Проверяет пароль; вторым значением — новый хеш, если стоимость устарела."""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self.wait_times)
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": max(0, self.peak_pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_p99_ms": waits[min(int(len(waits) * 0.99), len(waits) - 1)] * 1000 if waits else None
+        }
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed, time.perf_counter(), func, args
+            )
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def _timed(self, queued_at: float, func, args):
+        self.wait_times.append(time.perf_counter() - queued_at)
+        return func(*args)
+
+# Создаем глобальный пул хеширования паролей
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -26,4 +117,4 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM
     )
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt
@@ -21,10 +21,67 @@ class Settings(BaseSettings):
     )
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Кэш проверенных токенов в get_current_user
+    AUTH_CACHE_SIZE: int = 100_000
+    AUTH_CACHE_TTL_SECONDS: int = 60  # Ограничивает устаревание после изменений на других воркерах
+    # bcrypt: стоимость хеша и пул потоков, чтобы не блокировать цикл событий
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # Хеши с другой стоимостью пересчитываются при входе
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 1000  # Сверх этого запросы отклоняются с 503
 
     # Настройки CORS
     BACKEND_CORS_ORIGINS: list[str] = ["*"]  # В продакшене заменить на конкретные домены
 
+    # Быстрое кодирование списков в ответах API (история, поиск, список чатов)
+    FAST_RESPONSES: bool = False
+
+    # Настройки WebSocket
+    WS_SEND_QUEUE_SIZE: int = 256  # Размер очереди исходящих событий на соединение
+    WS_QUEUE_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest, drop_new или disconnect
+    WS_BINARY_FRAMES: bool = False  # Отправлять события бинарными кадрами без декодирования в str
+    WS_BACKPLANE: str = "memory"  # memory (один процесс) или postgres (LISTEN/NOTIFY между воркерами)
+    WS_BACKPLANE_CHANNEL: str = "chat_events"
+    WS_EVENT_LOG_PER_USER: int = 1000  # Событий в журнале пользователя для возобновления сессии
+    WS_EVENT_LOG_MAX_USERS: int = 100_000
+    WS_EVENT_LOG_RETENTION_SECONDS: int = 300  # Сколько хранить журнал после отключения
+    WS_RESUME_DB_LIMIT: int = 1000  # Максимум сообщений, догружаемых из базы при возобновлении
+    WS_FANOUT_CHUNK_SIZE: int = 250  # Получателей в пачке; чаты крупнее рассылаются пулом задач
+    WS_FANOUT_WORKERS: int = 4  # Задач рассылки в большие чаты
+
+    # Групповая запись сообщений из WebSocket
+    MESSAGE_WRITE_BEHIND: bool = False
+    MESSAGE_FLUSH_INTERVAL_MS: int = 5  # Максимальное время ожидания пачки
+    MESSAGE_BATCH_SIZE: int = 500  # Максимальный размер пачки
+
+    # Курсоры прочтения
+    READ_CURSOR_FLUSH_INTERVAL_MS: int = 1000  # Интервал пакетного сброса отметок прочтения
+    UNREAD_RECONCILE_INTERVAL_SECONDS: int = 3600  # Сверка счетчиков непрочитанных, 0 — отключить
+
+    # Помесячные партиции таблицы messages
+    MESSAGE_PARTITIONS_AHEAD: int = 3  # Сколько будущих месяцев держать созданными
+    MESSAGE_PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 86400
+    MESSAGE_RETENTION_MONTHS: int = 0  # Отсоединять партиции старше N месяцев, 0 — хранить все
+    MESSAGE_TIMESTAMP_SKEW_SECONDS: int = 300  # Допустимое расхождение порядка id и timestamp
+    # Сколько секунд после выдачи перечитывать записи с меньшими id/seq: транзакции,
+    # получившие их раньше, могут зафиксироваться позже (с запасом на расхождение часов)
+    LATE_COMMIT_WINDOW_SECONDS: int = 30
+
+    # Кэш последних сообщений активных чатов
+    HISTORY_CACHE_PER_CHAT: int = 100  # Размер кольцевого буфера на чат
+    HISTORY_CACHE_MAX_MESSAGES: int = 200_000  # Общий лимит сообщений во всех буферах
+    HISTORY_CACHE_TTL_SECONDS: int = 300  # Буфер перечитывается из базы, даже если шина потеряла событие молча
+
+    # Кэш участников чатов
+    CHAT_MEMBERSHIP_CACHE_SIZE: int = 500_000
+    CHAT_MEMBERSHIP_CACHE_TTL_SECONDS: int = 60  # Ограничивает устаревание после изменений на других воркерах
+
+    # Кэш проверок доступа к чатам (включая отказы)
+    CHAT_ACCESS_CACHE_SIZE: int = 100_000
+    CHAT_ACCESS_CACHE_TTL_SECONDS: int = 30
+
+    # Максимум пользователей в одном запросе массового добавления/удаления из группы
+    GROUP_MEMBERS_BATCH_LIMIT: int = 50_000
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -1,36 +1,331 @@
-from fastapi import WebSocket
-from typing import Dict, Set
+import asyncio
+import enum
+import uuid
+from collections import deque
+from fastapi import WebSocket, status
+from typing import Callable, Dict, List, Optional, Set, Union
 from datetime import datetime
+from app.core.settings import settings
+from app.core import serialization
+from app.core.backplane import Backplane, create_backplane
+from app.core.membership import ChatMembershipIndex, membership_index
+from app.core.history_cache import history_cache
+from app.core.event_log import EventLog, event_log
+from app.core.fanout import FanoutPool
+
+# Готовый к отправке кадр: str — текстовый кадр, bytes — бинарный
+Frame = Union[str, bytes]
+
+# Фоновые закрытия сокетов; ссылки храним, чтобы задачи не собрал сборщик мусора
+_closing_tasks: Set[asyncio.Task] = set()
+
+class OverflowPolicy(str, enum.Enum):
+    DROP_OLDEST = "drop_oldest"   # выбрасываем самое старое событие из очереди
+    DROP_NEW = "drop_new"         # выбрасываем новое событие
+    DISCONNECT = "disconnect"     # отключаем медленного клиента
+
+class Connection:
+    """WebSocket-соединение с собственной очередью исходящих событий.
+
+    Рассылка только кладет событие в очередь, а отправкой в сокет
+    занимается отдельная задача-писатель, поэтому медленный клиент
+    не задерживает доставку остальным участникам чата. Писатель
+    запускается, когда в очереди появляются кадры, отправляет их все
+    и завершается: простаивающее соединение не держит ни задачи, ни
+    ожидающего future.
+    """
+
+    __slots__ = (
+        "id", "websocket", "user_id", "overflow_policy", "max_queue_size",
+        "queue", "dropped", "closed", "_writer", "_started", "_held"
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        max_queue_size: int,
+        overflow_policy: OverflowPolicy
+    ):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.user_id = user_id
+        self.overflow_policy = overflow_policy
+        self.max_queue_size = max_queue_size
+        self.queue: deque = deque()
+        self.dropped = 0
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+        self._started = False
+        # Живые события, придержанные на время догрузки пропущенных из базы
+        self._held: Optional[List[Frame]] = None
+
+    @property
+    def holding(self) -> bool:
+        return self._held is not None
+
+    @property
+    def free_slots(self) -> int:
+        """Сколько кадров еще поместится в очередь вместе с придержанными."""
+        return self.max_queue_size - len(self.queue) - len(self._held or ())
+
+    def start(self):
+        self._started = True
+        self._wake()
+
+    def hold(self):
+        self._held = []
+
+    def release(self, frames: List[Frame]):
+        """Отправляет догруженные кадры, а за ними придержанные живые события."""
+        held, self._held = self._held or [], None
+        for frame in frames:
+            self.enqueue(frame)
+        for frame in held:
+            self.enqueue(frame)
+
+    def enqueue(self, frame: Frame) -> bool:
+        """Кладет кадр в очередь. Возвращает False, если кадр не принят."""
+        if self.closed:
+            return False
+        if self._held is not None:
+            self._held.append(frame)
+            return True
+        if len(self.queue) < self.max_queue_size:
+            self.queue.append(frame)
+            self._wake()
+            return True
+
+        self.dropped += 1
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            self.queue.popleft()
+            self.queue.append(frame)
+            return True
+        if self.overflow_policy == OverflowPolicy.DISCONNECT:
+            self.close()
+            # Закрываем сокет в фоне: цикл чтения получит WebSocketDisconnect
+            task = asyncio.create_task(self._close_websocket())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+        return False
+
+    def close(self):
+        self.closed = True
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+
+    def _wake(self):
+        # Пока писатель работает, он сам заберет новые кадры
+        if self._started and self._writer is None and self.queue:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def _close_websocket(self):
+        try:
+            await self.websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        except Exception:
+            pass
+
+    async def _write_loop(self):
+        try:
+            while self.queue:
+                frame = self.queue.popleft()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Сокет сломан: дальнейшие события для него не принимаем
+            self.closed = True
+        # Очередь пуста: завершенная задача не хранится до следующего кадра
+        self._writer = None
 
 class ConnectionManager:
-    def __init__(self):
-        # Хранение активных соединений по user_id
-        self.active_connections: Dict[int, WebSocket] = {}
-        # Хранение участников чатов
-        self.chat_members: Dict[int, Set[int]] = {}
+    def __init__(
+        self,
+        max_queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy(settings.WS_QUEUE_OVERFLOW_POLICY),
+        binary_frames: bool = settings.WS_BINARY_FRAMES,
+        backplane: Optional[Backplane] = None,
+        membership: Optional[ChatMembershipIndex] = None,
+        event_log: Optional[EventLog] = None,
+        fanout_chunk_size: int = settings.WS_FANOUT_CHUNK_SIZE,
+        fanout_workers: int = settings.WS_FANOUT_WORKERS
+    ):
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.binary_frames = binary_frames
+        # Хранение активных соединений: user_id -> {connection_id: Connection}.
+        # У пользователя может быть несколько устройств и вкладок одновременно
+        self.active_connections: Dict[int, Dict[str, Connection]] = {}
+        # Участники чатов; без загрузчика из базы индекс заполняется через add_user_to_chat
+        self.membership = membership or ChatMembershipIndex()
+        # Журнал событий для возобновления сессий; без него события не нумеруются
+        self.event_log = event_log
+        # Рассылка в чаты крупнее fanout_chunk_size идет пачками через пул задач
+        self.fanout_chunk_size = fanout_chunk_size
+        self.fanout = FanoutPool(workers=fanout_workers)
+        # Шина событий между воркерами: каждый воркер доставляет только своим сокетам
+        self.backplane = backplane or create_backplane()
+        self.backplane.subscribe(self._deliver_local)
+        # Слушатели всех событий, дошедших до воркера: (chat_id, payload)
+        self._listeners: List[Callable[[int, bytes], None]] = []
+
+    def add_listener(self, listener: Callable[[int, bytes], None]):
+        self._listeners.append(listener)
+
+    async def start(self):
+        self.fanout.start()
+        await self.backplane.start()
 
-    async def connect(self, websocket: WebSocket, user_id: int):
+    async def stop(self):
+        await self.backplane.stop()
+        await self.fanout.stop()
+        for user_id in list(self.active_connections):
+            self.disconnect(user_id)
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        last_event_id: Optional[str] = None
+    ) -> Connection:
+        """Подключает сокет. С last_event_id досылает пропущенные события из журнала.
+
+        Если журнал не покрывает пропуск, соединение придерживает живые события
+        (connection.holding), пока вызывающий не догрузит сообщения из базы и не
+        вызовет release().
+        """
+        connection = Connection(
+            websocket,
+            user_id,
+            self.max_queue_size,
+            self.overflow_policy
+        )
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        connection.start()
+        # Дальше без await: между досылкой журнала и регистрацией соединения
+        # не может вклиниться новое событие
+        if last_event_id is not None and self.event_log is not None:
+            frames = self._replay(user_id, last_event_id)
+            if frames is None:
+                connection.hold()
+            else:
+                for frame in frames:
+                    connection.enqueue(frame)
+                connection.enqueue(self.resumed_frame("log", complete=True))
+        self.active_connections.setdefault(user_id, {})[connection.id] = connection
+        if self.event_log is not None:
+            self.event_log.track(user_id)
+        return connection
+
+    def _replay(self, user_id: int, last_event_id: str) -> Optional[List[Frame]]:
+        position = self.event_log.parse(last_event_id)
+        if position is None:
+            return None
+        frames = self.event_log.replay(user_id, position)
+        # Пропуск, не помещающийся в очередь соединения, догружаем из базы
+        if frames is None or len(frames) >= self.max_queue_size:
+            return None
+        if not self.binary_frames:
+            return [frame.decode("utf-8") for frame in frames]
+        return frames
+
+    def resumed_frame(self, source: str, complete: bool) -> Frame:
+        """Служебное событие об окончании досылки: complete=False — клиенту нужен /sync."""
+        event = {"type": "resumed", "source": source, "complete": complete}
+        if self.event_log is not None:
+            event["event_id"] = self.event_log.current_event_id()
+        return self.to_frame(serialization.dumps(event))
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
+    def to_frame(self, payload: bytes) -> Frame:
+        return payload if self.binary_frames else payload.decode("utf-8")
+
+    def disconnect(self, user_id: int, connection_id: Optional[str] = None):
+        """Отключает одно соединение пользователя или, без connection_id, все."""
+        connections = self.active_connections.get(user_id)
+        if connections is None:
+            return
+        if connection_id is None:
+            removed = list(connections.values())
+            connections.clear()
+        else:
+            connection = connections.pop(connection_id, None)
+            removed = [connection] if connection is not None else []
+        for connection in removed:
+            connection.close()
+        if not connections:
             del self.active_connections[user_id]
+            if self.event_log is not None:
+                self.event_log.untrack(user_id)
+
+    def connection_count(self, user_id: int) -> int:
+        return len(self.active_connections.get(user_id, ()))
+
+    def connection_counts(self) -> Dict[int, int]:
+        return {
+            user_id: len(connections)
+            for user_id, connections in self.active_connections.items()
+        }
 
     def add_user_to_chat(self, chat_id: int, user_id: int):
-        if chat_id not in self.chat_members:
-            self.chat_members[chat_id] = set()
-        self.chat_members[chat_id].add(user_id)
+        self.membership.add(chat_id, user_id)
 
     def remove_user_from_chat(self, chat_id: int, user_id: int):
-        if chat_id in self.chat_members:
-            self.chat_members[chat_id].discard(user_id)
+        self.membership.discard(chat_id, user_id)
 
     async def send_message(self, message: dict, chat_id: int):
-        if chat_id in self.chat_members:
-            for user_id in self.chat_members[chat_id]:
-                if user_id in self.active_connections:
-                    await self.active_connections[user_id].send_json(message)
+        # Кодируем событие один раз и публикуем его один раз для всех воркеров
+        await self.backplane.publish(chat_id, serialization.dumps(message))
+
+    async def _deliver_local(self, chat_id: int, payload: bytes):
+        for listener in self._listeners:
+            listener(chat_id, payload)
+        # Без локальных сокетов и журналов не загружаем участников чата
+        if not self.active_connections and not (self.event_log and self.event_log.has_users):
+            return
+        members = await self.membership.get(chat_id)
+
+        def deliver(user_ids):
+            # Номер присваивается в момент доставки пачки, а не при получении
+            # события: пачка большой рассылки может уйти позже событий других
+            # чатов, а в журнале и у получателя номера должны только расти
+            seq, stamped = None, payload
+            if self.event_log is not None:
+                seq, stamped = self.event_log.stamp(payload)
+            self._deliver_chunk(user_ids, seq, stamped, self.to_frame(stamped))
+
+        if len(members) <= self.fanout_chunk_size and not self.fanout.has_pending(chat_id):
+            # Небольшой чат: доставляем сразу за один проход
+            deliver(members)
+            return
+        # Большой чат: снимок участников пачками. Пока в пуле есть рассылки
+        # этого чата, новые события идут за ними, чтобы не нарушить порядок
+        user_ids = list(members)
+        size = self.fanout_chunk_size
+        chunks = [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+        if self.fanout.running:
+            self.fanout.submit(chat_id, chunks, deliver)
+        else:
+            await self.fanout.run_inline(chunks, deliver)
+
+    def _deliver_chunk(self, user_ids, seq: Optional[int], payload: bytes, frame: Frame):
+        # Только ставим кадр в очереди соединений, не дожидаясь отправки.
+        # За один проход доставляем на все устройства каждого участника
+        closed = []
+        for user_id in user_ids:
+            if seq is not None:
+                # Журнал хранит исходные байты, общие для всех получателей
+                self.event_log.record(user_id, seq, payload)
+            connections = self.active_connections.get(user_id)
+            if not connections:
+                continue
+            for connection in connections.values():
+                if not connection.enqueue(frame) and connection.closed:
+                    closed.append(connection)
+        for connection in closed:
+            self.disconnect(connection.user_id, connection.id)
 
     async def send_read_receipt(self, message_id: int, chat_id: int, reader_id: int):
         read_receipt = {
@@ -43,4 +338,6 @@ class ConnectionManager:
         await self.send_message(read_receipt, chat_id)
 
 # Создаем глобальный экземпляр менеджера
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager(membership=membership_index, event_log=event_log)
+manager.add_listener(history_cache.observe)
+manager.backplane.add_gap_listener(history_cache.forget)
@@ -1,12 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import api_router
 from app.core.settings import settings
+from app.core.websocket_manager import manager
+from app.core.security import password_hasher
+from app.services.chat_service import load_message_event
+from app.services.message_writer import message_writer
+from app.services.read_cursor_buffer import read_cursor_buffer
+from app.services.unread_reconciler import unread_reconciler
+from app.services.partition_maintainer import partition_maintainer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Подписываемся на шину событий между воркерами; крупные сообщения
+    # шина передает ссылкой, и воркеры загружают их из базы
+    manager.backplane.set_loader(load_message_event)
+    await manager.start()
+    if settings.MESSAGE_WRITE_BEHIND:
+        message_writer.start()
+    read_cursor_buffer.start()
+    unread_reconciler.start()
+    partition_maintainer.start()
+    yield
+    await partition_maintainer.stop()
+    await unread_reconciler.stop()
+    # Дописываем буферизованные сообщения до остановки рассылки
+    await message_writer.stop()
+    await read_cursor_buffer.stop()
+    await manager.stop()
+    password_hasher.stop()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -1,15 +1,21 @@
 from .base import Base
 from .user import User
-from .chat import Chat, ChatType
+from .chat import Chat, ChatType, chat_participants
 from .message import Message
 from .group import Group, group_members
+from .read_cursor import ReadCursor
+from .membership_event import MembershipEvent, MembershipAction
 
 __all__ = [
     'Base',
     'User',
     'Chat',
     'ChatType',
+    'chat_participants',
     'Message',
     'Group',
-    'group_members'
+    'group_members',
+    'ReadCursor',
+    'MembershipEvent',
+    'MembershipAction'
 ] 
\ No newline at end of file
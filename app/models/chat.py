@@ -1,10 +1,18 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Table
 from sqlalchemy.orm import relationship
 import enum
 
 from .base import Base
 
+# Association table for private chat participants
+chat_participants = Table(
+    'chat_participants',
+    Base.metadata,
+    Column('chat_id', Integer, ForeignKey('chats.id', ondelete='CASCADE'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
+)
+
 class ChatType(enum.Enum):
     PRIVATE = "private"
     GROUP = "group"
@@ -16,7 +24,12 @@ class Chat(Base):
     name = Column(String, nullable=True)  # Optional for private chats
     type = Column(Enum(ChatType), default=ChatType.PRIVATE)
     created_at = Column(DateTime, default=datetime.utcnow)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")  # Counter for unread counts
+    # Last message, kept up to date on insert for the inbox
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
 
     # Relationships
     messages = relationship("Message", back_populates="chat")
-    group = relationship("Group", back_populates="chat", uselist=False) 
\ No newline at end of file
+    group = relationship("Group", back_populates="chat", uselist=False)
+    participants = relationship("User", secondary=chat_participants) 
\ No newline at end of file
@@ -5,11 +5,13 @@ from sqlalchemy.orm import relationship
 from .base import Base
 
 # Association table for group members
+# Составной первичный ключ не дает добавить участника дважды и покрывает
+# выборку по group_id, индекс по user_id — обратный запрос "группы пользователя"
 group_members = Table(
     'group_members',
     Base.metadata,
-    Column('group_id', Integer, ForeignKey('groups.id', ondelete='CASCADE')),
-    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'))
+    Column('group_id', Integer, ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
 )
 
 class Group(Base):
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, Enum, ForeignKey
+import enum
+
+from .base import Base
+
+class MembershipAction(enum.Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+
+class MembershipEvent(Base):
+    """Append-only log of chat membership changes, read by /sync."""
+    __tablename__ = "membership_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    action = Column(Enum(MembershipAction), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
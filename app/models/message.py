@@ -1,18 +1,41 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, Computed, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from .base import Base
 
+# Конфигурация полнотекстового поиска: 'simple' без стемминга, подходит для любого языка
+SEARCH_CONFIG = "simple"
+
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of chat history: WHERE chat_id = ? AND id < ? ORDER BY id
+        Index("ix_messages_chat_id_id", "chat_id", "id"),
+        # Полнотекстовый поиск по тексту сообщений
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+        # Помесячные партиции создает app.core.database.partitions
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Ключ партиционирования обязан входить в первичный ключ
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     chat_id = Column(Integer, ForeignKey("chats.id"))
     sender_id = Column(Integer, ForeignKey("users.id"))
     text = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(
+        DateTime,
+        primary_key=True,
+        default=datetime.utcnow,
+        server_default=func.timezone("utc", func.now())
+    )
     is_read = Column(Boolean, default=False)
+    # Вычисляется в Postgres; отложенная колонка, обычные запросы ее не читают
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(text, ''))", persisted=True)
+    ))
 
     # Relationships
     chat = relationship("Chat", back_populates="messages")
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, Sequence
+
+from .base import Base
+
+# Global change counter for read cursors, used by /sync
+read_cursor_seq = Sequence("read_cursors_seq")
+
+class ReadCursor(Base):
+    __tablename__ = "read_cursors"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True)
+    last_read_message_id = Column(Integer, nullable=False, default=0)
+    # chats.message_count at last_read_message_id; unread = message_count - read_count
+    read_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped on every cursor move; clients sync changes with seq greater than their cursor
+    seq = Column(BigInteger, read_cursor_seq, nullable=False, index=True)
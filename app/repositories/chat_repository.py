@@ -1,19 +1,141 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.chat import Chat, ChatType
-from app.models.group import Group
+from datetime import datetime
+from sqlalchemy import Row, select, union, update, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from typing import Iterable, Optional, Set, Tuple
+from app.models.chat import Chat, ChatType, chat_participants
+from app.models.group import Group, group_members
+from app.models.message import Message
+from app.models.read_cursor import ReadCursor
+from app.models.membership_event import MembershipAction
+from app.models.user import User
+from app.repositories.membership_event_repository import MembershipEventRepository
+from app.core.database.unit_of_work import after_commit, commit
+from app.core.access_cache import access_cache
 
 class ChatRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create(self, name: str = None, type: ChatType = ChatType.PRIVATE) -> Chat:
-        chat = Chat(name=name, type=type)
-        self.db.add(chat)
-        await self.db.commit()
-        await self.db.refresh(chat)
+    async def create(self, name: str = None, type: ChatType = ChatType.PRIVATE) -> Row:
+        # Строка целиком приходит из INSERT ... RETURNING, без ORM-объекта
+        result = await self.db.execute(
+            insert(Chat.__table__)
+            .values(name=name, type=type)
+            .returning(*Chat.__table__.c)
+        )
+        chat = result.one()
+        await commit(self.db)
         return chat
 
+    async def add_participants(self, chat_id: int, user_ids: Iterable[int]):
+        values = [{"chat_id": chat_id, "user_id": user_id} for user_id in set(user_ids)]
+        if not values:
+            return
+        result = await self.db.execute(
+            insert(chat_participants).values(values)
+            .on_conflict_do_nothing()
+            .returning(chat_participants.c.user_id)
+        )
+        # В журнал попадают только действительно добавленные участники
+        await MembershipEventRepository(self.db).record(
+            chat_id, result.scalars().all(), MembershipAction.ADDED
+        )
+        await commit(self.db)
+        # Закэшированные отказы новым участникам больше не действуют
+        after_commit(self.db, lambda: access_cache.invalidate_chat(chat_id))
+
+    async def get_member_ids(self, chat_id: int) -> Set[int]:
+        # Участники группы и участники приватного чата одним запросом
+        result = await self.db.execute(
+            union(
+                select(group_members.c.user_id)
+                .join(Group, Group.id == group_members.c.group_id)
+                .where(Group.chat_id == chat_id),
+                select(chat_participants.c.user_id)
+                .where(chat_participants.c.chat_id == chat_id)
+            )
+        )
+        return set(result.scalars().all())
+
+    @staticmethod
+    def user_chat_ids_query(user_id: int):
+        """Запрос id всех чатов пользователя: групп и приватных чатов (колонка chat_id)."""
+        return union(
+            select(Group.chat_id.label("chat_id"))
+            .join(group_members, group_members.c.group_id == Group.id)
+            .where(group_members.c.user_id == user_id),
+            select(chat_participants.c.chat_id.label("chat_id"))
+            .where(chat_participants.c.user_id == user_id)
+        )
+
+    async def get_inbox(
+        self,
+        user_id: int,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> list:
+        """Чаты пользователя по убыванию последней активности одним запросом.
+
+        Последнее сообщение берется по сводке в chats (last_message_id/at),
+        поэтому на каждый чат приходится один поиск по первичному ключу
+        messages в одной партиции. before — (last_activity_at, id) последнего
+        чата предыдущей страницы.
+        """
+        chat_ids = self.user_chat_ids_query(user_id).subquery()
+        activity = func.coalesce(Chat.last_message_at, Chat.created_at)
+        query = (
+            select(
+                Chat.id,
+                Chat.name,
+                Chat.type,
+                Chat.created_at,
+                activity.label("last_activity_at"),
+                Message.id.label("last_message_id"),
+                Message.text.label("last_message_text"),
+                Message.timestamp.label("last_message_at"),
+                Message.sender_id.label("last_message_sender_id"),
+                User.username.label("last_message_sender_username"),
+                func.greatest(
+                    Chat.message_count - func.coalesce(ReadCursor.read_count, 0),
+                    0
+                ).label("unread_count")
+            )
+            .join(chat_ids, chat_ids.c.chat_id == Chat.id)
+            .outerjoin(
+                Message,
+                (Message.id == Chat.last_message_id) &
+                (Message.timestamp == Chat.last_message_at)
+            )
+            .outerjoin(User, User.id == Message.sender_id)
+            .outerjoin(
+                ReadCursor,
+                (ReadCursor.chat_id == Chat.id) & (ReadCursor.user_id == user_id)
+            )
+        )
+        if before is not None:
+            query = query.where(tuple_(activity, Chat.id) < tuple_(*before))
+        result = await self.db.execute(
+            query.order_by(activity.desc(), Chat.id.desc()).limit(limit)
+        )
+        return result.mappings().all()
+
+    async def reconcile_message_counts(self) -> int:
+        """Пересчитывает chats.message_count по таблице messages. Возвращает число исправленных чатов."""
+        actual = (
+            select(func.count(Message.id))
+            .where(Message.chat_id == Chat.id)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(Chat)
+            .where(Chat.message_count != actual)
+            .values(message_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        await commit(self.db)
+        return result.rowcount
+
     async def get_by_id(self, chat_id: int) -> Chat:
         result = await self.db.execute(
             select(Chat).where(Chat.id == chat_id)
@@ -21,14 +143,39 @@ class ChatRepository:
         return result.scalar_one_or_none()
 
     async def has_access(self, chat_id: int, user_id: int) -> bool:
-        chat = await self.get_by_id(chat_id)
-        if not chat:
-            return False
-
-        if chat.type == ChatType.GROUP:
-            # Для группового чата проверяем, является ли пользователь членом группы
-            return await self.is_group_member(chat_id, user_id)
-        return True  # Для приватного чата всегда разрешаем доступ
+        """Проверка доступа к чату любого типа одним запросом EXISTS."""
+        # Групповой чат доступен членам группы, приватный — его участникам
+        is_member = (
+            select(group_members.c.user_id)
+            .join(Group, Group.id == group_members.c.group_id)
+            .where(
+                (Group.chat_id == Chat.id) &
+                (group_members.c.user_id == user_id)
+            )
+            .exists()
+        )
+        is_participant = (
+            select(chat_participants.c.user_id)
+            .where(
+                (chat_participants.c.chat_id == Chat.id) &
+                (chat_participants.c.user_id == user_id)
+            )
+            .exists()
+        )
+        result = await self.db.execute(
+            select(
+                select(Chat.id)
+                .where(
+                    (Chat.id == chat_id) &
+                    (
+                        ((Chat.type == ChatType.GROUP) & is_member) |
+                        ((Chat.type != ChatType.GROUP) & is_participant)
+                    )
+                )
+                .exists()
+            )
+        )
+        return bool(result.scalar())
 
     async def is_group_member(self, chat_id: int, user_id: int) -> bool:
         result = await self.db.execute(
@@ -37,4 +184,4 @@ class ChatRepository:
             .join(Group.members)
             .where(Group.members.any(id=user_id))
         )
-        return result.scalar_one_or_none() is not None 
\ No newline at end of file
+        return result.scalar_one_or_none() is not None
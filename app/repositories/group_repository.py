@@ -1,17 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert
+from sqlalchemy import Row, select, literal, bindparam, any_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from typing import Iterable, List
 from app.models.group import Group, group_members
 from app.models.user import User
+from app.models.membership_event import MembershipAction
+from app.repositories.membership_event_repository import MembershipEventRepository
+from app.core.membership import membership_index
+from app.core.access_cache import access_cache
+from app.core.database.unit_of_work import commit, after_commit
 
 class GroupRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create(self, chat_id: int, name: str, creator_id: int) -> Group:
-        group = Group(chat_id=chat_id, name=name, creator_id=creator_id)
-        self.db.add(group)
-        await self.db.commit()
-        await self.db.refresh(group)
+    async def create(self, chat_id: int, name: str, creator_id: int) -> Row:
+        # Строка целиком приходит из INSERT ... RETURNING, без ORM-объекта
+        result = await self.db.execute(
+            insert(Group.__table__)
+            .values(chat_id=chat_id, name=name, creator_id=creator_id)
+            .returning(*Group.__table__.c)
+        )
+        group = result.one()
+        await commit(self.db)
         return group
 
     async def get_by_id(self, group_id: int) -> Group:
@@ -23,27 +34,69 @@ class GroupRepository:
     async def add_member(self, group_id: int, user_id: int) -> Group:
         group = await self.get_by_id(group_id)
         if group:
-            # Прямая вставка в таблицу связи
-            await self.db.execute(
-                insert(group_members).values(
-                    group_id=group_id,
-                    user_id=user_id
-                )
-            )
-            await self.db.commit()
-            await self.db.refresh(group)
+            await self.add_members(group, [user_id])
         return group
 
     async def remove_member(self, group_id: int, user_id: int) -> Group:
         group = await self.get_by_id(group_id)
         if group:
-            # Прямое удаление из таблицы связи
-            await self.db.execute(
-                group_members.delete().where(
-                    (group_members.c.group_id == group_id) &
-                    (group_members.c.user_id == user_id)
-                )
+            await self.remove_members(group, [user_id])
+        return group
+
+    async def add_members(self, group, user_ids: Iterable[int]) -> List[int]:
+        """Добавляет пользователей в группу одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Id передаются одним параметром-массивом, поэтому размер пачки не
+        упирается в лимит параметров запроса. Несуществующие пользователи
+        и уже состоящие в группе пропускаются. Возвращает id добавленных.
+        """
+        ids = sorted(set(user_ids))
+        if not ids:
+            return []
+        result = await self.db.execute(
+            insert(group_members)
+            .from_select(
+                ["group_id", "user_id"],
+                select(literal(group.id, Integer), User.id)
+                .where(User.id == any_(self._ids_param(ids)))
+            )
+            .on_conflict_do_nothing()
+            .returning(group_members.c.user_id)
+        )
+        added = list(result.scalars().all())
+        await MembershipEventRepository(self.db).record(
+            group.chat_id, added, MembershipAction.ADDED
+        )
+        await commit(self.db)
+        after_commit(self.db, lambda: self._invalidate(group.chat_id))
+        return added
+
+    async def remove_members(self, group, user_ids: Iterable[int]) -> List[int]:
+        """Удаляет пользователей из группы одним DELETE. Возвращает id удаленных."""
+        ids = sorted(set(user_ids))
+        if not ids:
+            return []
+        result = await self.db.execute(
+            group_members.delete()
+            .where(
+                (group_members.c.group_id == group.id) &
+                (group_members.c.user_id == any_(self._ids_param(ids)))
             )
-            await self.db.commit()
-            await self.db.refresh(group)
-        return group 
+            .returning(group_members.c.user_id)
+        )
+        removed = list(result.scalars().all())
+        await MembershipEventRepository(self.db).record(
+            group.chat_id, removed, MembershipAction.REMOVED
+        )
+        await commit(self.db)
+        after_commit(self.db, lambda: self._invalidate(group.chat_id))
+        return removed
+
+    @staticmethod
+    def _ids_param(ids: List[int]):
+        return bindparam("user_ids", ids, type_=ARRAY(Integer))
+
+    @staticmethod
+    def _invalidate(chat_id: int):
+        membership_index.invalidate(chat_id)
+        access_cache.invalidate_chat(chat_id)
@@ -0,0 +1,62 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, func
+from datetime import datetime
+from typing import Iterable
+from app.models.membership_event import MembershipEvent, MembershipAction
+
+class MembershipEventRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(self, chat_id: int, user_ids: Iterable[int], action: MembershipAction):
+        """Пишет события в журнал в текущей транзакции; commit делает вызывающий."""
+        values = [
+            {"chat_id": chat_id, "user_id": user_id, "action": action}
+            for user_id in user_ids
+        ]
+        if values:
+            await self.db.execute(insert(MembershipEvent), values)
+
+    async def get_since(self, user_id: int, chat_ids, after_id: int, limit: int) -> list:
+        """События после after_id в чатах пользователя и о нем самом.
+
+        События о самом пользователе нужны, чтобы он узнал об исключении
+        из чата, которого уже нет в chat_ids.
+        """
+        return await self._select(
+            (MembershipEvent.id > after_id) & self._visible_to(user_id, chat_ids),
+            limit
+        )
+
+    async def get_late(self, user_id: int, chat_ids, up_to_id: int, written_since: datetime, limit: int) -> list:
+        """События с id <= up_to_id, записанные не раньше written_since: их транзакции
+        могли зафиксироваться после выдачи событий с большими id."""
+        return await self._select(
+            (MembershipEvent.id <= up_to_id) &
+            (MembershipEvent.created_at >= written_since) &
+            self._visible_to(user_id, chat_ids),
+            limit
+        )
+
+    @staticmethod
+    def _visible_to(user_id: int, chat_ids):
+        return (MembershipEvent.user_id == user_id) | MembershipEvent.chat_id.in_(chat_ids)
+
+    async def _select(self, condition, limit: int) -> list:
+        result = await self.db.execute(
+            select(
+                MembershipEvent.id,
+                MembershipEvent.chat_id,
+                MembershipEvent.user_id,
+                MembershipEvent.action,
+                MembershipEvent.created_at
+            )
+            .where(condition)
+            .order_by(MembershipEvent.id)
+            .limit(limit)
+        )
+        return result.mappings().all()
+
+    async def get_last_id(self) -> int:
+        result = await self.db.execute(select(func.coalesce(func.max(MembershipEvent.id), 0)))
+        return result.scalar_one()
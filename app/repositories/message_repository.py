@@ -1,22 +1,88 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.message import Message
+from collections import Counter
+from sqlalchemy import Row, select, insert, update, bindparam, case, func, tuple_, literal, cast, REAL
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+from app.models.chat import Chat
+from app.models.message import Message, SEARCH_CONFIG
+from app.repositories.chat_repository import ChatRepository
+from app.core.database.partitions import month_start
+from app.core.settings import settings
+from app.core.database.unit_of_work import commit
+
+# Параметры подсветки совпадений в сниппетах
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2"
+
+# Колонки, возвращаемые при записи: все, кроме вычисляемого search_vector
+MESSAGE_COLUMNS = tuple(
+    column for column in Message.__table__.c if column.name != "search_vector"
+)
 
 class MessageRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create(self, chat_id: int, sender_id: int, text: str) -> Message:
-        message = Message(
-            chat_id=chat_id,
-            sender_id=sender_id,
-            text=text
+    async def create(self, chat_id: int, sender_id: int, text: str) -> Row:
+        # Один INSERT ... RETURNING без ORM-объекта: id и timestamp нужны для сводки чата
+        result = await self.db.execute(
+            insert(Message.__table__)
+            .values(chat_id=chat_id, sender_id=sender_id, text=text)
+            .returning(*MESSAGE_COLUMNS)
         )
-        self.db.add(message)
-        await self.db.commit()
-        await self.db.refresh(message)
+        message = result.one()
+        await self._update_chat_summaries([message])
+        await commit(self.db)
         return message
 
+    async def create_many(self, messages: List[dict]) -> list:
+        """Вставляет пачку сообщений одним INSERT ... RETURNING и одним commit.
+
+        Строки результата возвращаются в порядке входных данных.
+        """
+        result = await self.db.execute(
+            insert(Message).returning(*MESSAGE_COLUMNS, sort_by_parameter_order=True),
+            messages
+        )
+        rows = result.all()
+        await self._update_chat_summaries(rows)
+        await commit(self.db)
+        return rows
+
+    async def _update_chat_summaries(self, messages: list):
+        """Обновляет счетчик и последнее сообщение чатов одним UPDATE на пачку.
+
+        Счетчик нужен для подсчета непрочитанных без COUNT(*), последнее
+        сообщение — для списка чатов без поиска по messages.
+        """
+        counts = Counter(message.chat_id for message in messages)
+        latest = {}
+        for message in messages:
+            current = latest.get(message.chat_id)
+            if current is None or message.id > current.id:
+                latest[message.chat_id] = message
+        # id и время последнего сообщения берутся из одной строки: сводка
+        # меняется только на более новое сообщение и не откатывается при гонке писателей
+        is_newer = bindparam("b_last_id") > func.coalesce(Chat.last_message_id, 0)
+        await self.db.execute(
+            update(Chat.__table__)
+            .where(Chat.id == bindparam("b_chat_id"))
+            .values(
+                message_count=Chat.message_count + bindparam("b_count"),
+                last_message_id=case((is_newer, bindparam("b_last_id")), else_=Chat.last_message_id),
+                last_message_at=case((is_newer, bindparam("b_last_at")), else_=Chat.last_message_at)
+            ),
+            [
+                {
+                    "b_chat_id": chat_id,
+                    "b_count": count,
+                    "b_last_id": latest[chat_id].id,
+                    "b_last_at": latest[chat_id].timestamp
+                }
+                for chat_id, count in counts.items()
+            ]
+        )
+
     async def get_by_id(self, message_id: int) -> Message:
         result = await self.db.execute(
             select(Message).where(Message.id == message_id)
@@ -38,10 +104,225 @@ class MessageRepository:
         )
         return result.scalars().all()
 
-    async def mark_as_read(self, message_id: int) -> Message:
-        message = await self.get_by_id(message_id)
+    async def get_chat_messages_page(
+        self,
+        chat_id: int,
+        limit: int = 50,
+        before_id: int = None,
+        after_id: int = None,
+        before_ts: Optional[datetime] = None,
+        after_ts: Optional[datetime] = None
+    ) -> list[Message]:
+        """Страница истории по ключу (chat_id, id) в порядке возрастания id.
+
+        С after_id возвращает сообщения новее after_id, иначе — самые новые
+        сообщения старше before_id (или самые последние, если он не задан).
+        before_ts/after_ts — время сообщения-курсора: по нему Postgres
+        отбрасывает партиции, в которых соседних сообщений быть не может.
+        """
+        skew = timedelta(seconds=settings.MESSAGE_TIMESTAMP_SKEW_SECONDS)
+        query = select(Message).where(Message.chat_id == chat_id)
+        if after_id is not None:
+            query = query.where(Message.id > after_id)
+            if after_ts is not None:
+                query = query.where(Message.timestamp >= after_ts - skew)
+            result = await self.db.execute(query.order_by(Message.id).limit(limit))
+            return result.scalars().all()
+
+        if before_id is not None:
+            query = query.where(Message.id < before_id)
+        if before_ts is not None:
+            query = query.where(Message.timestamp <= before_ts + skew)
+
+        # Сначала читаем только партицию месяца курсора: у активных чатов
+        # страница почти всегда целиком в ней
+        boundary = month_start(before_ts or datetime.utcnow()) - skew
+        result = await self.db.execute(
+            query.where(Message.timestamp >= boundary)
+            .order_by(Message.id.desc())
+            .limit(limit)
+        )
+        messages = result.scalars().all()
+        # Более старые строки не могут обогнать страницу по id, если она
+        # полная и все ее сообщения новее границы больше чем на skew
+        if len(messages) == limit and all(
+            message.timestamp >= boundary + skew for message in messages
+        ):
+            return list(reversed(messages))
+
+        result = await self.db.execute(
+            query.where(Message.timestamp < boundary)
+            .order_by(Message.id.desc())
+            .limit(limit)
+        )
+        older = result.scalars().all()
+        messages = sorted([*messages, *older], key=lambda message: message.id)
+        return messages[-limit:]
+
+    async def stream_chat_messages(
+        self,
+        chat_id: int,
+        batch_size: int = 1000,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> AsyncIterator[list]:
+        """Отдает историю чата пачками строк через серверный курсор.
+
+        Память не зависит от размера чата: в ней одновременно не больше batch_size строк.
+        С since/until читаются только партиции этого периода.
+        """
+        query = self._in_period(
+            select(
+                Message.id,
+                Message.chat_id,
+                Message.sender_id,
+                Message.text,
+                Message.timestamp,
+                Message.is_read
+            ).where(Message.chat_id == chat_id),
+            since,
+            until
+        )
+        result = await self.db.stream(
+            query.order_by(Message.id).execution_options(yield_per=batch_size)
+        )
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def search(
+        self,
+        query_text: str,
+        limit: int = 20,
+        chat_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        after: Optional[Tuple[float, int]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> list:
+        """Полнотекстовый поиск сообщений по релевантности.
+
+        Ищет в одном чате (chat_id) или во всех чатах пользователя (user_id).
+        Страницы по ключу (rank, id): after — позиция последнего результата
+        предыдущей страницы. Сниппеты строятся только для строк страницы.
+        since/until ограничивают поиск партициями нужного периода.
+        """
+        config = literal(SEARCH_CONFIG, REGCONFIG)
+        tsquery = func.websearch_to_tsquery(config, query_text)
+        rank = cast(func.ts_rank_cd(Message.search_vector, tsquery), REAL).label("rank")
+
+        page = select(
+            Message.id,
+            Message.chat_id,
+            Message.sender_id,
+            Message.timestamp,
+            Message.text,
+            rank
+        ).where(Message.search_vector.op("@@")(tsquery))
+        if chat_id is not None:
+            page = page.where(Message.chat_id == chat_id)
+        if user_id is not None:
+            page = page.where(
+                Message.chat_id.in_(ChatRepository.user_chat_ids_query(user_id))
+            )
+        page = self._in_period(page, since, until)
+        if after is not None:
+            after_rank, after_id = after
+            page = page.where(
+                tuple_(rank, Message.id) < tuple_(cast(after_rank, REAL), after_id)
+            )
+        page = page.order_by(rank.desc(), Message.id.desc()).limit(limit).subquery()
+
+        result = await self.db.execute(
+            select(
+                page.c.id,
+                page.c.chat_id,
+                page.c.sender_id,
+                page.c.timestamp,
+                page.c.rank,
+                func.ts_headline(
+                    config,
+                    page.c.text,
+                    tsquery,
+                    literal(HEADLINE_OPTIONS)
+                ).label("snippet")
+            ).order_by(page.c.rank.desc(), page.c.id.desc())
+        )
+        return result.mappings().all()
+
+    async def get_user_messages_since(
+        self,
+        user_id: int,
+        after_id: int,
+        after_ts: Optional[datetime] = None,
+        limit: int = 500
+    ) -> list[Message]:
+        """Новые сообщения во всех чатах пользователя после after_id по порядку id.
+
+        after_ts — время сообщения after_id: более ранние партиции не читаются.
+        """
+        query = select(Message).where(
+            (Message.id > after_id) &
+            Message.chat_id.in_(ChatRepository.user_chat_ids_query(user_id))
+        )
+        if after_ts is not None:
+            skew = timedelta(seconds=settings.MESSAGE_TIMESTAMP_SKEW_SECONDS)
+            query = query.where(Message.timestamp >= after_ts - skew)
+        result = await self.db.execute(query.order_by(Message.id).limit(limit))
+        return result.scalars().all()
+
+    async def get_late_user_messages(
+        self,
+        user_id: int,
+        up_to_id: int,
+        written_since: datetime,
+        limit: int = 500
+    ) -> list[Message]:
+        """Сообщения с id <= up_to_id, записанные не раньше written_since.
+
+        Транзакция, получившая меньший id, может зафиксироваться после выдачи
+        более новых сообщений; такие сообщения находятся только перечитыванием
+        недавнего окна. Уже выданные сообщения из окна возвращаются повторно.
+        """
+        result = await self.db.execute(
+            select(Message)
+            .where(
+                (Message.id <= up_to_id) &
+                (Message.timestamp >= written_since) &
+                Message.chat_id.in_(ChatRepository.user_chat_ids_query(user_id))
+            )
+            .order_by(Message.id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_latest_position(self) -> Tuple[int, Optional[datetime]]:
+        """(id, timestamp) самого нового сообщения или (0, None) для пустой таблицы."""
+        result = await self.db.execute(
+            select(Message.id, Message.timestamp).order_by(Message.id.desc()).limit(1)
+        )
+        row = result.first()
+        if row is None:
+            return 0, None
+        return row.id, row.timestamp
+
+    @staticmethod
+    def _in_period(query, since: Optional[datetime], until: Optional[datetime]):
+        # Условия на ключ партиционирования позволяют Postgres пропускать партиции
+        if since is not None:
+            query = query.where(Message.timestamp >= since)
+        if until is not None:
+            query = query.where(Message.timestamp < until)
+        return query
+
+    async def mark_as_read(self, message_id: int) -> Optional[Row]:
+        # Один UPDATE ... RETURNING вместо чтения и записи объекта
+        result = await self.db.execute(
+            update(Message.__table__)
+            .where(Message.__table__.c.id == message_id)
+            .values(is_read=True)
+            .returning(*MESSAGE_COLUMNS)
+        )
+        message = result.one_or_none()
         if message:
-            message.is_read = True
-            await self.db.commit()
-            await self.db.refresh(message)
+            await commit(self.db)
         return message 
\ No newline at end of file
@@ -0,0 +1,158 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
+from typing import List
+from app.models.chat import Chat
+from app.models.message import Message
+from app.models.read_cursor import ReadCursor, read_cursor_seq
+from app.repositories.chat_repository import ChatRepository
+from app.core.database.unit_of_work import commit
+
+class ReadCursorRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, user_id: int, chat_id: int) -> ReadCursor:
+        result = await self.db.execute(
+            select(ReadCursor).where(
+                (ReadCursor.user_id == user_id) &
+                (ReadCursor.chat_id == chat_id)
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def advance_many(self, cursors: List[dict]):
+        """Сдвигает курсоры прочтения одним upsert.
+
+        cursors — словари с user_id, chat_id и last_read_message_id.
+        Курсор только растет: меньший message_id не перезаписывает больший.
+        """
+        if not cursors:
+            return
+        now = datetime.utcnow()
+        stmt = insert(ReadCursor).values([
+            {
+                **cursor,
+                "read_count": self._read_count(cursor["chat_id"], cursor["last_read_message_id"]),
+                "updated_at": now,
+                "seq": read_cursor_seq.next_value()
+            }
+            for cursor in cursors
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ReadCursor.user_id, ReadCursor.chat_id],
+            set_={
+                "last_read_message_id": stmt.excluded.last_read_message_id,
+                "read_count": stmt.excluded.read_count,
+                "updated_at": stmt.excluded.updated_at,
+                "seq": stmt.excluded.seq
+            },
+            where=ReadCursor.last_read_message_id < stmt.excluded.last_read_message_id
+        )
+        await self.db.execute(stmt)
+        await commit(self.db)
+
+    async def get_unread_counts(self, user_id: int) -> list:
+        """Непрочитанные по всем чатам пользователя из счетчиков, без COUNT(*) по messages."""
+        chat_ids = ChatRepository.user_chat_ids_query(user_id).subquery()
+        result = await self.db.execute(
+            select(
+                Chat.id.label("chat_id"),
+                func.greatest(
+                    Chat.message_count - func.coalesce(ReadCursor.read_count, 0),
+                    0
+                ).label("unread_count")
+            )
+            .join(chat_ids, chat_ids.c.chat_id == Chat.id)
+            .outerjoin(
+                ReadCursor,
+                (ReadCursor.chat_id == Chat.id) & (ReadCursor.user_id == user_id)
+            )
+            .order_by(Chat.id)
+        )
+        return result.all()
+
+    async def get_changes_since(self, user_id: int, after_seq: int, limit: int) -> list:
+        """Сдвиги курсоров прочтения во всех чатах пользователя после after_seq по порядку seq."""
+        chat_ids = ChatRepository.user_chat_ids_query(user_id)
+        result = await self.db.execute(
+            select(
+                ReadCursor.user_id,
+                ReadCursor.chat_id,
+                ReadCursor.last_read_message_id,
+                ReadCursor.updated_at,
+                ReadCursor.seq
+            )
+            .where(
+                (ReadCursor.seq > after_seq) &
+                ReadCursor.chat_id.in_(chat_ids)
+            )
+            .order_by(ReadCursor.seq)
+            .limit(limit)
+        )
+        return result.mappings().all()
+
+    async def get_late_changes(self, user_id: int, up_to_seq: int, written_since: datetime, limit: int) -> list:
+        """Сдвиги курсоров с seq <= up_to_seq, записанные не раньше written_since.
+
+        seq выдается при записи, а не при commit: сдвиг с меньшим seq может
+        стать видимым после выдачи более новых.
+        """
+        chat_ids = ChatRepository.user_chat_ids_query(user_id)
+        result = await self.db.execute(
+            select(
+                ReadCursor.user_id,
+                ReadCursor.chat_id,
+                ReadCursor.last_read_message_id,
+                ReadCursor.updated_at,
+                ReadCursor.seq
+            )
+            .where(
+                (ReadCursor.seq <= up_to_seq) &
+                (ReadCursor.updated_at >= written_since) &
+                ReadCursor.chat_id.in_(chat_ids)
+            )
+            .order_by(ReadCursor.seq)
+            .limit(limit)
+        )
+        return result.mappings().all()
+
+    async def get_last_seq(self) -> int:
+        result = await self.db.execute(select(func.coalesce(func.max(ReadCursor.seq), 0)))
+        return result.scalar_one()
+
+    async def reconcile_read_counts(self) -> int:
+        """Пересчитывает read_count по таблице messages. Возвращает число исправленных курсоров."""
+        actual = (
+            select(func.count(Message.id))
+            .where(
+                (Message.chat_id == ReadCursor.chat_id) &
+                (Message.id <= ReadCursor.last_read_message_id)
+            )
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(ReadCursor)
+            .where(ReadCursor.read_count != actual)
+            # updated_at не трогаем: починка счетчика не является изменением курсора
+            .values(read_count=actual, updated_at=ReadCursor.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await commit(self.db)
+        return result.rowcount
+
+    @staticmethod
+    def _read_count(chat_id: int, message_id: int):
+        # Прочитано = все сообщения чата минус сообщения после курсора.
+        # Сообщений после курсора обычно немного, поэтому подзапрос дешевый
+        newer = (
+            select(func.count(Message.id))
+            .where((Message.chat_id == chat_id) & (Message.id > message_id))
+            .scalar_subquery()
+        )
+        return (
+            select(Chat.message_count - newer)
+            .where(Chat.id == chat_id)
+            .scalar_subquery()
+        )
@@ -1,20 +1,22 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Row, select, insert, update
 from app.models.user import User
+from app.core.database.unit_of_work import commit, after_commit
+from app.core.auth_cache import auth_cache
 
 class UserRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create(self, username: str, email: str, hashed_password: str) -> User:
-        user = User(
-            username=username,
-            email=email,
-            hashed_password=hashed_password
+    async def create(self, username: str, email: str, hashed_password: str) -> Row:
+        # Строка целиком приходит из INSERT ... RETURNING, без ORM-объекта
+        result = await self.db.execute(
+            insert(User.__table__)
+            .values(username=username, email=email, hashed_password=hashed_password)
+            .returning(*User.__table__.c)
         )
-        self.db.add(user)
-        await self.db.commit()
-        await self.db.refresh(user)
+        user = result.one()
+        await commit(self.db)
         return user
 
     async def get_by_username(self, username: str) -> User:
@@ -33,4 +35,14 @@ class UserRepository:
         result = await self.db.execute(
             select(User).where(User.id == user_id)
         )
-        return result.scalar_one_or_none() 
\ No newline at end of file
+        return result.scalar_one_or_none()
+
+    async def update_password_hash(self, user_id: int, hashed_password: str):
+        await self.db.execute(
+            update(User.__table__)
+            .where(User.__table__.c.id == user_id)
+            .values(hashed_password=hashed_password)
+        )
+        await commit(self.db)
+        # Пользователь изменился: выданные токены проверяются заново
+        after_commit(self.db, lambda: auth_cache.invalidate_user(user_id))
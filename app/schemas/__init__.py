@@ -1,13 +1,15 @@
 from .user import User, UserCreate, UserBase
-from .chat import Chat, ChatCreate, ChatBase
-from .message import Message, MessageCreate, MessageBase
-from .group import Group, GroupCreate, GroupBase
+from .chat import Chat, ChatCreate, ChatBase, InboxChat, UnreadCount
+from .message import Message, MessageCreate, MessageBase, MessageSearchResult
+from .group import Group, GroupCreate, GroupBase, GroupMembersUpdate, GroupMembersChange
 from .auth import Token, TokenData
+from .sync import SyncPage, ReadCursorChange, MembershipChange
 
 __all__ = [
     'User', 'UserCreate', 'UserBase',
-    'Chat', 'ChatCreate', 'ChatBase',
-    'Message', 'MessageCreate', 'MessageBase',
-    'Group', 'GroupCreate', 'GroupBase',
-    'Token', 'TokenData'
+    'Chat', 'ChatCreate', 'ChatBase', 'InboxChat', 'UnreadCount',
+    'Message', 'MessageCreate', 'MessageBase', 'MessageSearchResult',
+    'Group', 'GroupCreate', 'GroupBase', 'GroupMembersUpdate', 'GroupMembersChange',
+    'Token', 'TokenData',
+    'SyncPage', 'ReadCursorChange', 'MembershipChange'
 ] 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from app.models.chat import ChatType
 
 class ChatBase(BaseModel):
@@ -8,11 +8,32 @@ class ChatBase(BaseModel):
     type: ChatType
 
 class ChatCreate(ChatBase):
-    pass
+    participant_ids: List[int] = []
 
 class Chat(ChatBase):
     id: int
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class InboxChat(ChatBase):
+    id: int
+    created_at: datetime
+    last_activity_at: datetime
+    last_message_id: Optional[int] = None
+    last_message_text: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    last_message_sender_id: Optional[int] = None
+    last_message_sender_username: Optional[str] = None
+    unread_count: int
+
+    class Config:
+        from_attributes = True
+
+class UnreadCount(BaseModel):
+    chat_id: int
+    unread_count: int
+
+    class Config:
+        from_attributes = True
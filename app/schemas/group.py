@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List
 from .user import User
+from app.core.settings import settings
 
 class GroupBase(BaseModel):
     name: str
@@ -16,4 +17,12 @@ class Group(GroupBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class GroupMembersUpdate(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=settings.GROUP_MEMBERS_BATCH_LIMIT)
+
+class GroupMembersChange(BaseModel):
+    group_id: int
+    # Только пользователи, чье членство действительно изменилось
+    user_ids: List[int]
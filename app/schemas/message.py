@@ -15,4 +15,15 @@ class Message(MessageBase):
     is_read: bool
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class MessageSearchResult(BaseModel):
+    id: int
+    chat_id: int
+    sender_id: int
+    timestamp: datetime
+    rank: float
+    snippet: str
+
+    class Config:
+        from_attributes = True
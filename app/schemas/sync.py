@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+from app.models.membership_event import MembershipAction
+from app.schemas.message import Message
+
+class ReadCursorChange(BaseModel):
+    user_id: int
+    chat_id: int
+    last_read_message_id: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MembershipChange(BaseModel):
+    id: int
+    chat_id: int
+    user_id: int
+    action: MembershipAction
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SyncPage(BaseModel):
+    messages: List[Message]
+    read_cursors: List[ReadCursorChange]
+    membership: List[MembershipChange]
+    cursor: str
+    has_more: bool
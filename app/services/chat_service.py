@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import WebSocket, WebSocketDisconnect, HTTPException, status
-from typing import List
+from fastapi import HTTPException, status
+import zlib
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
 from app.models.user import User
-from app.models.chat import Chat, ChatType
+from app.models.chat import ChatType
 from app.models.group import Group
 from app.models.message import Message
 from app.schemas.chat import ChatCreate
@@ -10,7 +12,17 @@ from app.schemas.group import GroupCreate
 from app.repositories.chat_repository import ChatRepository
 from app.repositories.message_repository import MessageRepository
 from app.repositories.group_repository import GroupRepository
-from app.core.websocket_manager import manager
+from app.services.message_writer import message_writer
+from app.services.read_cursor_buffer import read_cursor_buffer, read_up_to_event
+from app.repositories.read_cursor_repository import ReadCursorRepository
+from app.core.websocket_manager import Connection, manager
+from app.core.database import AsyncSessionLocal
+from app.core.database.unit_of_work import UnitOfWork
+from app.core.settings import settings
+from app.core.pagination import Direction, encode_cursor
+from app.core.history_cache import history_cache
+from app.core.access_cache import access_cache
+from app.core import serialization
 
 class ChatService:
     def __init__(self, db: AsyncSession):
@@ -18,27 +30,60 @@ class ChatService:
         self.chat_repository = ChatRepository(db)
         self.message_repository = MessageRepository(db)
         self.group_repository = GroupRepository(db)
+        self.read_cursor_repository = ReadCursorRepository(db)
 
-    async def create_chat(self, chat_data: ChatCreate):
-        chat = await self.chat_repository.create(
-            name=chat_data.name,
-            type=chat_data.type
-        )
+    async def create_chat(self, chat_data: ChatCreate, current_user_id: int = None):
+        # Чат и его участники записываются одной транзакцией
+        async with UnitOfWork(self.db):
+            chat = await self.chat_repository.create(
+                name=chat_data.name,
+                type=chat_data.type
+            )
+
+            # Запоминаем участников чата для доставки сообщений
+            participant_ids = list(chat_data.participant_ids)
+            if current_user_id is not None:
+                participant_ids.append(current_user_id)
+            if participant_ids:
+                await self.chat_repository.add_participants(chat.id, participant_ids)
         return chat
 
     async def create_group(self, group_data: GroupCreate, current_user_id: int):
-        # Создаем чат для группы
-        chat = await self.chat_repository.create(type=ChatType.GROUP)
-
-        # Создаем группу
-        group = await self.group_repository.create(
-            chat_id=chat.id,
-            creator_id=current_user_id,
-            name=group_data.name
-        )
+        # Одна транзакция: при ошибке не остается чата без группы
+        async with UnitOfWork(self.db):
+            # Создаем чат для группы
+            chat = await self.chat_repository.create(type=ChatType.GROUP)
+
+            # Создаем группу
+            group = await self.group_repository.create(
+                chat_id=chat.id,
+                creator_id=current_user_id,
+                name=group_data.name
+            )
+
+            # Добавляем создателя в группу
+            await self.group_repository.add_members(group, [current_user_id])
+        return group
+
+    async def add_group_members(self, group_id: int, user_ids: List[int], current_user: User) -> List[int]:
+        async with UnitOfWork(self.db):
+            group = await self._get_group(group_id, current_user)
+            return await self.group_repository.add_members(group, user_ids)
 
-        # Добавляем создателя в группу
-        await self.group_repository.add_member(group.id, current_user_id)
+    async def remove_group_members(self, group_id: int, user_ids: List[int], current_user: User) -> List[int]:
+        async with UnitOfWork(self.db):
+            group = await self._get_group(group_id, current_user)
+            return await self.group_repository.remove_members(group, user_ids)
+
+    async def _get_group(self, group_id: int, current_user: User) -> Group:
+        # Менять состав группы могут только ее участники
+        group = await self.group_repository.get_by_id(group_id)
+        if group is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Group not found"
+            )
+        await self._ensure_access(group.chat_id, current_user)
         return group
 
     async def get_chat_history(
@@ -48,12 +93,7 @@ class ChatService:
         offset: int,
         current_user: User
     ) -> List[Message]:
-        # Проверяем доступ к чату
-        if not await self.chat_repository.has_access(chat_id, current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
+        await self._ensure_access(chat_id, current_user)
 
         return await self.message_repository.get_chat_messages(
             chat_id=chat_id,
@@ -61,41 +101,342 @@ class ChatService:
             offset=offset
         )
 
-    async def handle_websocket_connection(self, websocket: WebSocket, user_id: int):
-        await manager.connect(websocket, user_id)
-        try:
-            while True:
-                data = await websocket.receive_json()
-                
-                if data["type"] == "message":
-                    # Создаем сообщение
+    async def get_chat_history_page(
+        self,
+        chat_id: int,
+        limit: int,
+        current_user: User,
+        message_id: Optional[int] = None,
+        direction: Direction = Direction.BACKWARD,
+        message_ts: Optional[datetime] = None
+    ) -> Tuple[List[Message], Optional[str], Optional[str]]:
+        """Страница истории по курсору. Возвращает (сообщения, next_cursor, prev_cursor).
+
+        next_cursor продолжает листать в том же направлении, prev_cursor — в обратном.
+        message_ts — время сообщения-курсора, сужает запрос до нужных партиций.
+        """
+        await self._ensure_access(chat_id, current_user)
+
+        if direction == Direction.FORWARD:
+            messages = await self.message_repository.get_chat_messages_page(
+                chat_id=chat_id,
+                limit=limit,
+                after_id=message_id or 0,
+                after_ts=message_ts
+            )
+        else:
+            # Последние сообщения активных чатов отдаем из памяти без запроса к базе
+            messages = history_cache.get_latest(chat_id, limit, before_id=message_id)
+            if messages is None:
+                seeding = message_id is None
+                if seeding:
+                    # Сообщения, разосланные во время запроса, кэш дольет в затравку
+                    history_cache.begin_seed(chat_id)
+                try:
+                    messages = await self.message_repository.get_chat_messages_page(
+                        chat_id=chat_id,
+                        limit=limit,
+                        before_id=message_id,
+                        before_ts=message_ts
+                    )
+                except Exception:
+                    if seeding:
+                        history_cache.cancel_seed(chat_id)
+                    raise
+                if seeding:
+                    history_cache.seed(chat_id, messages, requested=limit)
+
+        if not messages:
+            prev_cursor = None
+            if message_id is not None:
+                prev_cursor = self._history_cursor(message_id, message_ts, self._opposite(direction))
+            return messages, None, prev_cursor
+
+        # Страница всегда упорядочена по возрастанию id
+        edges = {Direction.BACKWARD: messages[0], Direction.FORWARD: messages[-1]}
+        next_cursor = None
+        if len(messages) == limit:
+            edge = edges[direction]
+            next_cursor = self._history_cursor(edge.id, edge.timestamp, direction)
+        opposite = self._opposite(direction)
+        edge = edges[opposite]
+        prev_cursor = self._history_cursor(edge.id, edge.timestamp, opposite)
+        return messages, next_cursor, prev_cursor
+
+    @staticmethod
+    def _history_cursor(message_id: int, timestamp: Optional[datetime], direction: Direction) -> str:
+        position = {"id": message_id, "d": direction.value}
+        if timestamp is not None:
+            position["ts"] = timestamp.isoformat()
+        return encode_cursor(position)
+
+    async def export_chat_history(
+        self,
+        chat_id: int,
+        current_user: User,
+        compress: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
+        """Проверяет доступ и возвращает поток NDJSON (опционально gzip) с историей чата."""
+        await self._ensure_access(chat_id, current_user)
+        return self._export_chunks(chat_id, compress, since, until)
+
+    async def _export_chunks(
+        self,
+        chat_id: int,
+        compress: bool,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+        rows_stream = self.message_repository.stream_chat_messages(
+            chat_id, since=since, until=until
+        )
+        async for rows in rows_stream:
+            # Одна пачка строк курсора — один кусок ответа
+            chunk = b"".join(serialization.dumps(dict(row)) + b"\n" for row in rows)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+
+    async def search_chat_messages(
+        self,
+        chat_id: int,
+        query_text: str,
+        limit: int,
+        current_user: User,
+        after: Optional[Tuple[float, int]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[list, Optional[str]]:
+        """Поиск в одном чате. Возвращает (результаты, next_cursor)."""
+        await self._ensure_access(chat_id, current_user)
+        results = await self.message_repository.search(
+            query_text, limit, chat_id=chat_id, after=after, since=since, until=until
+        )
+        return results, self._search_cursor(results, limit)
+
+    async def search_messages(
+        self,
+        query_text: str,
+        limit: int,
+        current_user: User,
+        after: Optional[Tuple[float, int]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[list, Optional[str]]:
+        """Поиск по всем чатам, в которых состоит пользователь."""
+        results = await self.message_repository.search(
+            query_text, limit, user_id=current_user.id, after=after, since=since, until=until
+        )
+        return results, self._search_cursor(results, limit)
+
+    @staticmethod
+    def _search_cursor(results: list, limit: int) -> Optional[str]:
+        if len(results) < limit:
+            return None
+        last = results[-1]
+        return encode_cursor({"r": last["rank"], "id": last["id"]})
+
+    @staticmethod
+    def _opposite(direction: Direction) -> Direction:
+        if direction == Direction.FORWARD:
+            return Direction.BACKWARD
+        return Direction.FORWARD
+
+    async def has_access(self, chat_id: int, user_id: int) -> bool:
+        # Решения, включая отказы, кэшируются до изменения состава чата
+        allowed = access_cache.get(user_id, chat_id)
+        if allowed is None:
+            allowed = await self.chat_repository.has_access(chat_id, user_id)
+            access_cache.set(user_id, chat_id, allowed)
+        return allowed
+
+    async def _ensure_access(self, chat_id: int, current_user: User):
+        # Проверяем доступ к чату
+        if not await self.has_access(chat_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+
+    async def get_inbox(
+        self,
+        current_user: User,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> Tuple[list, Optional[str]]:
+        """Чаты пользователя по последней активности. Возвращает (чаты, next_cursor)."""
+        chats = await self.chat_repository.get_inbox(current_user.id, limit, before=before)
+        next_cursor = None
+        if len(chats) == limit:
+            last = chats[-1]
+            next_cursor = encode_cursor({"at": last["last_activity_at"].isoformat(), "id": last["id"]})
+        return chats, next_cursor
+
+    async def get_unread_counts(self, current_user: User) -> list:
+        return await self.read_cursor_repository.get_unread_counts(current_user.id)
+
+    async def handle_websocket_event(self, connection: Connection, data: dict):
+        """Обрабатывает одно событие от клиента.
+
+        Цикл чтения сокета ведет websocket_controller и создает сервис с новой
+        сессией на каждое событие, поэтому соединение с базой берется из пула
+        только на время обработки.
+        """
+        user_id = connection.user_id
+        if "chat_id" in data and not await self.has_access(data["chat_id"], user_id):
+            # Писать и отмечать прочтение можно только в доступных чатах
+            self._reply(connection, {
+                "type": "error",
+                "chat_id": data["chat_id"],
+                "detail": "Access denied"
+            })
+            return
+
+        if data["type"] == "message":
+            if message_writer.running:
+                # Пачку сообщений message_writer фиксирует в своей сессии,
+                # курсор отправителя сдвигается следом отдельной транзакцией
+                message = await message_writer.submit(
+                    chat_id=data["chat_id"],
+                    sender_id=user_id,
+                    text=data["text"]
+                )
+                async with UnitOfWork(self.db):
+                    # Свои сообщения не считаются непрочитанными
+                    read_event = await self._advance_read_cursor(user_id, message.chat_id, message.id)
+            else:
+                # Без message_writer сообщение и курсор отправителя фиксируются одной транзакцией
+                async with UnitOfWork(self.db):
                     message = await self.message_repository.create(
                         chat_id=data["chat_id"],
                         sender_id=user_id,
                         text=data["text"]
                     )
+                    read_event = await self._advance_read_cursor(user_id, message.chat_id, message.id)
+
+            # Отправляем сообщение всем участникам чата
+            await manager.send_message(self._message_event(message), message.chat_id)
+            if read_event is not None:
+                await manager.send_message(read_event, message.chat_id)
+
+        elif data["type"] == "read_up_to" or (
+            data["type"] == "read_receipt" and "chat_id" in data
+        ):
+            # Сдвигаем курсор прочтения чата вместо отметки каждого сообщения
+            await self.mark_read_up_to(user_id, data["chat_id"], data["message_id"])
+
+        elif data["type"] == "read_receipt":
+            # Старые клиенты без chat_id: обновляем статус прочтения сообщения
+            message = await self.message_repository.get_by_id(data["message_id"])
+            if message and not await self.has_access(message.chat_id, user_id):
+                # Чат определяется по сообщению; его id в ответе не раскрываем
+                self._reply(connection, {
+                    "type": "error",
+                    "message_id": message.id,
+                    "detail": "Access denied"
+                })
+                return
+            if message:
+                async with UnitOfWork(self.db):
+                    await self.message_repository.mark_as_read(message.id)
+                    read_event = await self._advance_read_cursor(user_id, message.chat_id, message.id)
+                await manager.send_read_receipt(
+                    message.id,
+                    message.chat_id,
+                    user_id
+                )
+                if read_event is not None:
+                    await manager.send_message(read_event, message.chat_id)
+
+    async def replay_missed_messages(self, connection: Connection, last_event_id: str):
+        """Догружает из базы сообщения, пропущенные сверх журнала событий.
+
+        Живые события, пришедшие за время запроса, соединение придерживает
+        и отправляет следом, поэтому пропусков нет, возможны только повторы.
+        Сообщения с меньшими id, зафиксированные после последнего полученного,
+        находятся перечитыванием окна LATE_COMMIT_WINDOW_SECONDS перед ним.
+        """
+        messages = []
+        complete = False
+        position = manager.event_log.parse(last_event_id) if manager.event_log else None
+        # Все догруженное и придержанное должно поместиться в очередь соединения
+        # вместе с кадром resumed; остальное клиент заберет через /sync
+        limit = min(settings.WS_RESUME_DB_LIMIT, connection.free_slots - 1)
+        if position is not None and limit > 0:
+            last_seen = None
+            if position.message_id:
+                last_seen = await self.message_repository.get_by_id(position.message_id)
+            after_ts = last_seen.timestamp if last_seen is not None else None
+            messages = await self.message_repository.get_user_messages_since(
+                connection.user_id, position.message_id, after_ts=after_ts, limit=limit
+            )
+            complete = len(messages) < limit
+            if last_seen is not None:
+                written_since = last_seen.timestamp - timedelta(seconds=settings.LATE_COMMIT_WINDOW_SECONDS)
+                late = await self.message_repository.get_late_user_messages(
+                    connection.user_id, position.message_id, written_since, limit=limit
+                )
+                messages = list(late) + list(messages)
+        # За время запросов могли прийти новые живые события
+        room = max(connection.free_slots - 1, 0)
+        if len(messages) > room:
+            messages = messages[:room]
+            complete = False
+        frames = [
+            manager.to_frame(serialization.dumps(self._message_event(message)))
+            for message in messages
+        ]
+        frames.append(manager.resumed_frame("db", complete=complete))
+        connection.release(frames)
+
+    @staticmethod
+    def _reply(connection: Connection, event: dict):
+        # Ответ идет через очередь соединения, как и остальные события:
+        # писатель соединения один, и формат кадров общий
+        connection.enqueue(manager.to_frame(serialization.dumps(event)))
+
+    @staticmethod
+    def _message_event(message) -> dict:
+        return {
+            "type": "message",
+            "id": message.id,
+            "chat_id": message.chat_id,
+            "sender_id": message.sender_id,
+            "text": message.text,
+            "timestamp": message.timestamp.isoformat(),
+            "is_read": message.is_read
+        }
+
+    async def mark_read_up_to(self, user_id: int, chat_id: int, message_id: int):
+        async with UnitOfWork(self.db):
+            read_event = await self._advance_read_cursor(user_id, chat_id, message_id)
+        if read_event is not None:
+            await manager.send_message(read_event, chat_id)
+
+    async def _advance_read_cursor(self, user_id: int, chat_id: int, message_id: int) -> Optional[dict]:
+        """Сдвигает курсор прочтения. Возвращает событие для рассылки после commit."""
+        if read_cursor_buffer.running:
+            # Отметки копятся в памяти и сбрасываются пачкой
+            read_cursor_buffer.mark_read(user_id, chat_id, message_id)
+            return None
+
+        await self.read_cursor_repository.advance_many([{
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "last_read_message_id": message_id
+        }])
+        return read_up_to_event(user_id, chat_id, message_id)
 
-                    # Отправляем сообщение всем участникам чата
-                    await manager.send_message({
-                        "type": "message",
-                        "id": message.id,
-                        "chat_id": message.chat_id,
-                        "sender_id": message.sender_id,
-                        "text": message.text,
-                        "timestamp": message.timestamp.isoformat(),
-                        "is_read": message.is_read
-                    }, message.chat_id)
-
-                elif data["type"] == "read_receipt":
-                    # Обновляем статус прочтения
-                    message = await self.message_repository.get_by_id(data["message_id"])
-                    if message:
-                        await self.message_repository.mark_as_read(message.id)
-                        await manager.send_read_receipt(
-                            message.id,
-                            message.chat_id,
-                            user_id
-                        )
-
-        except WebSocketDisconnect:
-            await manager.disconnect(user_id) 
+async def load_message_event(message_id: int) -> Optional[bytes]:
+    """Событие о сообщении из базы для шины, передавшей его ссылкой."""
+    async with AsyncSessionLocal() as db:
+        message = await MessageRepository(db).get_by_id(message_id)
+    if message is None:
+        return None
+    return serialization.dumps(ChatService._message_event(message))
@@ -0,0 +1,96 @@
+import asyncio
+from typing import List, Optional, Tuple
+from app.core.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.repositories.message_repository import MessageRepository
+
+class MessageWriter:
+    """Групповая запись сообщений из всех WebSocket-соединений.
+
+    Сообщения копятся в буфере до flush_interval секунд или batch_size штук
+    и записываются одним многострочным INSERT ... RETURNING с одним commit.
+    submit() возвращает сохраненную строку с настоящим id.
+    """
+
+    def __init__(self, session_factory, flush_interval: float, batch_size: int):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: List[Tuple[dict, asyncio.Future]] = []
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дописывает все буферизованные сообщения и останавливает запись."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._has_items.set()
+        self._batch_full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, chat_id: int, sender_id: int, text: str):
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((
+            {"chat_id": chat_id, "sender_id": sender_id, "text": text},
+            future
+        ))
+        self._has_items.set()
+        if len(self._buffer) >= self.batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if not self._buffer and self._stopping:
+                return
+            # Ждем заполнения пачки, но не дольше интервала сброса
+            if len(self._buffer) < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            if len(self._buffer) < self.batch_size and not self._stopping:
+                self._batch_full.clear()
+            if not self._buffer and not self._stopping:
+                self._has_items.clear()
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        try:
+            async with self.session_factory() as db:
+                rows = await MessageRepository(db).create_many(
+                    [values for values, _ in batch]
+                )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), row in zip(batch, rows):
+            if not future.done():
+                future.set_result(row)
+
+# Создаем глобальный экземпляр; запускается в lifespan, если включен MESSAGE_WRITE_BEHIND
+message_writer = MessageWriter(
+    AsyncSessionLocal,
+    flush_interval=settings.MESSAGE_FLUSH_INTERVAL_MS / 1000,
+    batch_size=settings.MESSAGE_BATCH_SIZE
+)
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from app.core.database import engine
+from app.core.database.partitions import add_months, create_partitions, detach_partitions, month_start
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class PartitionMaintainer:
+    """Создает будущие партиции messages и отсоединяет устаревшие."""
+
+    def __init__(self, engine, interval: float, months_ahead: int, retention_months: int):
+        self.engine = engine
+        self.interval = interval
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def maintain(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.utcnow()
+        async with self.engine.begin() as conn:
+            created = await create_partitions(conn, now, self.months_ahead)
+        detached = []
+        if self.retention_months > 0:
+            cutoff = add_months(month_start(now), -self.retention_months)
+            detached = await detach_partitions(self.engine, cutoff)
+        if created or detached:
+            logger.info("Message partitions created: %s, detached: %s", created, detached)
+        return {"created": created, "detached": detached}
+
+    async def _run(self):
+        # Первый проход сразу: приложение могло стоять во время смены месяца
+        while True:
+            try:
+                await self.maintain()
+            except Exception:
+                logger.exception("Failed to maintain message partitions")
+            await asyncio.sleep(self.interval)
+
+# Создаем глобальный экземпляр; запускается в lifespan приложения
+partition_maintainer = PartitionMaintainer(
+    engine,
+    interval=settings.MESSAGE_PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    months_ahead=settings.MESSAGE_PARTITIONS_AHEAD,
+    retention_months=settings.MESSAGE_RETENTION_MONTHS
+)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.core.websocket_manager import manager
+from app.repositories.read_cursor_repository import ReadCursorRepository
+
+logger = logging.getLogger(__name__)
+
+def read_up_to_event(user_id: int, chat_id: int, message_id: int) -> dict:
+    return {
+        "type": "read_up_to",
+        "chat_id": chat_id,
+        "reader_id": user_id,
+        "message_id": message_id,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+class ReadCursorBuffer:
+    """Копит отметки прочтения в памяти и сбрасывает их пачками.
+
+    Для каждой пары (user_id, chat_id) хранится только максимальный
+    message_id, поэтому прокрутка через сотни сообщений превращается
+    в одну запись и одно событие read_up_to на чат.
+    """
+
+    def __init__(self, session_factory, flush_interval: float):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дожидается текущего сброса, записывает оставшиеся отметки и останавливается."""
+        if self._task is None:
+            return
+        # Не отменяем задачу: прерванный сброс уже забрал отметки из буфера
+        self._stopping.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    def mark_read(self, user_id: int, chat_id: int, message_id: int):
+        key = (user_id, chat_id)
+        if message_id > self._pending.get(key, 0):
+            self._pending[key] = message_id
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            async with self.session_factory() as db:
+                await ReadCursorRepository(db).advance_many([
+                    {"user_id": user_id, "chat_id": chat_id, "last_read_message_id": message_id}
+                    for (user_id, chat_id), message_id in pending.items()
+                ])
+        except BaseException:
+            # Возвращаем отметки в буфер, чтобы записать их при следующем сбросе,
+            # в том числе если сброс прерван отменой задачи
+            for (user_id, chat_id), message_id in pending.items():
+                self.mark_read(user_id, chat_id, message_id)
+            raise
+
+        for (user_id, chat_id), message_id in pending.items():
+            await manager.send_message(
+                read_up_to_event(user_id, chat_id, message_id),
+                chat_id
+            )
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # Ошибка базы не должна останавливать фоновый сброс
+                logger.exception("Failed to flush read cursors")
+
+# Создаем глобальный экземпляр; запускается в lifespan приложения
+read_cursor_buffer = ReadCursorBuffer(
+    AsyncSessionLocal,
+    flush_interval=settings.READ_CURSOR_FLUSH_INTERVAL_MS / 1000
+)
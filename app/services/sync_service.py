@@ -0,0 +1,96 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional
+from app.models.user import User
+from app.repositories.chat_repository import ChatRepository
+from app.repositories.message_repository import MessageRepository
+from app.repositories.read_cursor_repository import ReadCursorRepository
+from app.repositories.membership_event_repository import MembershipEventRepository
+from app.core.pagination import encode_cursor
+from app.core.settings import settings
+
+class SyncService:
+    """Дельта-синхронизация клиента по всем его чатам одним запросом.
+
+    Курсор хранит последние выданные id сообщения, seq курсора прочтения и
+    id события участников; каждая лента читается по своему индексу и
+    ограничена limit записями. id и seq выдаются при записи, а не при commit,
+    поэтому записи, сделанные за LATE_COMMIT_WINDOW_SECONDS до прошлой выдачи,
+    перечитываются: клиент может получить их повторно и отбрасывает повторы по id.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.message_repository = MessageRepository(db)
+        self.read_cursor_repository = ReadCursorRepository(db)
+        self.membership_event_repository = MembershipEventRepository(db)
+
+    async def sync(self, current_user: User, position: Optional[dict], limit: int) -> dict:
+        # Время выдачи берется до чтения: все, что зафиксировано позже, попадет в окно
+        read_at = datetime.utcnow()
+        if position is None:
+            # Первая синхронизация: отдаем только текущую позицию, историю клиент грузит сам
+            message_id, message_ts = await self.message_repository.get_latest_position()
+            position = {
+                "m": message_id,
+                "ts": message_ts,
+                "r": await self.read_cursor_repository.get_last_seq(),
+                "e": await self.membership_event_repository.get_last_id(),
+                "at": read_at
+            }
+            return self._page([], [], [], position, has_more=False)
+
+        chat_ids = ChatRepository.user_chat_ids_query(current_user.id)
+        messages = await self.message_repository.get_user_messages_since(
+            current_user.id, position["m"], position["ts"], limit
+        )
+        read_cursors = await self.read_cursor_repository.get_changes_since(
+            current_user.id, position["r"], limit
+        )
+        membership = await self.membership_event_repository.get_since(
+            current_user.id, chat_ids, position["e"], limit
+        )
+        # Продолжение страницы определяется только новыми записями
+        has_more = any(len(items) == limit for items in (messages, read_cursors, membership))
+
+        new_position = dict(position, at=read_at)
+        if messages:
+            new_position["m"], new_position["ts"] = messages[-1].id, messages[-1].timestamp
+        if read_cursors:
+            new_position["r"] = read_cursors[-1]["seq"]
+        if membership:
+            new_position["e"] = membership[-1]["id"]
+
+        if position.get("at") is not None:
+            # Записи с меньшими id, зафиксированные после прошлой выдачи
+            written_since = position["at"] - timedelta(seconds=settings.LATE_COMMIT_WINDOW_SECONDS)
+            late_messages = await self.message_repository.get_late_user_messages(
+                current_user.id, position["m"], written_since, limit
+            )
+            late_read_cursors = await self.read_cursor_repository.get_late_changes(
+                current_user.id, position["r"], written_since, limit
+            )
+            late_membership = await self.membership_event_repository.get_late(
+                current_user.id, chat_ids, position["e"], written_since, limit
+            )
+            messages = list(late_messages) + list(messages)
+            read_cursors = list(late_read_cursors) + list(read_cursors)
+            membership = list(late_membership) + list(membership)
+        return self._page(messages, read_cursors, membership, new_position, has_more)
+
+    @staticmethod
+    def _page(messages, read_cursors, membership, position: dict, has_more: bool) -> dict:
+        cursor = encode_cursor({
+            "m": position["m"],
+            "ts": position["ts"].isoformat() if position["ts"] else None,
+            "r": position["r"],
+            "e": position["e"],
+            "at": position["at"].isoformat()
+        })
+        return {
+            "messages": messages,
+            "read_cursors": read_cursors,
+            "membership": membership,
+            "cursor": cursor,
+            "has_more": has_more
+        }
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Optional
+from app.core.database import AsyncSessionLocal
+from app.core.settings import settings
+from app.repositories.chat_repository import ChatRepository
+from app.repositories.read_cursor_repository import ReadCursorRepository
+
+logger = logging.getLogger(__name__)
+
+class UnreadCountReconciler:
+    """Периодически чинит расхождения счетчиков непрочитанных с таблицей messages."""
+
+    def __init__(self, session_factory, interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def reconcile(self) -> dict:
+        async with self.session_factory() as db:
+            chats = await ChatRepository(db).reconcile_message_counts()
+            cursors = await ReadCursorRepository(db).reconcile_read_counts()
+        if chats or cursors:
+            logger.warning(
+                "Repaired unread counter drift: %s chats, %s read cursors",
+                chats,
+                cursors
+            )
+        return {"chats": chats, "read_cursors": cursors}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Failed to reconcile unread counts")
+
+# Создаем глобальный экземпляр; запускается в lifespan приложения
+unread_reconciler = UnreadCountReconciler(
+    AsyncSessionLocal,
+    interval=settings.UNREAD_RECONCILE_INTERVAL_SECONDS
+)
@@ -2,7 +2,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.schemas.user import UserCreate
 from app.repositories.user_repository import UserRepository
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.database.unit_of_work import UnitOfWork
+from app.core.security import PasswordHasherBusy, password_hasher, create_access_token
 
 class UserService:
     def __init__(self, db: AsyncSession):
@@ -23,17 +24,24 @@ class UserService:
                 detail="Email already registered"
             )
 
-        # Создаем пользователя
-        hashed_password = get_password_hash(user_data.password)
-        return await self.repository.create(
-            username=user_data.username,
-            email=user_data.email,
-            hashed_password=hashed_password
-        )
+        # Создаем пользователя; bcrypt считается в пуле потоков
+        hashed_password = await self._hash_password(user_data.password)
+        async with UnitOfWork(self.db):
+            return await self.repository.create(
+                username=user_data.username,
+                email=user_data.email,
+                hashed_password=hashed_password
+            )
 
     async def authenticate_user(self, username: str, password: str):
         user = await self.repository.get_by_username(username)
-        if not user or not verify_password(password, user.hashed_password):
+        valid = False
+        if user:
+            valid, new_hash = await self._verify_password(password, user.hashed_password)
+            if valid and new_hash is not None:
+                # Хеш с устаревшей стоимостью заменяем, пока пароль известен
+                await self.repository.update_password_hash(user.id, new_hash)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -41,4 +49,24 @@ class UserService:
             )
         
         access_token = create_access_token(data={"sub": user.username})
-        return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+        return {"access_token": access_token, "token_type": "bearer"}
+
+    async def _hash_password(self, password: str) -> str:
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise self._busy_exception()
+
+    async def _verify_password(self, password: str, hashed_password: str):
+        try:
+            return await password_hasher.verify_and_update(password, hashed_password)
+        except PasswordHasherBusy:
+            raise self._busy_exception()
+
+    @staticmethod
+    def _busy_exception() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
@@ -0,0 +1,65 @@
+"""Микробенчмарк кодирования рассылки: send_json на каждого получателя
+против однократного кодирования через app.core.serialization.
+
+Запуск: python -m benchmarks.bench_broadcast_serialization
+"""
+import json
+import time
+from datetime import datetime
+
+from app.core import serialization
+
+RECIPIENTS = (10, 1_000, 10_000)
+ROUNDS = 20
+
+MESSAGE = {
+    "type": "message",
+    "id": 123456,
+    "chat_id": 42,
+    "sender_id": 7,
+    "text": "Привет! " * 20,
+    "timestamp": datetime.utcnow().isoformat(),
+    "is_read": False
+}
+
+class FakeWebSocket:
+    """Повторяет то, что делает starlette.WebSocket на отправке, без сети."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send_json(self, data):
+        # Так кодирует starlette.websockets.WebSocket.send_json
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.send_text(text)
+
+    def send_text(self, text):
+        self.sent += 1
+
+def per_recipient(sockets):
+    for websocket in sockets:
+        websocket.send_json(MESSAGE)
+
+def encode_once(sockets):
+    frame = serialization.dumps(MESSAGE).decode("utf-8")
+    for websocket in sockets:
+        websocket.send_text(frame)
+
+def measure(fn, sockets) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(sockets)
+    return (time.perf_counter() - started) / ROUNDS
+
+def main():
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"encoder: {encoder}, rounds: {ROUNDS}")
+    print(f"{'recipients':>10} {'send_json, ms':>15} {'encode once, ms':>16} {'speedup':>8}")
+    for count in RECIPIENTS:
+        sockets = [FakeWebSocket() for _ in range(count)]
+        before = measure(per_recipient, sockets)
+        after = measure(encode_once, sockets)
+        print(f"{count:>10} {before * 1000:>15.3f} {after * 1000:>16.3f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
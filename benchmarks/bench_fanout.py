@@ -0,0 +1,88 @@
+"""Бенчмарк рассылки в большую группу и задержки доставки в личный чат рядом с ней.
+
+В одном процессе подключаются GROUP_MEMBERS фиктивных сокетов, все они
+в одной группе. Пока в группу идут объявления, замеряется время доставки
+сообщений в личный чат двух других пользователей.
+
+Запуск: BENCH_GROUP_MEMBERS=50000 python -m benchmarks.bench_fanout
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from app.core.websocket_manager import ConnectionManager, OverflowPolicy
+
+GROUP_MEMBERS = int(os.getenv("BENCH_GROUP_MEMBERS", "50000"))
+ANNOUNCEMENTS = int(os.getenv("BENCH_ANNOUNCEMENTS", "20"))
+DIRECT_MESSAGES = int(os.getenv("BENCH_DIRECT_MESSAGES", "200"))
+GROUP_CHAT, DIRECT_CHAT = 1, 2
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        pass
+
+    async def send_bytes(self, frame):
+        pass
+
+class ProbeWebSocket(NullWebSocket):
+    def __init__(self):
+        self.received = asyncio.Queue()
+
+    async def send_text(self, frame):
+        self.received.put_nowait(time.perf_counter())
+
+async def run(chunk_size: int, workers: int):
+    manager = ConnectionManager(
+        max_queue_size=ANNOUNCEMENTS + 1,
+        overflow_policy=OverflowPolicy.DROP_OLDEST,
+        fanout_chunk_size=chunk_size,
+        fanout_workers=workers
+    )
+    await manager.start()
+    for user_id in range(1, GROUP_MEMBERS + 1):
+        await manager.connect(NullWebSocket(), user_id)
+        manager.add_user_to_chat(GROUP_CHAT, user_id)
+    probe = ProbeWebSocket()
+    await manager.connect(probe, 0)
+    manager.add_user_to_chat(DIRECT_CHAT, 0)
+
+    async def announce():
+        for n in range(ANNOUNCEMENTS):
+            await manager.send_message({"type": "announcement", "n": n}, GROUP_CHAT)
+            await asyncio.sleep(0)
+
+    latencies = []
+    announcer = asyncio.create_task(announce())
+    for n in range(DIRECT_MESSAGES):
+        sent = time.perf_counter()
+        await manager.send_message({"type": "direct", "n": n}, DIRECT_CHAT)
+        latencies.append(await probe.received.get() - sent)
+        await asyncio.sleep(0)
+    await announcer
+    stats = manager.fanout.stats()
+    await manager.stop()
+    return sorted(latencies), stats
+
+def report(name, latencies, stats):
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    chunk_p99 = stats["chunk_p99_ms"] or 0.0
+    print(
+        f"{name:<28} direct p50={percentile(0.50):7.2f} ms  p99={percentile(0.99):7.2f} ms  "
+        f"max={latencies[-1] * 1000:7.2f} ms  mean={statistics.mean(latencies) * 1000:6.2f} ms  "
+        f"chunk p99={chunk_p99:6.2f} ms"
+    )
+
+async def main():
+    print(f"group members={GROUP_MEMBERS} announcements={ANNOUNCEMENTS}")
+    # Размер пачки больше группы — прежняя рассылка одним проходом
+    report("single pass", *await run(GROUP_MEMBERS + 1, 1))
+    for chunk_size in (1000, 250):
+        report(f"chunks of {chunk_size}, 4 workers", *await run(chunk_size, 4))
+
+if __name__ == "__main__":
+    asyncio.run(main())
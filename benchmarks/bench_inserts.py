@@ -0,0 +1,87 @@
+"""Бенчмарк одиночных вставок на одном соединении: ORM с refresh против INSERT ... RETURNING.
+
+"orm" повторяет прежний путь записи: объект в сессии, commit и refresh
+отдельным SELECT. "returning" — текущий путь репозиториев: одна вставка,
+возвращающая строку целиком, без identity map. Замеряются вставки в секунду
+для сообщений (самый частый запрос) и для чатов.
+Нужна отдельная база: таблицы создаются, если их нет, данные не удаляются.
+
+Запуск: BENCH_INSERTS=5000 python -m benchmarks.bench_inserts
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.database.partitions import create_partitions
+from app.core.settings import settings
+from app.models import Base, Chat, Message
+from app.repositories.chat_repository import ChatRepository
+from app.repositories.message_repository import MessageRepository
+
+INSERTS = int(os.getenv("BENCH_INSERTS", "5000"))
+
+async def prepare(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await create_partitions(conn, datetime.utcnow(), 1)
+        await conn.execute(text(
+            "INSERT INTO users (username, email, hashed_password) "
+            "VALUES ('bench', 'bench@example.com', '') ON CONFLICT DO NOTHING"
+        ))
+        user_id = (await conn.execute(text("SELECT id FROM users WHERE username = 'bench'"))).scalar()
+        chat_id = (await conn.execute(text(
+            "INSERT INTO chats (name, type, message_count) VALUES ('bench', 'PRIVATE', 0) RETURNING id"
+        ))).scalar()
+    return user_id, chat_id
+
+async def orm_message(db, chat_id, user_id):
+    message = Message(chat_id=chat_id, sender_id=user_id, text="hello")
+    db.add(message)
+    await db.flush()
+    await MessageRepository(db)._update_chat_summaries([message])
+    await db.commit()
+    await db.refresh(message)
+
+async def returning_message(db, chat_id, user_id):
+    await MessageRepository(db).create(chat_id, user_id, "hello")
+
+async def orm_chat(db, chat_id, user_id):
+    chat = Chat(name="bench")
+    db.add(chat)
+    await db.commit()
+    await db.refresh(chat)
+
+async def returning_chat(db, chat_id, user_id):
+    await ChatRepository(db).create(name="bench")
+
+async def measure(session_factory, insert_one, chat_id, user_id):
+    # Одна сессия — одно соединение, вставки строго последовательные
+    async with session_factory() as db:
+        started = time.perf_counter()
+        for _ in range(INSERTS):
+            await insert_one(db, chat_id, user_id)
+            db.expunge_all()
+        return INSERTS / (time.perf_counter() - started)
+
+async def main():
+    engine = create_async_engine(settings.DATABASE_URL, pool_size=1)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user_id, chat_id = await prepare(engine)
+
+    print(f"inserts={INSERTS} per case, one connection")
+    for name, insert_one in [
+        ("message orm + refresh", orm_message),
+        ("message insert returning", returning_message),
+        ("chat orm + refresh", orm_chat),
+        ("chat insert returning", returning_chat),
+    ]:
+        rate = await measure(session_factory, insert_one, chat_id, user_id)
+        print(f"{name:<28} {rate:10.0f} inserts/s")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Микробенчмарк кодирования списков в ответах API: response_model FastAPI
+против TypeAdapter и app.core.responses.ListEncoder.
+
+Считает стоимость одного сообщения истории от ORM-объекта до байтов тела ответа.
+
+Запуск: python -m benchmarks.bench_response_serialization
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from app.core import serialization
+from app.core.responses import ListEncoder
+from app.models.message import Message as MessageModel
+from app.schemas.message import Message
+
+PAGE_SIZES = (50, 500, 5_000)
+ROUNDS = 20
+
+def make_page(size: int) -> list:
+    return [
+        MessageModel(
+            id=i,
+            chat_id=42,
+            sender_id=7,
+            text="Привет! " * 10,
+            timestamp=datetime.utcnow(),
+            is_read=False
+        )
+        for i in range(size)
+    ]
+
+response_field = create_response_field(name="Response", type_=List[Message])
+adapter = TypeAdapter(List[Message])
+encoder = ListEncoder(Message)
+loop = asyncio.new_event_loop()
+
+def response_model(page) -> bytes:
+    # Как FastAPI обрабатывает return messages при response_model=List[Message]
+    content = loop.run_until_complete(
+        serialize_response(field=response_field, response_content=page)
+    )
+    return JSONResponse(content).body
+
+def type_adapter(page) -> bytes:
+    return adapter.dump_json(adapter.validate_python(page, from_attributes=True))
+
+def list_encoder(page) -> bytes:
+    return encoder.encode(page)
+
+def measure(fn, page) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(page)
+    return (time.perf_counter() - started) / ROUNDS / len(page)
+
+def main():
+    encoder_name = "orjson" if serialization.orjson is not None else "json"
+    print(f"encoder: {encoder_name}, rounds: {ROUNDS}, time per message")
+    print(f"{'page':>6} {'response_model, us':>19} {'TypeAdapter, us':>16} {'ListEncoder, us':>16} {'speedup':>8}")
+    for size in PAGE_SIZES:
+        page = make_page(size)
+        before = measure(response_model, page)
+        adapted = measure(type_adapter, page)
+        after = measure(list_encoder, page)
+        print(
+            f"{size:>6} {before * 1e6:>19.2f} {adapted * 1e6:>16.2f} "
+            f"{after * 1e6:>16.2f} {before / after:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Бенчмарк полнотекстового поиска на синтетическом корпусе сообщений.
+
+Заполняет базу из DATABASE_URL миллионами сообщений (generate_series на стороне
+сервера) и замеряет задержку поиска в одном чате и по всем чатам пользователя.
+Нужна отдельная пустая база: таблицы создаются, если их нет, данные не удаляются.
+
+Запуск: BENCH_MESSAGES=2000000 python -m benchmarks.bench_search
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.database.partitions import create_partitions
+from app.core.settings import settings
+from app.models import Base
+from app.repositories.message_repository import MessageRepository
+
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "2000000"))
+CHATS = int(os.getenv("BENCH_CHATS", "1000"))
+USERS = int(os.getenv("BENCH_USERS", "100"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "200"))
+PAGE_SIZE = 20
+
+# Словарь с распределением, похожим на живую речь: частые и редкие слова
+WORDS = [f"word{i}" for i in range(5000)]
+
+async def fill(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Сообщения идут по одному в секунду назад от текущего момента
+        oldest = datetime.utcnow() - timedelta(seconds=MESSAGES)
+        months = (datetime.utcnow().year - oldest.year) * 12 + datetime.utcnow().month - oldest.month
+        await create_partitions(conn, oldest, months + 1)
+        existing = (await conn.execute(text("SELECT count(*) FROM messages"))).scalar()
+        if existing >= MESSAGES:
+            return
+        print(f"Генерируем {MESSAGES} сообщений в {CHATS} чатах...")
+        await conn.execute(text(
+            "INSERT INTO users (username, email, hashed_password) "
+            "SELECT 'bench' || g, 'bench' || g || '@example.com', '' "
+            "FROM generate_series(1, :users) g ON CONFLICT DO NOTHING"
+        ), {"users": USERS})
+        await conn.execute(text(
+            "INSERT INTO chats (name, type, message_count) "
+            "SELECT 'bench' || g, 'PRIVATE', 0 FROM generate_series(1, :chats) g"
+        ), {"chats": CHATS})
+        # Каждый пользователь состоит в 10% чатов
+        await conn.execute(text(
+            "INSERT INTO chat_participants (chat_id, user_id) "
+            "SELECT c.id, u.id FROM chats c CROSS JOIN users u "
+            "WHERE (c.id + u.id) % 10 = 0 ON CONFLICT DO NOTHING"
+        ))
+        # Текст из 12 слов, номер слова распределен квадратично к началу словаря
+        await conn.execute(text(
+            "INSERT INTO messages (chat_id, sender_id, text, timestamp, is_read) "
+            "SELECT (SELECT min(id) FROM chats) + g % :chats, "
+            "(SELECT min(id) FROM users) + g % :users, "
+            "(SELECT string_agg('word' || floor(power(random(), 2) * :vocab)::int, ' ') "
+            " FROM generate_series(1, 12) WHERE g > 0), "
+            "timezone('utc', now()) - make_interval(secs => g), false "
+            "FROM generate_series(1, :messages) g"
+        ), {"chats": CHATS, "users": USERS, "vocab": len(WORDS), "messages": MESSAGES})
+        await conn.execute(text("ANALYZE messages"))
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    print(
+        f"{name:<24} p50={percentile(0.50):8.2f} ms  p95={percentile(0.95):8.2f} ms  "
+        f"p99={percentile(0.99):8.2f} ms  mean={statistics.mean(latencies) * 1000:8.2f} ms"
+    )
+
+async def measure(session_factory, **filters):
+    latencies = []
+    for _ in range(QUERIES):
+        query_text = " ".join(random.sample(WORDS[:500], 2))
+        async with session_factory() as db:
+            started = time.perf_counter()
+            await MessageRepository(db).search(query_text, PAGE_SIZE, **filters)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+async def main():
+    engine = create_async_engine(settings.DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await fill(engine)
+    async with engine.connect() as conn:
+        chat_id = (await conn.execute(text("SELECT min(id) FROM chats"))).scalar()
+        user_id = (await conn.execute(text("SELECT min(id) FROM users"))).scalar()
+
+    print(f"messages={MESSAGES} chats={CHATS} queries={QUERIES}")
+    report("search in chat", await measure(session_factory, chat_id=chat_id))
+    report("search across chats", await measure(session_factory, user_id=user_id))
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
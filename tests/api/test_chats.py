@@ -67,3 +67,33 @@ async def test_get_chat_history(client: AsyncClient, test_user: User):
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list) 
+
+async def test_get_chat_history_with_cursor(client: AsyncClient, test_user: User):
+    headers = await auth_headers(client, test_user.username, "testpass123")
+    chat_resp = await client.post(
+        "/api/v1/chats/",
+        json={
+            "name": "Cursor Chat",
+            "type": ChatType.PRIVATE.value
+        },
+        headers=headers
+    )
+    chat_id = chat_resp.json()["id"]
+
+    # Пустой чат: страница пустая, курсора следующей страницы нет
+    response = await client.get(
+        f"/api/v1/chats/{chat_id}/history",
+        params={"direction": "backward", "limit": 10},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+    # Некорректный курсор
+    response = await client.get(
+        f"/api/v1/chats/{chat_id}/history",
+        params={"cursor": "garbage"},
+        headers=headers
+    )
+    assert response.status_code == 400
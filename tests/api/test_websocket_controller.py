@@ -1,7 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import FastAPI, WebSocketDisconnect
-from app.api.controllers.websocket_controller import router
+from app.api.controllers.websocket_controller import router, serve_websocket
+from app.core.auth_cache import AuthCache, AuthenticatedUser
 from app.core.websocket_manager import manager
 from unittest.mock import AsyncMock, patch
 import asyncio
@@ -10,6 +11,8 @@ app = FastAPI()
 app.include_router(router)
 client = TestClient(app)
 
+USER = AuthenticatedUser(1, "alice", "alice@example.com", None)
+
 @pytest.fixture(autouse=True)
 async def cleanup_connections():
     # Clean up connections before each test
@@ -26,27 +29,170 @@ def mock_chat_service():
         yield mock_instance
 
 @pytest.fixture
-def mock_db():
-    return AsyncMock()
+def mock_authenticate():
+    async def authenticate(token, db):
+        if token != "valid":
+            from fastapi import HTTPException
+            raise HTTPException(status_code=401)
+        return USER
+
+    with patch('app.api.controllers.websocket_controller.authenticate_token', side_effect=authenticate) as mock:
+        yield mock
 
 @pytest.mark.asyncio
-async def test_websocket_connection(mock_chat_service, mock_db):
+async def test_websocket_connection(mock_chat_service, mock_authenticate):
     # Test successful connection
-    with client.websocket_connect("/ws/1") as websocket:
-        assert websocket is not None
-        mock_chat_service.handle_websocket_connection.assert_called_once()
+    with client.websocket_connect("/ws?token=valid") as websocket:
+        websocket.send_json({"type": "read_up_to", "chat_id": 1, "message_id": 5})
+        websocket.close()
+
+    mock_chat_service.handle_websocket_event.assert_called_once()
+    connection, data = mock_chat_service.handle_websocket_event.call_args.args
+    assert connection.user_id == 1
+    assert data == {"type": "read_up_to", "chat_id": 1, "message_id": 5}
+
+@pytest.mark.asyncio
+async def test_websocket_bearer_header(mock_chat_service, mock_authenticate):
+    # Act
+    with client.websocket_connect("/ws", headers={"Authorization": "Bearer valid"}):
+        pass
+
+    # Assert
+    mock_authenticate.assert_called_once()
+    assert mock_authenticate.call_args.args[0] == "valid"
 
 @pytest.mark.asyncio
-async def test_websocket_disconnect(mock_chat_service, mock_db):
-    # handle_websocket_connection сразу выбрасывает WebSocketDisconnect
-    mock_chat_service.handle_websocket_connection.side_effect = WebSocketDisconnect()
-    with client.websocket_connect("/ws/1"):
+async def test_websocket_disconnect(mock_chat_service, mock_authenticate):
+    with client.websocket_connect("/ws/1?token=valid"):
         pass
     assert 1 not in manager.active_connections
 
 @pytest.mark.asyncio
-async def test_websocket_invalid_user_id(mock_chat_service, mock_db):
+@pytest.mark.parametrize("url", ["/ws", "/ws?token=invalid", "/ws/2?token=valid"])
+async def test_websocket_handshake_is_rejected(mock_chat_service, mock_authenticate, url):
+    # Без токена, с неверным токеном и с чужим id в пути
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(url):
+            pass
+    assert manager.active_connections == {}
+
+@pytest.mark.asyncio
+async def test_websocket_invalid_user_id(mock_chat_service, mock_authenticate):
     # Test with invalid user_id
     with pytest.raises(Exception):
-        with client.websocket_connect("/ws/invalid") as websocket:
-            pass 
+        with client.websocket_connect("/ws/invalid?token=valid") as websocket:
+            pass
+
+class IdleWebSocket:
+    """Сокет, который присылает одно событие и дальше молчит."""
+
+    def __init__(self):
+        self.headers = {}
+        self._events = [{"type": "read_up_to", "chat_id": 1, "message_id": 1}]
+        self._forever = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_text(self, frame):
+        pass
+
+    async def send_bytes(self, frame):
+        pass
+
+    async def receive_json(self):
+        if self._events:
+            return self._events.pop()
+        await self._forever.wait()
+
+class CountingPool:
+    """Пул соединений с базой, считающий выдачи и занятые соединения."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak = 0
+        self._slots = asyncio.Semaphore(size)
+
+    async def checkout(self):
+        await self._slots.acquire()
+        self.checkouts += 1
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+
+    def checkin(self):
+        self.checked_out -= 1
+        self._slots.release()
+
+class PooledSession:
+    """Как AsyncSession: берет соединение при первом запросе и отдает при закрытии."""
+
+    def __init__(self, pool: CountingPool):
+        self.pool = pool
+        self.connected = False
+
+    async def execute(self, statement):
+        if not self.connected:
+            await self.pool.checkout()
+            self.connected = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.connected:
+            self.pool.checkin()
+
+class QueryingChatService:
+    """Обработчик событий, который на каждое событие обращается к базе."""
+
+    handled = 0
+
+    def __init__(self, db):
+        self.db = db
+
+    async def handle_websocket_event(self, connection, data):
+        await self.db.execute("SELECT 1")
+        QueryingChatService.handled += 1
+
+@pytest.mark.asyncio
+async def test_idle_sockets_hold_no_pool_connections():
+    # Arrange
+    pool = CountingPool(size=5)
+    QueryingChatService.handled = 0
+    cache = AuthCache()
+    sockets = 10_000
+    for user_id in range(1, sockets + 1):
+        cache.set(f"token{user_id}", AuthenticatedUser(user_id, f"u{user_id}", "", None), float("inf"))
+
+    # Act
+    with patch('app.api.controllers.websocket_controller.AsyncSessionLocal', lambda: PooledSession(pool)), \
+            patch('app.api.controllers.websocket_controller.ChatService', QueryingChatService), \
+            patch('app.core.auth.auth_cache', cache):
+        tasks = [
+            asyncio.create_task(serve_websocket(IdleWebSocket(), f"token{user_id}", None))
+            for user_id in range(1, sockets + 1)
+        ]
+        try:
+            # Ждем, пока все сокеты обработают свое событие и замолчат
+            async def settled():
+                while QueryingChatService.handled < sockets or pool.checked_out:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(settled(), timeout=60)
+
+            # Assert
+            assert len(manager.active_connections) == sockets
+            # Каждое событие брало соединение из пула только на время обработки
+            assert pool.checkouts == sockets
+            assert 0 < pool.peak <= pool.size
+            assert pool.checked_out == 0
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    assert manager.active_connections == {}
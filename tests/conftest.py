@@ -4,6 +4,7 @@ import pytest_asyncio
 import asyncio
 from typing import AsyncGenerator, Generator
 from httpx import AsyncClient
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -74,5 +75,6 @@ async def test_user(db_session) -> AsyncGenerator[User, None]:
     )
     user = await user_service.create_user(user_data)
     yield user
-    await db_session.delete(user)
+    # create_user returns a RETURNING row, not a session-tracked User
+    await db_session.execute(delete(User).where(User.id == user.id))
     await db_session.commit() 
\ No newline at end of file
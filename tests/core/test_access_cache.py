@@ -0,0 +1,60 @@
+from unittest.mock import patch
+from app.core.access_cache import AccessCache
+
+def test_caches_grants_and_denials():
+    # Arrange
+    cache = AccessCache()
+
+    # Act
+    cache.set(1, 10, True)
+    cache.set(2, 10, False)
+
+    # Assert
+    assert cache.get(1, 10) is True
+    assert cache.get(2, 10) is False
+    assert cache.get(3, 10) is None
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 1}
+
+def test_entries_expire_after_ttl():
+    # Arrange
+    cache = AccessCache(ttl=30)
+    with patch("app.core.access_cache.time.monotonic", return_value=100):
+        cache.set(1, 10, True)
+
+    # Act & Assert
+    with patch("app.core.access_cache.time.monotonic", return_value=129):
+        assert cache.get(1, 10) is True
+    with patch("app.core.access_cache.time.monotonic", return_value=131):
+        assert cache.get(1, 10) is None
+
+def test_invalidate_chat_drops_only_its_entries():
+    # Arrange
+    cache = AccessCache()
+    cache.set(1, 10, False)
+    cache.set(2, 10, True)
+    cache.set(1, 11, True)
+
+    # Act
+    cache.invalidate_chat(10)
+
+    # Assert
+    assert cache.get(1, 10) is None
+    assert cache.get(2, 10) is None
+    assert cache.get(1, 11) is True
+
+def test_least_recently_used_entry_is_evicted():
+    # Arrange
+    cache = AccessCache(max_size=2)
+    cache.set(1, 10, True)
+    cache.set(2, 10, True)
+    cache.get(1, 10)
+
+    # Act
+    cache.set(3, 11, True)
+
+    # Assert
+    assert cache.get(2, 10) is None
+    assert cache.get(1, 10) is True
+    # Вытесненная запись не остается в индексе по чату
+    cache.invalidate_chat(10)
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,61 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from app.core.auth import get_current_user
+from app.core.auth_cache import AuthCache, AuthenticatedUser
+from app.core.security import create_access_token
+
+@pytest.fixture
+def auth_cache():
+    with patch("app.core.auth.auth_cache", AuthCache()) as cache:
+        yield cache
+
+@pytest.fixture
+def mock_db():
+    db = AsyncMock()
+    result = MagicMock()
+    result.one_or_none.return_value = (1, "alice", "alice@example.com", None)
+    db.execute.return_value = result
+    return db
+
+@pytest.mark.asyncio
+async def test_second_request_is_served_from_cache(auth_cache, mock_db):
+    # Arrange
+    token = create_access_token({"sub": "alice"})
+
+    # Act
+    first = await get_current_user(token, mock_db)
+    with patch("app.core.auth.jwt.decode") as decode:
+        second = await get_current_user(token, mock_db)
+
+    # Assert
+    assert first == second == AuthenticatedUser(1, "alice", "alice@example.com", None)
+    # Повторный запрос без проверки подписи и без запроса в базу
+    decode.assert_not_called()
+    mock_db.execute.assert_called_once()
+    assert auth_cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected(auth_cache, mock_db):
+    # Arrange
+    token = create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1))
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token, mock_db)
+
+    assert exc_info.value.status_code == 401
+    assert auth_cache.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_not_cached(auth_cache, mock_db):
+    # Arrange
+    mock_db.execute.return_value.one_or_none.return_value = None
+    token = create_access_token({"sub": "ghost"})
+
+    # Act & Assert
+    with pytest.raises(HTTPException):
+        await get_current_user(token, mock_db)
+
+    assert auth_cache.stats()["size"] == 0
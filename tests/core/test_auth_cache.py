@@ -0,0 +1,57 @@
+from unittest.mock import patch
+from app.core.auth_cache import AuthCache, AuthenticatedUser
+
+def make_user(user_id: int = 1) -> AuthenticatedUser:
+    return AuthenticatedUser(user_id, f"user{user_id}", f"user{user_id}@example.com", None)
+
+def test_entry_is_bounded_by_token_expiry():
+    # Arrange
+    cache = AuthCache(ttl=60)
+    with patch("app.core.auth_cache.time.time", return_value=1000):
+        cache.set("token", make_user(), expires_at=1010)
+
+    # Act & Assert
+    with patch("app.core.auth_cache.time.time", return_value=1009):
+        assert cache.get("token") == make_user()
+    with patch("app.core.auth_cache.time.time", return_value=1010):
+        assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+def test_entry_is_bounded_by_ttl():
+    # Arrange
+    cache = AuthCache(ttl=60)
+    with patch("app.core.auth_cache.time.time", return_value=1000):
+        cache.set("token", make_user(), expires_at=5000)
+
+    # Act & Assert
+    with patch("app.core.auth_cache.time.time", return_value=1061):
+        assert cache.get("token") is None
+
+def test_invalidate_user_drops_all_tokens_of_user():
+    # Arrange
+    cache = AuthCache()
+    cache.set("a", make_user(1), expires_at=float("inf"))
+    cache.set("b", make_user(1), expires_at=float("inf"))
+    cache.set("c", make_user(2), expires_at=float("inf"))
+
+    # Act
+    cache.invalidate_user(1)
+
+    # Assert
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == make_user(2)
+
+def test_least_recently_used_token_is_evicted_and_counted():
+    # Arrange
+    cache = AuthCache(max_size=2)
+    cache.set("a", make_user(1), expires_at=float("inf"))
+    cache.set("b", make_user(2), expires_at=float("inf"))
+    cache.get("a")
+
+    # Act
+    cache.set("c", make_user(3), expires_at=float("inf"))
+
+    # Assert
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 1, "hit_rate": 0.5, "evictions": 1}
@@ -0,0 +1,205 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.backplane import Backplane, EventTooLarge, InProcessBackplane, PostgresBackplane
+from app.core.websocket_manager import ConnectionManager
+
+class RecordingBackplane(Backplane):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    async def publish(self, chat_id, payload):
+        self.published.append((chat_id, payload))
+
+@pytest.fixture
+def mock_engine():
+    engine = MagicMock()
+    connection = AsyncMock()
+    engine.begin.return_value.__aenter__.return_value = connection
+    return engine
+
+@pytest.mark.asyncio
+async def test_in_process_backplane_delivers_to_handler():
+    # Arrange
+    backplane = InProcessBackplane()
+    handler = AsyncMock()
+    backplane.subscribe(handler)
+
+    # Act
+    await backplane.publish(1, b'{"text":"hi"}')
+
+    # Assert
+    handler.assert_awaited_once_with(1, b'{"text":"hi"}')
+
+@pytest.mark.asyncio
+async def test_manager_publishes_once_per_broadcast():
+    # Arrange
+    backplane = RecordingBackplane()
+    manager = ConnectionManager(backplane=backplane)
+    for user_id in range(3):
+        manager.add_user_to_chat(1, user_id)
+
+    # Act
+    await manager.send_message({"text": "hi"}, 1)
+
+    # Assert
+    assert backplane.published == [(1, b'{"text":"hi"}')]
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_publishes_notify(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    backplane.subscribe(AsyncMock())
+
+    # Act
+    await backplane.publish(5, b'{"text":"hi"}')
+
+    # Assert
+    connection = mock_engine.begin.return_value.__aenter__.return_value
+    params = connection.execute.await_args.args[1]
+    assert params == {"channel": "chat_events", "payload": '5:{"text":"hi"}'}
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_publishes_oversized_message_as_reference(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    handler = AsyncMock()
+    backplane.subscribe(handler)
+    backplane.set_loader(AsyncMock())
+    payload = b'{"type":"message","id":42,"text":"' + b"x" * 8000 + b'"}'
+
+    # Act
+    await backplane.publish(5, payload)
+
+    # Assert
+    connection = mock_engine.begin.return_value.__aenter__.return_value
+    params = connection.execute.await_args.args[1]
+    assert params == {"channel": "chat_events", "payload": "5:@42"}
+    handler.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_rejects_oversized_event_without_reference(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    backplane.subscribe(AsyncMock())
+    backplane.set_loader(AsyncMock())
+    payload = b'{"type":"read_receipt","text":"' + b"x" * 8000 + b'"}'
+
+    # Act / Assert
+    with pytest.raises(EventTooLarge):
+        await backplane.publish(5, payload)
+    mock_engine.begin.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_reports_gap_when_publish_fails(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    backplane.subscribe(AsyncMock())
+    gaps = []
+    backplane.add_gap_listener(gaps.append)
+    mock_engine.begin.return_value.__aenter__.return_value.execute.side_effect = RuntimeError("db is down")
+
+    # Act / Assert
+    with pytest.raises(RuntimeError):
+        await backplane.publish(5, b'{"type":"message","id":1}')
+    assert gaps == [5]
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_loads_referenced_message(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    handler = AsyncMock()
+    backplane.subscribe(handler)
+    loader = AsyncMock(return_value=b'{"type":"message","id":42}')
+    backplane.set_loader(loader)
+
+    # Act
+    backplane._on_notify(None, 1, "chat_events", "5:@42")
+    await asyncio.sleep(0)
+
+    # Assert
+    loader.assert_awaited_once_with(42)
+    handler.assert_awaited_once_with(5, b'{"type":"message","id":42}')
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_reconnects_after_connection_loss(mock_engine):
+    # Arrange
+    first, second = AsyncMock(), AsyncMock()
+    mock_engine.connect = AsyncMock(side_effect=[first, second])
+    for connection in (first, second):
+        raw = connection.get_raw_connection.return_value
+        raw.driver_connection.add_termination_listener = MagicMock()
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    backplane.RECONNECT_MIN_DELAY = 0
+    backplane.subscribe(AsyncMock())
+    gaps = []
+    backplane.add_gap_listener(gaps.append)
+    await backplane.start()
+    driver = first.get_raw_connection.return_value.driver_connection
+    on_terminate = driver.add_termination_listener.call_args.args[0]
+
+    # Act
+    on_terminate(driver)
+    await backplane._reconnect_task
+
+    # Assert
+    first.invalidate.assert_awaited_once()
+    new_driver = second.get_raw_connection.return_value.driver_connection
+    new_driver.add_listener.assert_awaited_once_with("chat_events", backplane._on_notify)
+    assert backplane._connection is second
+    assert backplane._reconnect_task is None
+    # Кэши сбрасываются при обрыве и еще раз после восстановления LISTEN
+    assert gaps == [None, None]
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_dispatches_notifications(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    handler = AsyncMock()
+    backplane.subscribe(handler)
+
+    # Act
+    backplane._on_notify(None, 1, "chat_events", '7:{"text":"a:b"}')
+    await asyncio.sleep(0)
+
+    # Assert
+    handler.assert_awaited_once_with(7, b'{"text":"a:b"}')
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_keeps_chat_order_while_reference_loads(mock_engine):
+    # Arrange
+    backplane = PostgresBackplane(mock_engine, "chat_events")
+    delivered = []
+
+    async def handler(chat_id, payload):
+        delivered.append((chat_id, payload))
+
+    backplane.subscribe(handler)
+    loaded = asyncio.Event()
+
+    async def loader(message_id):
+        await loaded.wait()
+        return b'{"type":"message","id":42}'
+
+    backplane.set_loader(loader)
+
+    # Act
+    # Ссылка ждет загрузки из базы, а следом приходят события того же и другого чата
+    backplane._on_notify(None, 1, "chat_events", "5:@42")
+    backplane._on_notify(None, 1, "chat_events", '5:{"type":"read_up_to"}')
+    backplane._on_notify(None, 1, "chat_events", '6:{"type":"read_up_to"}')
+    for _ in range(3):
+        await asyncio.sleep(0)
+    before_load = list(delivered)
+    loaded.set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert before_load == [(6, b'{"type":"read_up_to"}')]
+    assert delivered[1:] == [
+        (5, b'{"type":"message","id":42}'),
+        (5, b'{"type":"read_up_to"}')
+    ]
+    assert backplane._pending == {}
@@ -0,0 +1,70 @@
+import json
+import pytest
+from app.core.event_log import EventLog
+
+def test_stamp_adds_event_id_and_tracks_last_message():
+    # Arrange
+    log = EventLog()
+
+    # Act
+    seq, frame = log.stamp(b'{"type":"message","id":42,"text":"hi"}')
+
+    # Assert
+    event = json.loads(frame)
+    assert seq == 1
+    assert event["event_id"] == f"{log.epoch}:1:42"
+    assert event["text"] == "hi"
+    assert log.parse(event["event_id"]).message_id == 42
+
+def test_replay_returns_events_after_position():
+    # Arrange
+    log = EventLog()
+    log.track(1)
+    for n in range(3):
+        seq, frame = log.stamp(json.dumps({"type": "read_up_to", "n": n}).encode())
+        log.record(1, seq, frame)
+
+    # Act
+    frames = log.replay(1, log.parse(f"{log.epoch}:1:0"))
+
+    # Assert
+    assert [json.loads(frame)["n"] for frame in frames] == [1, 2]
+
+def test_replay_refuses_gap_older_than_log():
+    # Arrange
+    log = EventLog(per_user=2)
+    log.track(1)
+    for n in range(5):
+        seq, frame = log.stamp(b'{"type":"x"}')
+        log.record(1, seq, frame)
+
+    # Act & Assert
+    assert log.replay(1, log.parse(f"{log.epoch}:1:0")) is None
+    assert len(log.replay(1, log.parse(f"{log.epoch}:3:0"))) == 2
+
+def test_replay_refuses_other_worker_and_events_before_tracking():
+    # Arrange
+    log = EventLog()
+    log.stamp(b'{"type":"x"}')
+    log.track(1)
+
+    # Act & Assert
+    assert log.replay(1, log.parse("deadbeef:1:0")) is None
+    assert log.replay(1, log.parse(f"{log.epoch}:0:0")) is None
+    assert log.replay(1, log.parse(f"{log.epoch}:1:0")) == []
+
+@pytest.mark.parametrize("event_id", ["", "abc", "a:b:c", None])
+def test_parse_invalid_event_id(event_id):
+    # Act & Assert
+    assert EventLog.parse(event_id) is None
+
+def test_log_is_dropped_after_retention():
+    # Arrange
+    log = EventLog(retention=0)
+    log.track(1)
+
+    # Act
+    log.untrack(1)
+
+    # Assert
+    assert not log.has_users
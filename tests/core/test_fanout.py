@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.core.fanout import FanoutPool
+
+@pytest.mark.asyncio
+async def test_pool_yields_to_event_loop_between_chunks():
+    # Arrange
+    pool = FanoutPool(workers=1)
+    pool.start()
+    order = []
+
+    async def other_work():
+        order.append("other")
+
+    # Act
+    pool.submit(1, [[1], [2], [3]], lambda chunk: order.append(chunk[0]))
+    asyncio.create_task(other_work())
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    # Assert
+    # Посторонняя задача успела выполниться между пачками
+    assert order.index("other") < order.index(3)
+    assert sorted(x for x in order if x != "other") == [1, 2, 3]
+    await pool.stop()
+
+@pytest.mark.asyncio
+async def test_broadcasts_of_one_chat_keep_order():
+    # Arrange
+    pool = FanoutPool(workers=4)
+    pool.start()
+    delivered = []
+
+    # Act
+    for n in range(10):
+        pool.submit(7, [["a"], ["b"]], lambda chunk, n=n: delivered.append((n, chunk[0])))
+    assert pool.has_pending(7)
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert delivered == [(n, part) for n in range(10) for part in ("a", "b")]
+    assert not pool.has_pending(7)
+    await pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_delivers_one_chunk_per_loop_turn():
+    # Arrange
+    pool = FanoutPool(workers=4)
+    pool.start()
+    turns = []
+    turn = 0
+
+    # Act
+    for chat_id in range(4):
+        pool.submit(chat_id, [[1], [2]], lambda chunk: turns.append(turn))
+    while len(turns) < 8:
+        await asyncio.sleep(0)
+        turn += 1
+
+    # Assert
+    # Пачки разных чатов не складываются в один оборот цикла событий
+    assert len(set(turns)) == len(turns)
+    await pool.stop()
+
+@pytest.mark.asyncio
+async def test_stats_track_chunk_latency():
+    # Arrange
+    pool = FanoutPool()
+
+    # Act
+    await pool.run_inline([[1], [2]], lambda chunk: None)
+
+    # Assert
+    stats = pool.stats()
+    assert stats["broadcasts"] == 1
+    assert stats["chunks"] == 2
+    assert stats["chunk_max_ms"] >= stats["chunk_p50_ms"] >= 0
+
+@pytest.mark.asyncio
+async def test_failing_broadcast_does_not_stop_worker(caplog):
+    # Arrange
+    pool = FanoutPool(workers=1)
+    pool.start()
+    delivered = []
+
+    def fail(chunk):
+        raise RuntimeError("boom")
+
+    # Act
+    pool.submit(1, [[1]], fail)
+    pool.submit(1, [[2]], lambda chunk: delivered.append(chunk[0]))
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert delivered == [2]
+    assert "Failed to fan out event to chat 1" in caplog.text
+    await pool.stop()
@@ -0,0 +1,210 @@
+from datetime import datetime
+from app.core import serialization
+from app.core.history_cache import RecentMessagesCache
+
+def make_message(message_id: int, chat_id: int = 1) -> dict:
+    return {
+        "id": message_id,
+        "chat_id": chat_id,
+        "sender_id": 1,
+        "text": f"message {message_id}",
+        "timestamp": datetime(2024, 1, 1),
+        "is_read": False
+    }
+
+def seed(cache: RecentMessagesCache, chat_id: int, messages: list, requested: int):
+    cache.begin_seed(chat_id)
+    cache.seed(chat_id, messages, requested=requested)
+
+def test_unseeded_chat_is_a_miss():
+    # Arrange
+    cache = RecentMessagesCache()
+
+    # Act
+    cache.add(1, make_message(1))
+    result = cache.get_latest(1, limit=10)
+
+    # Assert
+    assert result is None
+    assert cache.stats()["misses"] == 1
+
+def test_seeded_chat_serves_latest_messages_with_new_ones():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    seed(cache, 1, [make_message(i) for i in range(1, 4)], requested=3)
+
+    # Act
+    cache.add(1, make_message(4))
+    result = cache.get_latest(1, limit=3)
+
+    # Assert
+    assert [message.id for message in result] == [2, 3, 4]
+    assert cache.stats()["hit_rate"] == 1.0
+
+def test_short_chat_is_served_completely():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    seed(cache, 1, [make_message(1), make_message(2)], requested=50)
+
+    # Act
+    result = cache.get_latest(1, limit=50)
+
+    # Assert
+    assert [message.id for message in result] == [1, 2]
+
+def test_page_older_than_buffer_is_a_miss():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=3)
+    seed(cache, 1, [make_message(i) for i in range(1, 4)], requested=3)
+
+    # Act
+    cache.add(1, make_message(4))
+    result = cache.get_latest(1, limit=2, before_id=3)
+
+    # Assert
+    assert result is None
+
+def test_before_id_is_served_inside_buffer():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    seed(cache, 1, [make_message(i) for i in range(1, 6)], requested=5)
+
+    # Act
+    result = cache.get_latest(1, limit=2, before_id=5)
+
+    # Assert
+    assert [message.id for message in result] == [3, 4]
+
+def test_out_of_order_and_duplicate_messages_keep_ids_sorted():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    seed(cache, 1, [make_message(1), make_message(2)], requested=2)
+
+    # Act
+    cache.add(1, make_message(5))
+    cache.add(1, make_message(4))
+    cache.add(1, make_message(5))
+
+    # Assert
+    assert [message.id for message in cache.get_latest(1, limit=4)] == [1, 2, 4, 5]
+    assert cache.stats()["messages"] == 4
+
+def test_global_cap_evicts_least_recently_used_chat():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5, max_messages=6)
+    seed(cache, 1, [make_message(i, chat_id=1) for i in range(1, 4)], requested=3)
+    seed(cache, 2, [make_message(i, chat_id=2) for i in range(1, 4)], requested=3)
+    cache.get_latest(1, limit=1)
+
+    # Act
+    seed(cache, 3, [make_message(1, chat_id=3)], requested=1)
+
+    # Assert
+    assert cache.get_latest(2, limit=1) is None
+    assert cache.get_latest(1, limit=1) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["messages"] == 4
+
+def test_observe_adds_broadcast_messages():
+    # Arrange
+    cache = RecentMessagesCache()
+    seed(cache, 1, [], requested=50)
+    event = {"type": "message", **make_message(7)}
+
+    # Act
+    cache.observe(1, serialization.dumps(event))
+    cache.observe(1, serialization.dumps({"type": "read_up_to", "message_id": 7}))
+
+    # Assert
+    assert [message.id for message in cache.get_latest(1, limit=50)] == [7]
+
+def test_messages_broadcast_during_seed_read_are_merged():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    cache.begin_seed(1)
+    event = {"type": "message", **make_message(4)}
+
+    # Act
+    cache.observe(1, serialization.dumps(event))
+    cache.seed(1, [make_message(i) for i in range(1, 4)], requested=3)
+
+    # Assert
+    assert [message.id for message in cache.get_latest(1, limit=4)] == [1, 2, 3, 4]
+
+def test_invalidate_during_seed_read_skips_seed():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    cache.begin_seed(1)
+
+    # Act
+    cache.invalidate(1)
+    cache.seed(1, [make_message(1)], requested=50)
+
+    # Assert
+    assert cache.get_latest(1, limit=1) is None
+
+def test_cancelled_seed_is_ignored():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    cache.begin_seed(1)
+    cache.cancel_seed(1)
+
+    # Act
+    cache.seed(1, [make_message(1)], requested=50)
+
+    # Assert
+    assert cache.get_latest(1, limit=1) is None
+
+def test_expired_buffer_is_a_miss():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5, ttl=0)
+    seed(cache, 1, [make_message(1)], requested=50)
+
+    # Act
+    result = cache.get_latest(1, limit=1)
+
+    # Assert
+    assert result is None
+    assert cache.stats()["chats"] == 0
+
+def test_forget_drops_one_chat_or_all_chats():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    for chat_id in (1, 2, 3):
+        seed(cache, chat_id, [make_message(1, chat_id=chat_id)], requested=50)
+
+    # Act
+    cache.forget(1)
+    after_publish_failure = cache.stats()["chats"]
+    cache.forget()
+
+    # Assert
+    assert after_publish_failure == 2
+    assert cache.get_latest(1, limit=1) is None
+    assert cache.stats()["chats"] == 0
+
+def test_read_receipt_marks_cached_message_read():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    seed(cache, 1, [make_message(1), make_message(2)], requested=50)
+    receipt = {"type": "read_receipt", "message_id": 1, "chat_id": 1, "reader_id": 2}
+
+    # Act
+    cache.observe(1, serialization.dumps(receipt))
+
+    # Assert
+    assert [message.is_read for message in cache.get_latest(1, limit=2)] == [True, False]
+
+def test_read_receipt_during_seed_read_is_applied():
+    # Arrange
+    cache = RecentMessagesCache(per_chat=5)
+    cache.begin_seed(1)
+    receipt = {"type": "read_receipt", "message_id": 2, "chat_id": 1, "reader_id": 2}
+
+    # Act
+    # Страница прочитана из базы до commit отметки
+    cache.observe(1, serialization.dumps(receipt))
+    cache.seed(1, [make_message(1), make_message(2)], requested=50)
+
+    # Assert
+    assert [message.is_read for message in cache.get_latest(1, limit=2)] == [False, True]
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.core.membership import ChatMembershipIndex
+
+@pytest.mark.asyncio
+async def test_get_loads_once_and_counts_hits():
+    # Arrange
+    loader = AsyncMock(return_value={1, 2})
+    index = ChatMembershipIndex(loader=loader, max_size=10)
+
+    # Act
+    first = await index.get(1)
+    second = await index.get(1)
+
+    # Assert
+    assert first == second == {1, 2}
+    loader.assert_awaited_once_with(1)
+    assert index.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    # Arrange
+    async def slow_loader(chat_id):
+        await asyncio.sleep(0.01)
+        return {chat_id}
+
+    loader = AsyncMock(side_effect=slow_loader)
+    index = ChatMembershipIndex(loader=loader)
+
+    # Act
+    results = await asyncio.gather(*(index.get(1) for _ in range(5)))
+
+    # Assert
+    assert results == [{1}] * 5
+    loader.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_least_recently_used_chat_is_evicted():
+    # Arrange
+    loader = AsyncMock(side_effect=lambda chat_id: {chat_id})
+    index = ChatMembershipIndex(loader=loader, max_size=2)
+    await index.get(1)
+    await index.get(2)
+    await index.get(1)
+
+    # Act
+    await index.get(3)
+    await index.get(1)
+    await index.get(2)
+
+    # Assert
+    assert index.evictions == 2
+    assert [call.args[0] for call in loader.await_args_list] == [1, 2, 3, 2]
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload():
+    # Arrange
+    loader = AsyncMock(side_effect=[{1}, {1, 2}])
+    index = ChatMembershipIndex(loader=loader)
+    await index.get(1)
+
+    # Act
+    index.invalidate(1)
+    result = await index.get(1)
+
+    # Assert
+    assert result == {1, 2}
+    assert loader.await_count == 2
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_discards_stale_result():
+    # Arrange
+    release = asyncio.Event()
+
+    async def blocking_loader(chat_id):
+        await release.wait()
+        return {1}
+
+    index = ChatMembershipIndex(loader=blocking_loader)
+    task = asyncio.create_task(index.get(1))
+    await asyncio.sleep(0)
+
+    # Act
+    index.invalidate(1)
+    release.set()
+    await task
+
+    # Assert
+    assert index.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_reloaded():
+    # Arrange
+    loader = AsyncMock(side_effect=[{1}, {2}])
+    index = ChatMembershipIndex(loader=loader, ttl=0)
+
+    # Act
+    await index.get(1)
+    result = await index.get(1)
+
+    # Assert
+    assert result == {2}
+
+@pytest.mark.asyncio
+async def test_without_loader_index_is_filled_by_add():
+    # Arrange
+    index = ChatMembershipIndex()
+
+    # Act
+    index.add(1, 10)
+    index.add(1, 11)
+    index.discard(1, 10)
+
+    # Assert
+    assert await index.get(1) == {11}
+    assert await index.get(2) == set()
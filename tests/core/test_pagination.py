@@ -0,0 +1,43 @@
+import pytest
+from fastapi import HTTPException
+from app.core.pagination import encode_cursor, decode_cursor, decode_search_cursor, decode_sync_cursor
+
+def test_cursor_round_trip():
+    # Arrange
+    position = {"id": 12345, "d": "backward"}
+
+    # Act
+    cursor = encode_cursor(position)
+
+    # Assert
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor([1, 2])[:-1], ""])
+def test_invalid_cursor_is_rejected(cursor):
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+
+    assert exc_info.value.status_code == 400
+
+def test_search_cursor_round_trip():
+    # Act
+    position = decode_search_cursor(encode_cursor({"r": 0.0607927, "id": 42}))
+
+    # Assert
+    assert position == (0.0607927, 42)
+
+def test_search_cursor_without_rank_is_rejected():
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        decode_search_cursor(encode_cursor({"id": 42}))
+
+    assert exc_info.value.status_code == 400
+
+def test_sync_cursor_without_message_time():
+    # Act
+    position = decode_sync_cursor(encode_cursor({"m": 0, "ts": None, "r": 0, "e": 0}))
+
+    # Assert
+    assert position == {"m": 0, "ts": None, "r": 0, "e": 0, "at": None}
@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.database.partitions import (
+    add_months, create_partitions, detach_partitions, partition_month, partition_name
+)
+
+def test_add_months_crosses_year_boundary():
+    # Act & Assert
+    assert add_months(datetime(2026, 11, 1), 2) == datetime(2027, 1, 1)
+    assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+
+def test_partition_name_round_trip():
+    # Act
+    name = partition_name(datetime(2026, 3, 1))
+
+    # Assert
+    assert name == "messages_p2026_03"
+    assert partition_month(name) == datetime(2026, 3, 1)
+    assert partition_month("messages_archive") is None
+
+@pytest.mark.asyncio
+async def test_create_partitions_skips_existing():
+    # Arrange
+    conn = AsyncMock()
+    with patch("app.core.database.partitions.list_partitions", AsyncMock(return_value=["messages_p2026_10"])):
+        # Act
+        created = await create_partitions(conn, datetime(2026, 10, 18), months_ahead=2)
+
+    # Assert
+    assert created == ["messages_p2026_11", "messages_p2026_12"]
+    ddl = str(conn.execute.call_args_list[-1].args[0])
+    assert "PARTITION OF messages FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')" in ddl
+
+@pytest.mark.asyncio
+async def test_detach_partitions_detaches_only_older_months():
+    # Arrange
+    conn = AsyncMock()
+    conn.execution_options.return_value = conn
+    engine = MagicMock()
+    engine.connect.return_value.__aenter__.return_value = conn
+    partitions = ["messages_p2026_07", "messages_p2026_08", "messages_p2026_09"]
+    with patch("app.core.database.partitions.list_partitions", AsyncMock(return_value=partitions)):
+        # Act
+        detached = await detach_partitions(engine, before=datetime(2026, 9, 10))
+
+    # Assert
+    assert detached == ["messages_p2026_07", "messages_p2026_08"]
+    conn.execution_options.assert_called_once_with(isolation_level="AUTOCOMMIT")
+    assert "DETACH PARTITION messages_p2026_08 CONCURRENTLY" in str(conn.execute.call_args.args[0])
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+from typing import List
+from fastapi import Response
+from pydantic import TypeAdapter
+from app.core.responses import ListEncoder
+from app.models.message import Message as MessageModel
+from app.schemas.message import Message, MessageSearchResult
+
+def test_list_encoder_matches_response_model_output():
+    # Arrange
+    messages = [
+        MessageModel(id=1, chat_id=2, sender_id=3, text="Привет", timestamp=datetime(2026, 10, 1, 12, 30, 0, 123), is_read=False)
+    ]
+    adapter = TypeAdapter(List[Message])
+    expected = adapter.dump_json(adapter.validate_python(messages, from_attributes=True))
+
+    # Act
+    body = ListEncoder(Message).encode(messages)
+
+    # Assert
+    assert json.loads(body) == json.loads(expected)
+
+def test_list_encoder_accepts_row_mappings():
+    # Arrange
+    row = {
+        "id": 1, "chat_id": 2, "sender_id": 3, "timestamp": datetime(2026, 10, 1),
+        "rank": 0.5, "snippet": "<mark>hi</mark>", "text": "not in schema"
+    }
+
+    # Act
+    body = ListEncoder(MessageSearchResult).encode([row])
+
+    # Assert
+    assert json.loads(body) == [{
+        "id": 1, "chat_id": 2, "sender_id": 3, "timestamp": "2026-10-01T00:00:00",
+        "rank": 0.5, "snippet": "<mark>hi</mark>"
+    }]
+
+def test_list_encoder_response_keeps_handler_headers():
+    # Arrange
+    handler_response = Response()
+    handler_response.headers["X-Next-Cursor"] = "abc"
+
+    # Act
+    response = ListEncoder(Message).response([], handler_response)
+
+    # Assert
+    assert response.body == b"[]"
+    assert response.media_type == "application/json"
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.headers["content-length"] == "2"
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import pytest
+from passlib.context import CryptContext
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+@pytest.fixture
+def context():
+    # Минимальная стоимость, чтобы тесты шли быстро
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__default_rounds=4,
+        bcrypt__min_rounds=4,
+        bcrypt__max_rounds=4
+    )
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_run_off_the_event_loop(context):
+    # Arrange
+    hasher = PasswordHasher(context, workers=2)
+    threads = []
+    original = context.hash
+
+    def recording_hash(password):
+        threads.append(threading.current_thread())
+        return original(password)
+
+    context.hash = recording_hash
+
+    # Act
+    hashed = await hasher.hash("secret")
+    valid, new_hash = await hasher.verify_and_update("secret", hashed)
+
+    # Assert
+    assert threads and threads[0] is not threading.main_thread()
+    assert valid is True and new_hash is None
+    assert hasher.stats()["completed"] == 2
+    hasher.stop()
+
+@pytest.mark.asyncio
+async def test_hash_with_other_cost_is_upgraded(context):
+    # Arrange
+    hasher = PasswordHasher(context)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=5).hash("secret")
+
+    # Act
+    valid, new_hash = await hasher.verify_and_update("secret", old_hash)
+
+    # Assert
+    assert valid is True
+    assert new_hash.startswith("$2b$04$")
+    hasher.stop()
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_queue_depth(context):
+    # Arrange
+    hasher = PasswordHasher(context, workers=1, max_pending=3)
+    release = threading.Event()
+    context.hash = lambda password: release.wait(5) and password
+
+    # Act
+    tasks = [asyncio.create_task(hasher.hash(str(n))) for n in range(3)]
+    await asyncio.sleep(0.05)
+    with pytest.raises(PasswordHasherBusy):
+        await hasher.hash("overflow")
+    depth = hasher.stats()["queue_depth"]
+    release.set()
+    await asyncio.gather(*tasks)
+
+    # Assert
+    # Один поток занят, две операции ждут в очереди
+    assert depth == 2
+    stats = hasher.stats()
+    assert stats["peak_queue_depth"] == 2
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+    hasher.stop()
@@ -0,0 +1,83 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database.unit_of_work import UnitOfWork, after_commit, commit
+
+@pytest.fixture
+def mock_db():
+    return AsyncMock(spec=AsyncSession)
+
+@pytest.mark.asyncio
+async def test_repository_commits_become_flushes_inside_unit_of_work(mock_db):
+    # Act
+    async with UnitOfWork(mock_db):
+        await commit(mock_db)
+        await commit(mock_db)
+        mock_db.commit.assert_not_called()
+
+    # Assert
+    assert mock_db.flush.call_count == 2
+    mock_db.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_commit_outside_unit_of_work(mock_db):
+    # Act
+    await commit(mock_db)
+
+    # Assert
+    mock_db.commit.assert_called_once()
+    mock_db.flush.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_nested_unit_of_work_joins_outer(mock_db):
+    # Act
+    async with UnitOfWork(mock_db) as outer:
+        async with UnitOfWork(mock_db) as inner:
+            await commit(mock_db)
+        mock_db.commit.assert_not_called()
+
+    # Assert
+    assert inner is outer
+    mock_db.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_other_session_is_not_affected(mock_db):
+    # Arrange
+    other_db = AsyncMock(spec=AsyncSession)
+
+    # Act
+    async with UnitOfWork(mock_db):
+        await commit(other_db)
+
+    # Assert
+    other_db.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_rollback_on_error_skips_after_commit_callbacks(mock_db):
+    # Arrange
+    callback = MagicMock()
+
+    # Act
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(mock_db):
+            after_commit(mock_db, callback)
+            raise RuntimeError("boom")
+
+    # Assert
+    mock_db.rollback.assert_called_once()
+    mock_db.commit.assert_not_called()
+    callback.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_after_commit_runs_after_commit(mock_db):
+    # Arrange
+    callback = MagicMock()
+
+    # Act
+    async with UnitOfWork(mock_db):
+        after_commit(mock_db, callback)
+        callback.assert_not_called()
+    after_commit(mock_db, callback)
+
+    # Assert
+    assert callback.call_count == 2
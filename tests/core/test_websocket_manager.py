@@ -0,0 +1,319 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.core.websocket_manager import ConnectionManager, OverflowPolicy, _closing_tasks
+from app.core.event_log import EventLog
+
+def make_websocket(send_delay: float = 0):
+    websocket = AsyncMock()
+    websocket.sent = []
+
+    async def send_frame(frame):
+        if send_delay:
+            await asyncio.sleep(send_delay)
+        websocket.sent.append(json.loads(frame))
+
+    websocket.send_text.side_effect = send_frame
+    websocket.send_bytes.side_effect = send_frame
+    return websocket
+
+@pytest.mark.asyncio
+async def test_send_message_does_not_wait_for_slow_client():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=10, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    slow = make_websocket(send_delay=10)
+    fast = make_websocket()
+    await manager.connect(slow, 1)
+    await manager.connect(fast, 2)
+    manager.add_user_to_chat(1, 1)
+    manager.add_user_to_chat(1, 2)
+
+    # Act
+    await asyncio.wait_for(manager.send_message({"text": "hi"}, 1), timeout=0.1)
+    await asyncio.sleep(0.01)
+
+    # Assert
+    assert fast.sent == [{"text": "hi"}]
+    assert slow.sent == []
+    manager.disconnect(1)
+    manager.disconnect(2)
+
+@pytest.mark.asyncio
+async def test_idle_connection_holds_no_writer_task():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=10, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    websocket = make_websocket()
+    connection = await manager.connect(websocket, 1)
+    manager.add_user_to_chat(1, 1)
+    assert connection._writer is None
+
+    # Act
+    await manager.send_message({"n": 1}, 1)
+    await manager.send_message({"n": 2}, 1)
+    writer = connection._writer
+    await writer
+
+    # Assert
+    # Писатель отправил оба кадра и завершился вместе с опустевшей очередью
+    assert websocket.sent == [{"n": 1}, {"n": 2}]
+    assert connection._writer is None
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_latest_events():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=2, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    websocket = make_websocket(send_delay=10)
+    connection = await manager.connect(websocket, 1)
+    manager.add_user_to_chat(1, 1)
+    await asyncio.sleep(0)  # писатель забирает первое событие и зависает на отправке
+
+    # Act
+    for i in range(5):
+        await manager.send_message({"n": i}, 1)
+
+    # Assert
+    assert [json.loads(connection.queue.popleft())["n"] for _ in range(2)] == [3, 4]
+    assert connection.dropped == 3
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_drop_new_policy_rejects_events():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=1, overflow_policy=OverflowPolicy.DROP_NEW)
+    websocket = make_websocket(send_delay=10)
+    connection = await manager.connect(websocket, 1)
+    manager.add_user_to_chat(1, 1)
+
+    # Act
+    for i in range(3):
+        await manager.send_message({"n": i}, 1)
+
+    # Assert
+    assert json.loads(connection.queue.popleft()) == {"n": 0}
+    assert connection.dropped == 2
+    assert 1 in manager.active_connections
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_drops_slow_consumer():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=1, overflow_policy=OverflowPolicy.DISCONNECT)
+    websocket = make_websocket(send_delay=10)
+    await manager.connect(websocket, 1)
+    manager.add_user_to_chat(1, 1)
+
+    # Act
+    for i in range(3):
+        await manager.send_message({"n": i}, 1)
+    # Задача закрытия сокета удерживается до завершения
+    assert len(_closing_tasks) == 1
+    await asyncio.sleep(0)
+
+    # Assert
+    assert 1 not in manager.active_connections
+    websocket.close.assert_awaited_once()
+    await asyncio.sleep(0)  # done-callback убирает завершенную задачу
+    assert not _closing_tasks
+
+@pytest.mark.asyncio
+async def test_send_message_encodes_once_for_all_recipients():
+    # Arrange
+    manager = ConnectionManager()
+    connections = []
+    for user_id in range(3):
+        connections.append(await manager.connect(make_websocket(), user_id))
+        manager.add_user_to_chat(1, user_id)
+
+    # Act
+    await manager.send_message({"type": "message", "text": "hi"}, 1)
+    await asyncio.sleep(0)
+
+    # Assert
+    frames = [connection.websocket.send_text.await_args.args[0] for connection in connections]
+    assert all(frame is frames[0] for frame in frames)
+    assert json.loads(frames[0]) == {"type": "message", "text": "hi"}
+    for user_id in range(3):
+        manager.disconnect(user_id)
+
+@pytest.mark.asyncio
+async def test_binary_frames_are_sent_as_bytes():
+    # Arrange
+    manager = ConnectionManager(binary_frames=True)
+    websocket = make_websocket()
+    await manager.connect(websocket, 1)
+    manager.add_user_to_chat(1, 1)
+
+    # Act
+    await manager.send_message({"text": "hi"}, 1)
+    await asyncio.sleep(0)
+
+    # Assert
+    websocket.send_bytes.assert_awaited_once()
+    websocket.send_text.assert_not_awaited()
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_second_device_does_not_replace_first():
+    # Arrange
+    manager = ConnectionManager()
+    web = make_websocket()
+    phone = make_websocket()
+    manager.add_user_to_chat(1, 1)
+
+    # Act
+    web_connection = await manager.connect(web, 1)
+    phone_connection = await manager.connect(phone, 1)
+    await manager.send_message({"text": "hi"}, 1)
+    await asyncio.sleep(0)
+
+    # Assert
+    assert web_connection.id != phone_connection.id
+    assert manager.connection_count(1) == 2
+    assert web.sent == [{"text": "hi"}]
+    assert phone.sent == [{"text": "hi"}]
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_disconnect_removes_only_given_connection():
+    # Arrange
+    manager = ConnectionManager()
+    web_connection = await manager.connect(make_websocket(), 1)
+    phone_connection = await manager.connect(make_websocket(), 1)
+
+    # Act
+    manager.disconnect(1, web_connection.id)
+
+    # Assert
+    assert web_connection.closed
+    assert not phone_connection.closed
+    assert manager.connection_counts() == {1: 1}
+
+    manager.disconnect(1, phone_connection.id)
+    assert 1 not in manager.active_connections
+    assert manager.connection_count(1) == 0
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_missed_events_from_log():
+    # Arrange
+    manager = ConnectionManager(event_log=EventLog())
+    manager.add_user_to_chat(1, 1)
+    first = make_websocket()
+    connection = await manager.connect(first, 1)
+    await manager.send_message({"type": "message", "id": 10, "text": "seen"}, 1)
+    await asyncio.sleep(0)
+    last_event_id = first.sent[-1]["event_id"]
+    manager.disconnect(1, connection.id)
+    await manager.send_message({"type": "message", "id": 11, "text": "missed"}, 1)
+
+    # Act
+    second = make_websocket()
+    resumed = await manager.connect(second, 1, last_event_id)
+    await asyncio.sleep(0)
+
+    # Assert
+    assert not resumed.holding
+    assert [event.get("text") for event in second.sent] == ["missed", None]
+    assert second.sent[-1]["type"] == "resumed"
+    assert second.sent[-1]["source"] == "log"
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_reconnect_with_unknown_event_holds_live_events():
+    # Arrange
+    manager = ConnectionManager(event_log=EventLog())
+    manager.add_user_to_chat(1, 1)
+    websocket = make_websocket()
+
+    # Act
+    connection = await manager.connect(websocket, 1, "otherworker:5:100")
+    await manager.send_message({"type": "message", "id": 101, "text": "live"}, 1)
+    await asyncio.sleep(0)
+    held = list(websocket.sent)
+    connection.release(['{"type":"message","id":100,"text":"from db"}'])
+    await asyncio.sleep(0)
+
+    # Assert
+    assert held == []
+    assert [event["text"] for event in websocket.sent] == ["from db", "live"]
+    manager.disconnect(1)
+
+@pytest.mark.asyncio
+async def test_large_chat_is_delivered_in_chunks_by_pool():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=10, fanout_chunk_size=2, fanout_workers=2)
+    manager.fanout.start()
+    websockets = {user_id: make_websocket() for user_id in range(1, 6)}
+    for user_id, websocket in websockets.items():
+        await manager.connect(websocket, user_id)
+        manager.add_user_to_chat(1, user_id)
+
+    # Act
+    await manager.send_message({"text": "announce"}, 1)
+    # Рассылка идет в фоне, пачки по два получателя
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert all(ws.sent == [{"text": "announce"}] for ws in websockets.values())
+    assert manager.fanout.stats()["chunks"] == 3
+    await manager.fanout.stop()
+    for user_id in websockets:
+        manager.disconnect(user_id)
+
+@pytest.mark.asyncio
+async def test_small_chat_event_waits_behind_pending_broadcast_of_same_chat():
+    # Arrange
+    manager = ConnectionManager(max_queue_size=10, fanout_chunk_size=2, fanout_workers=1)
+    manager.fanout.start()
+    websockets = {user_id: make_websocket() for user_id in range(1, 4)}
+    for user_id, websocket in websockets.items():
+        await manager.connect(websocket, user_id)
+        manager.add_user_to_chat(1, user_id)
+
+    # Act
+    await manager.send_message({"n": 1}, 1)
+    # Участник вышел, чат стал маленьким, но первая рассылка еще в пуле
+    manager.remove_user_from_chat(1, 3)
+    await manager.send_message({"n": 2}, 1)
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert websockets[1].sent == [{"n": 1}, {"n": 2}]
+    assert websockets[3].sent == [{"n": 1}]
+    await manager.fanout.stop()
+    for user_id in websockets:
+        manager.disconnect(user_id)
+
+@pytest.mark.asyncio
+async def test_event_ids_grow_in_delivery_order_with_pending_broadcast():
+    # Arrange
+    log = EventLog()
+    manager = ConnectionManager(max_queue_size=10, event_log=log, fanout_chunk_size=2, fanout_workers=1)
+    manager.fanout.start()
+    websockets = {user_id: make_websocket() for user_id in range(1, 6)}
+    for user_id, websocket in websockets.items():
+        await manager.connect(websocket, user_id)
+        manager.add_user_to_chat(1, user_id)
+    manager.add_user_to_chat(2, 5)
+
+    # Act
+    # Рассылка в группу уходит в пул, личное сообщение доставляется сразу
+    await manager.send_message({"type": "announcement"}, 1)
+    await manager.send_message({"type": "direct"}, 2)
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    # Assert
+    sent = websockets[5].sent
+    assert [event["type"] for event in sent] == ["direct", "announcement"]
+    seqs = [log.parse(event["event_id"]).seq for event in sent]
+    assert seqs == sorted(seqs)
+    # Досылка после первого полученного события не теряет второе
+    assert len(log.replay(5, log.parse(sent[0]["event_id"]))) == 1
+    await manager.fanout.stop()
+    for user_id in websockets:
+        manager.disconnect(user_id)
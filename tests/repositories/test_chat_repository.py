@@ -1,8 +1,12 @@
 import pytest
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql
 from app.repositories.chat_repository import ChatRepository
+from app.core.access_cache import access_cache
 from app.models.chat import Chat, ChatType
+from app.models.membership_event import MembershipAction
 
 @pytest.fixture
 def mock_db():
@@ -18,16 +22,19 @@ async def test_create_private_chat(chat_repository, mock_db):
     name = "Private Chat"
     chat_type = ChatType.PRIVATE
     expected_chat = Chat(name=name, type=chat_type)
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = expected_chat
+    mock_result = MagicMock()
+    mock_result.one.return_value = expected_chat
+    mock_db.execute.return_value = mock_result
 
     # Act
     result = await chat_repository.create(name=name, type=chat_type)
 
     # Assert
-    mock_db.add.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO chats") and "RETURNING chats.id" in sql
+    mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
 
     assert result.name == expected_chat.name
     assert result.type == expected_chat.type
@@ -38,16 +45,19 @@ async def test_create_group_chat(chat_repository, mock_db):
     name = "Group Chat"
     chat_type = ChatType.GROUP
     expected_chat = Chat(name=name, type=chat_type)
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = expected_chat
+    mock_result = MagicMock()
+    mock_result.one.return_value = expected_chat
+    mock_db.execute.return_value = mock_result
 
     # Act
     result = await chat_repository.create(name=name, type=chat_type)
 
     # Assert
-    mock_db.add.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO chats") and "RETURNING chats.id" in sql
+    mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
 
     assert result.name == expected_chat.name
     assert result.type == expected_chat.type
@@ -85,104 +95,142 @@ async def test_get_by_id_not_found(chat_repository, mock_db):
     assert result is None
 
 @pytest.mark.asyncio
-async def test_has_access_private_chat(chat_repository, mock_db):
+@pytest.mark.parametrize("exists", [True, False])
+async def test_has_access_single_exists_query(chat_repository, mock_db, exists):
     # Arrange
-    chat_id = 1
-    user_id = 1
-    chat = Chat(id=chat_id, type=ChatType.PRIVATE)
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = chat
+    mock_result.scalar.return_value = exists
     mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.has_access(chat_id, user_id)
+    result = await chat_repository.has_access(1, 2)
 
     # Assert
-    assert result is True
+    assert result is exists
     mock_db.execute.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("SELECT EXISTS (SELECT chats.id")
+    assert "groups.chat_id = chats.id" in sql
+    # Приватный чат доступен только его участникам
+    assert "chats.type != %(type_2)s AND (EXISTS (SELECT chat_participants.user_id" in sql
+    assert "chat_participants.chat_id = chats.id" in sql
 
 @pytest.mark.asyncio
-async def test_has_access_group_chat_member(chat_repository, mock_db):
+async def test_is_group_member_true(chat_repository, mock_db):
     # Arrange
     chat_id = 1
     user_id = 1
-    chat = Chat(id=chat_id, type=ChatType.GROUP)
-    mock_chat_result = MagicMock()
-    mock_chat_result.scalar_one_or_none.return_value = chat
-    mock_group_result = MagicMock()
-    mock_group_result.scalar_one_or_none.return_value = MagicMock()
-    mock_db.execute.side_effect = [mock_chat_result, mock_group_result]
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = MagicMock()
+    mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.has_access(chat_id, user_id)
+    result = await chat_repository.is_group_member(chat_id, user_id)
 
     # Assert
     assert result is True
-    assert mock_db.execute.call_count == 2
+    mock_db.execute.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_has_access_group_chat_non_member(chat_repository, mock_db):
+async def test_is_group_member_false(chat_repository, mock_db):
     # Arrange
     chat_id = 1
     user_id = 1
-    chat = Chat(id=chat_id, type=ChatType.GROUP)
-    mock_chat_result = MagicMock()
-    mock_chat_result.scalar_one_or_none.return_value = chat
-    mock_group_result = MagicMock()
-    mock_group_result.scalar_one_or_none.return_value = None
-    mock_db.execute.side_effect = [mock_chat_result, mock_group_result]
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = None
+    mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.has_access(chat_id, user_id)
+    result = await chat_repository.is_group_member(chat_id, user_id)
 
     # Assert
     assert result is False
-    assert mock_db.execute.call_count == 2
+    mock_db.execute.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_has_access_nonexistent_chat(chat_repository, mock_db):
+async def test_get_member_ids(chat_repository, mock_db):
     # Arrange
-    chat_id = 999
-    user_id = 1
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
+    mock_result.scalars.return_value.all.return_value = [1, 2]
     mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.has_access(chat_id, user_id)
+    result = await chat_repository.get_member_ids(1)
 
     # Assert
-    assert result is False
     mock_db.execute.assert_called_once()
+    assert result == {1, 2}
 
 @pytest.mark.asyncio
-async def test_is_group_member_true(chat_repository, mock_db):
+async def test_add_participants(chat_repository, mock_db):
     # Arrange
-    chat_id = 1
-    user_id = 1
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [3]
     mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.is_group_member(chat_id, user_id)
+    await chat_repository.add_participants(1, [2, 3, 2])
+
+    # Assert
+    insert_call, event_call = mock_db.execute.call_args_list
+    assert "ON CONFLICT DO NOTHING RETURNING" in str(insert_call.args[0].compile(dialect=postgresql.dialect()))
+    # Пользователь 2 уже был участником: событие пишется только для 3
+    assert event_call.args[1] == [{"chat_id": 1, "user_id": 3, "action": MembershipAction.ADDED}]
+    mock_db.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_add_participants_resets_cached_denials(chat_repository, mock_db):
+    # Arrange
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [2]
+    mock_db.execute.return_value = mock_result
+    access_cache.set(2, 1, False)
+
+    # Act
+    await chat_repository.add_participants(1, [2])
+
+    # Assert
+    assert access_cache.get(2, 1) is None
+
+@pytest.mark.asyncio
+async def test_add_participants_empty(chat_repository, mock_db):
+    # Act
+    await chat_repository.add_participants(1, [])
+
+    # Assert
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_reconcile_message_counts(chat_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock(rowcount=1)
+
+    # Act
+    result = await chat_repository.reconcile_message_counts()
 
     # Assert
-    assert result is True
     mock_db.execute.assert_called_once()
+    mock_db.commit.assert_called_once()
+    assert result == 1
+
 
 @pytest.mark.asyncio
-async def test_is_group_member_false(chat_repository, mock_db):
+async def test_get_inbox_joins_summary_message_and_unread_counts(chat_repository, mock_db):
     # Arrange
-    chat_id = 1
-    user_id = 1
+    rows = [{"id": 7, "unread_count": 3}]
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
+    mock_result.mappings.return_value.all.return_value = rows
     mock_db.execute.return_value = mock_result
 
     # Act
-    result = await chat_repository.is_group_member(chat_id, user_id)
+    result = await chat_repository.get_inbox(1, limit=20, before=(datetime(2026, 10, 1), 9))
 
     # Assert
-    assert result is False
-    mock_db.execute.assert_called_once() 
+    mock_db.execute.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "messages.id = chats.last_message_id AND messages.timestamp = chats.last_message_at" in sql
+    assert "LEFT OUTER JOIN read_cursors" in sql
+    assert "(coalesce(chats.last_message_at, chats.created_at), chats.id) <" in sql
+    assert "ORDER BY coalesce(chats.last_message_at, chats.created_at) DESC, chats.id DESC" in sql
+    assert result == rows
@@ -1,8 +1,10 @@
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql
 from app.repositories.group_repository import GroupRepository
 from app.models.group import Group
+from app.models.membership_event import MembershipAction
 
 @pytest.fixture
 def mock_db():
@@ -23,16 +25,19 @@ async def test_create_group(group_repository, mock_db):
         name=name,
         creator_id=creator_id
     )
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = expected_group
+    mock_result = MagicMock()
+    mock_result.one.return_value = expected_group
+    mock_db.execute.return_value = mock_result
 
     # Act
     result = await group_repository.create(chat_id, name, creator_id)
 
     # Assert
-    mock_db.add.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO groups") and "RETURNING groups.id" in sql
+    mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
 
     assert result.chat_id == expected_group.chat_id
     assert result.name == expected_group.name
@@ -88,7 +93,7 @@ async def test_add_member_success(group_repository, mock_db):
     # Assert
     mock_db.execute.assert_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
     assert result == group
 
 @pytest.mark.asyncio
@@ -127,7 +132,7 @@ async def test_remove_member_success(group_repository, mock_db):
     # Assert
     mock_db.execute.assert_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
     assert result == group
 
 @pytest.mark.asyncio
@@ -146,4 +151,88 @@ async def test_remove_member_group_not_found(group_repository, mock_db):
     mock_db.execute.assert_called_once()
     mock_db.commit.assert_not_called()
     mock_db.refresh.assert_not_called()
-    assert result is None 
+    assert result is None
+
+@pytest.mark.asyncio
+async def test_add_member_invalidates_chat_membership(group_repository, mock_db):
+    # Arrange
+    group = Group(id=1, chat_id=10)
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = group
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    with patch('app.repositories.group_repository.membership_index') as mock_index, \
+            patch('app.repositories.group_repository.access_cache') as mock_access_cache:
+        await group_repository.add_member(1, 2)
+
+    # Assert
+    mock_index.invalidate.assert_called_once_with(10)
+    mock_access_cache.invalidate_chat.assert_called_once_with(10)
+
+@pytest.mark.asyncio
+async def test_remove_member_invalidates_chat_membership(group_repository, mock_db):
+    # Arrange
+    group = Group(id=1, chat_id=10)
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = group
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    with patch('app.repositories.group_repository.membership_index') as mock_index:
+        await group_repository.remove_member(1, 2)
+
+    # Assert
+    mock_index.invalidate.assert_called_once_with(10)
+
+@pytest.mark.asyncio
+async def test_add_members_single_insert_on_conflict(group_repository, mock_db):
+    # Arrange
+    group = Group(id=1, chat_id=10)
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [3]
+    mock_db.execute.return_value = mock_result
+    user_ids = list(range(20_000)) + [3]
+
+    # Act
+    added = await group_repository.add_members(group, user_ids)
+
+    # Assert
+    insert_call, event_call = mock_db.execute.call_args_list
+    compiled = insert_call.args[0].compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT DO NOTHING RETURNING group_members.user_id" in str(compiled)
+    # Все id уходят одним параметром-массивом
+    assert compiled.params["user_ids"] == list(range(20_000))
+    assert event_call.args[1] == [{"chat_id": 10, "user_id": 3, "action": MembershipAction.ADDED}]
+    mock_db.commit.assert_called_once()
+    assert added == [3]
+
+@pytest.mark.asyncio
+async def test_remove_members_single_delete(group_repository, mock_db):
+    # Arrange
+    group = Group(id=1, chat_id=10)
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [2, 5]
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    with patch('app.repositories.group_repository.access_cache') as mock_access_cache:
+        removed = await group_repository.remove_members(group, [5, 2, 7])
+
+    # Assert
+    compiled = mock_db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("DELETE FROM group_members")
+    assert compiled.params["user_ids"] == [2, 5, 7]
+    mock_db.commit.assert_called_once()
+    mock_access_cache.invalidate_chat.assert_called_once_with(10)
+    assert removed == [2, 5]
+
+@pytest.mark.asyncio
+async def test_add_members_empty(group_repository, mock_db):
+    # Act
+    added = await group_repository.add_members(Group(id=1, chat_id=10), [])
+
+    # Assert
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
+    assert added == []
@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repositories.membership_event_repository import MembershipEventRepository
+from app.models.chat import chat_participants
+from app.models.membership_event import MembershipAction
+
+@pytest.fixture
+def mock_db():
+    return AsyncMock(spec=AsyncSession)
+
+@pytest.fixture
+def membership_event_repository(mock_db):
+    return MembershipEventRepository(mock_db)
+
+@pytest.mark.asyncio
+async def test_record_writes_one_row_per_user_without_commit(membership_event_repository, mock_db):
+    # Act
+    await membership_event_repository.record(5, [1, 2], MembershipAction.REMOVED)
+
+    # Assert
+    mock_db.execute.assert_called_once()
+    assert mock_db.execute.call_args.args[1] == [
+        {"chat_id": 5, "user_id": 1, "action": MembershipAction.REMOVED},
+        {"chat_id": 5, "user_id": 2, "action": MembershipAction.REMOVED}
+    ]
+    mock_db.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_record_nothing(membership_event_repository, mock_db):
+    # Act
+    await membership_event_repository.record(5, [], MembershipAction.ADDED)
+
+    # Assert
+    mock_db.execute.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_since_includes_events_about_user(membership_event_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+    chat_ids = select(chat_participants.c.chat_id)
+
+    # Act
+    await membership_event_repository.get_since(3, chat_ids, after_id=10, limit=50)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "membership_events.id > " in sql
+    assert "membership_events.user_id = " in sql
+    assert "ORDER BY membership_events.id" in sql
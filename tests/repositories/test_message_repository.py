@@ -1,6 +1,8 @@
 import pytest
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql
 from app.repositories.message_repository import MessageRepository
 from app.models.message import Message
 
@@ -18,25 +20,67 @@ async def test_create_message(message_repository, mock_db):
     chat_id = 1
     sender_id = 1
     text = "Hello, world!"
-    expected_message = Message(
+    expected_message = MagicMock(
+        id=1,
         chat_id=chat_id,
         sender_id=sender_id,
-        text=text
+        text=text,
+        timestamp=datetime(2026, 10, 1)
     )
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = expected_message
+    mock_result = MagicMock()
+    mock_result.one.return_value = expected_message
+    mock_db.execute.return_value = mock_result
 
     # Act
     result = await message_repository.create(chat_id, sender_id, text)
 
     # Assert
-    mock_db.add.assert_called_once()
+    insert_call = mock_db.execute.call_args_list[0]
+    sql = str(insert_call.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO messages")
+    assert "RETURNING messages.id" in sql and "search_vector" not in sql
+    mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
     assert result.chat_id == expected_message.chat_id
     assert result.sender_id == expected_message.sender_id
     assert result.text == expected_message.text
 
+@pytest.mark.asyncio
+async def test_create_many_messages(message_repository, mock_db):
+    # Arrange
+    messages = [
+        {"chat_id": 1, "sender_id": 1, "text": "first"},
+        {"chat_id": 2, "sender_id": 3, "text": "second"}
+    ]
+    sent_at = datetime(2026, 10, 1)
+    expected_rows = [
+        MagicMock(id=1, chat_id=1, timestamp=sent_at),
+        MagicMock(id=2, chat_id=2, timestamp=sent_at),
+        MagicMock(id=3, chat_id=1, timestamp=sent_at)
+    ]
+    mock_result = MagicMock()
+    mock_result.all.return_value = expected_rows
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await message_repository.create_many(messages)
+
+    # Assert
+    insert_call, counter_call = mock_db.execute.call_args_list
+    assert insert_call.args[1] == messages
+    assert counter_call.args[1] == [
+        {"b_chat_id": 1, "b_count": 2, "b_last_id": 3, "b_last_at": sent_at},
+        {"b_chat_id": 2, "b_count": 1, "b_last_id": 2, "b_last_at": sent_at}
+    ]
+    sql = str(counter_call.args[0].compile(dialect=postgresql.dialect()))
+    # id и время последнего сообщения меняются по одному условию
+    assert sql.count("CASE WHEN (%(b_last_id)s > coalesce(chats.last_message_id") == 2
+    assert "greatest" not in sql
+    mock_db.commit.assert_called_once()
+    mock_db.refresh.assert_not_called()
+    assert result == expected_rows
+
 @pytest.mark.asyncio
 async def test_get_by_id_found(message_repository, mock_db):
     # Arrange
@@ -101,31 +145,190 @@ async def test_get_chat_messages_empty(message_repository, mock_db):
     mock_db.execute.assert_called_once()
     assert result == []
 
+@pytest.mark.asyncio
+async def test_get_chat_messages_page_before_id_returns_ascending(message_repository, mock_db):
+    # Arrange
+    sent_at = datetime.utcnow()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [
+        Message(id=9, timestamp=sent_at), Message(id=8, timestamp=sent_at)
+    ]
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await message_repository.get_chat_messages_page(1, limit=2, before_id=10)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0])
+    assert "messages.id < :id_1" in sql
+    assert "ORDER BY messages.id DESC" in sql
+    assert "OFFSET" not in sql
+    assert [message.id for message in result] == [8, 9]
+
+@pytest.mark.asyncio
+async def test_get_chat_messages_page_reads_current_partition_first(message_repository, mock_db):
+    # Arrange
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [
+        Message(id=9, timestamp=datetime(2026, 10, 15)), Message(id=8, timestamp=datetime(2026, 10, 14))
+    ]
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await message_repository.get_chat_messages_page(
+        1, limit=2, before_id=10, before_ts=datetime(2026, 10, 15)
+    )
+
+    # Assert
+    mock_db.execute.assert_called_once()
+    params = mock_db.execute.call_args.args[0].compile().params
+    assert datetime(2026, 9, 30, 23, 55) in params.values()
+    assert [message.id for message in result] == [8, 9]
+
+@pytest.mark.asyncio
+async def test_get_chat_messages_page_falls_back_to_older_partitions(message_repository, mock_db):
+    # Arrange
+    recent = MagicMock()
+    recent.scalars.return_value.all.return_value = [Message(id=9, timestamp=datetime(2026, 10, 2))]
+    older = MagicMock()
+    older.scalars.return_value.all.return_value = [Message(id=7, timestamp=datetime(2026, 9, 20))]
+    mock_db.execute.side_effect = [recent, older]
+
+    # Act
+    result = await message_repository.get_chat_messages_page(
+        1, limit=2, before_id=10, before_ts=datetime(2026, 10, 2)
+    )
+
+    # Assert
+    assert mock_db.execute.call_count == 2
+    assert "messages.timestamp < " in str(mock_db.execute.call_args.args[0])
+    assert [message.id for message in result] == [7, 9]
+
+@pytest.mark.asyncio
+async def test_get_chat_messages_page_after_id(message_repository, mock_db):
+    # Arrange
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [Message(id=11), Message(id=12)]
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await message_repository.get_chat_messages_page(1, limit=2, after_id=10)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0])
+    assert "messages.id > :id_1" in sql
+    assert "ORDER BY messages.id" in sql
+    assert [message.id for message in result] == [11, 12]
+
+@pytest.mark.asyncio
+async def test_stream_chat_messages_uses_server_side_cursor(message_repository, mock_db):
+    # Arrange
+    batches = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+
+    async def partitions():
+        for batch in batches:
+            yield batch
+
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.partitions = partitions
+    mock_db.stream = AsyncMock(return_value=mock_result)
+
+    # Act
+    result = [batch async for batch in message_repository.stream_chat_messages(1, batch_size=2)]
+
+    # Assert
+    query = mock_db.stream.call_args.args[0]
+    assert query.get_execution_options()["yield_per"] == 2
+    assert result == batches
+
+@pytest.mark.asyncio
+async def test_search_in_chat_uses_ranked_keyset_page(message_repository, mock_db):
+    # Arrange
+    rows = [{"id": 5, "chat_id": 1, "rank": 0.5, "snippet": "<mark>hello</mark>"}]
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = rows
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await message_repository.search("hello", 20, chat_id=1, after=(0.7, 10))
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "messages.search_vector @@ websearch_to_tsquery" in sql
+    assert "messages.chat_id = " in sql
+    assert "ORDER BY rank DESC, messages.id DESC" in sql
+    assert "ts_headline" in sql
+    assert result == rows
+
+@pytest.mark.asyncio
+async def test_search_across_chats_is_limited_to_user_chats(message_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+
+    # Act
+    await message_repository.search("hello", 20, user_id=3)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "chat_participants.user_id" in sql
+    assert "group_members.user_id" in sql
+
+@pytest.mark.asyncio
+async def test_get_user_messages_since_prunes_by_cursor_time(message_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+
+    # Act
+    await message_repository.get_user_messages_since(3, after_id=100, after_ts=datetime(2026, 10, 1), limit=50)
+
+    # Assert
+    query = mock_db.execute.call_args.args[0]
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "messages.id > " in sql
+    assert "messages.timestamp >= " in sql
+    assert "chat_participants.user_id" in sql
+    assert datetime(2026, 9, 30, 23, 55) in query.compile().params.values()
+
+@pytest.mark.asyncio
+async def test_get_late_user_messages_rereads_recent_window(message_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+
+    # Act
+    await message_repository.get_late_user_messages(3, up_to_id=100, written_since=datetime(2026, 10, 1), limit=50)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "messages.id <= " in sql
+    assert "messages.timestamp >= " in sql
+    assert "chat_participants.user_id" in sql
+
 @pytest.mark.asyncio
 async def test_mark_as_read_success(message_repository, mock_db):
     # Arrange
     message_id = 1
-    message = Message(id=message_id, is_read=False)
+    message = MagicMock(id=message_id, is_read=True)
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = message
+    mock_result.one_or_none.return_value = message
     mock_db.execute.return_value = mock_result
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = message
 
     # Act
     result = await message_repository.mark_as_read(message_id)
 
     # Assert
     assert result.is_read is True
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE messages SET is_read") and "RETURNING" in sql
+    mock_db.execute.assert_called_once()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_mark_as_read_message_not_found(message_repository, mock_db):
     # Arrange
     message_id = 999
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
+    mock_result.one_or_none.return_value = None
     mock_db.execute.return_value = mock_result
 
     # Act
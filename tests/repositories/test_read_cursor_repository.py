@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repositories.read_cursor_repository import ReadCursorRepository
+from app.models.read_cursor import ReadCursor
+
+@pytest.fixture
+def mock_db():
+    return AsyncMock(spec=AsyncSession)
+
+@pytest.fixture
+def read_cursor_repository(mock_db):
+    return ReadCursorRepository(mock_db)
+
+@pytest.mark.asyncio
+async def test_advance_many_is_single_monotonic_upsert(read_cursor_repository, mock_db):
+    # Arrange
+    cursors = [
+        {"user_id": 1, "chat_id": 1, "last_read_message_id": 10},
+        {"user_id": 2, "chat_id": 1, "last_read_message_id": 7}
+    ]
+
+    # Act
+    await read_cursor_repository.advance_many(cursors)
+
+    # Assert
+    mock_db.execute.assert_called_once()
+    mock_db.commit.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (user_id, chat_id) DO UPDATE" in sql
+    assert "WHERE read_cursors.last_read_message_id < excluded.last_read_message_id" in sql
+
+@pytest.mark.asyncio
+async def test_advance_many_empty(read_cursor_repository, mock_db):
+    # Act
+    await read_cursor_repository.advance_many([])
+
+    # Assert
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_cursor(read_cursor_repository, mock_db):
+    # Arrange
+    expected_cursor = ReadCursor(user_id=1, chat_id=1, last_read_message_id=5)
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = expected_cursor
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await read_cursor_repository.get(1, 1)
+
+    # Assert
+    mock_db.execute.assert_called_once()
+    assert result == expected_cursor
+
+@pytest.mark.asyncio
+async def test_advance_many_resets_read_count(read_cursor_repository, mock_db):
+    # Act
+    await read_cursor_repository.advance_many([
+        {"user_id": 1, "chat_id": 1, "last_read_message_id": 10}
+    ])
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "read_count = excluded.read_count" in sql
+    assert "chats.message_count - (SELECT count(messages.id)" in sql
+
+@pytest.mark.asyncio
+async def test_get_unread_counts_uses_counters(read_cursor_repository, mock_db):
+    # Arrange
+    expected_rows = [MagicMock(chat_id=1, unread_count=3)]
+    mock_result = MagicMock()
+    mock_result.all.return_value = expected_rows
+    mock_db.execute.return_value = mock_result
+
+    # Act
+    result = await read_cursor_repository.get_unread_counts(1)
+
+    # Assert
+    mock_db.execute.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "count(" not in sql.lower()
+    assert result == expected_rows
+
+@pytest.mark.asyncio
+async def test_reconcile_read_counts(read_cursor_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock(rowcount=2)
+
+    # Act
+    result = await read_cursor_repository.reconcile_read_counts()
+
+    # Assert
+    mock_db.commit.assert_called_once()
+    assert result == 2
+
+@pytest.mark.asyncio
+async def test_advance_many_bumps_change_sequence(read_cursor_repository, mock_db):
+    # Act
+    await read_cursor_repository.advance_many([
+        {"user_id": 1, "chat_id": 1, "last_read_message_id": 10}
+    ])
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "nextval('read_cursors_seq')" in sql
+    assert "seq = excluded.seq" in sql
+
+@pytest.mark.asyncio
+async def test_get_changes_since_orders_by_seq(read_cursor_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+
+    # Act
+    await read_cursor_repository.get_changes_since(1, after_seq=41, limit=100)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "read_cursors.seq > " in sql
+    assert "ORDER BY read_cursors.seq" in sql
+
+@pytest.mark.asyncio
+async def test_get_late_changes_rereads_recent_window(read_cursor_repository, mock_db):
+    # Arrange
+    mock_db.execute.return_value = MagicMock()
+
+    # Act
+    await read_cursor_repository.get_late_changes(1, up_to_seq=41, written_since=datetime(2026, 10, 1), limit=100)
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "read_cursors.seq <= " in sql
+    assert "read_cursors.updated_at >= " in sql
@@ -1,6 +1,7 @@
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql
 from app.repositories.user_repository import UserRepository
 from app.models.user import User
 
@@ -23,16 +24,19 @@ async def test_create_user(user_repository, mock_db):
         email=email,
         hashed_password=hashed_password
     )
-    mock_db.refresh = AsyncMock()
-    mock_db.refresh.return_value = expected_user
+    mock_result = MagicMock()
+    mock_result.one.return_value = expected_user
+    mock_db.execute.return_value = mock_result
 
     # Act
     result = await user_repository.create(username, email, hashed_password)
 
     # Assert
-    mock_db.add.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO users") and "RETURNING users.id" in sql
+    mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once()
+    mock_db.refresh.assert_not_called()
     assert result.username == expected_user.username
     assert result.email == expected_user.email
     assert result.hashed_password == expected_user.hashed_password
@@ -128,4 +132,15 @@ async def test_get_by_id_not_found(user_repository, mock_db):
 
     # Assert
     mock_db.execute.assert_called_once()
-    assert result is None 
\ No newline at end of file
+    assert result is None 
+@pytest.mark.asyncio
+async def test_update_password_hash_invalidates_cached_tokens(user_repository, mock_db):
+    # Act
+    with patch('app.repositories.user_repository.auth_cache') as mock_auth_cache:
+        await user_repository.update_password_hash(7, "new_hash")
+
+    # Assert
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE users SET hashed_password")
+    mock_db.commit.assert_called_once()
+    mock_auth_cache.invalidate_user.assert_called_once_with(7)
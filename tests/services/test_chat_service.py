@@ -1,4 +1,7 @@
+import gzip
+import json
 import pytest
+from datetime import datetime
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi import WebSocket, WebSocketDisconnect, HTTPException, status
 from app.services.chat_service import ChatService
@@ -6,6 +9,10 @@ from app.models.chat import ChatType
 from app.schemas.chat import ChatCreate
 from app.schemas.group import GroupCreate
 from app.models.user import User
+from app.core.websocket_manager import Connection, ConnectionManager, OverflowPolicy
+from app.core.event_log import EventLog
+from app.core.access_cache import AccessCache
+from app.core.pagination import Direction, decode_cursor, decode_inbox_cursor, decode_search_cursor
 
 @pytest.fixture
 def mock_db():
@@ -32,6 +39,24 @@ def mock_group_repository():
         mock.return_value = mock_instance
         yield mock_instance
 
+@pytest.fixture
+def mock_read_cursor_repository():
+    with patch('app.services.chat_service.ReadCursorRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def mock_history_cache():
+    with patch('app.services.chat_service.history_cache') as mock:
+        mock.get_latest.return_value = None
+        yield mock
+
+@pytest.fixture
+def access_cache():
+    with patch('app.services.chat_service.access_cache', AccessCache()) as cache:
+        yield cache
+
 @pytest.fixture
 def mock_websocket_manager():
     with patch('app.services.chat_service.manager', new_callable=AsyncMock) as mock:
@@ -39,10 +64,19 @@ def mock_websocket_manager():
         mock.disconnect = AsyncMock()
         mock.send_message = AsyncMock()
         mock.send_read_receipt = AsyncMock()
+        mock.to_frame = MagicMock(side_effect=lambda payload: payload.decode("utf-8"))
         yield mock
 
 @pytest.fixture
-def chat_service(mock_db, mock_chat_repository, mock_message_repository, mock_group_repository):
+def chat_service(
+    mock_db,
+    mock_chat_repository,
+    mock_message_repository,
+    mock_group_repository,
+    mock_read_cursor_repository,
+    mock_history_cache,
+    access_cache
+):
     return ChatService(mock_db)
 
 @pytest.mark.asyncio
@@ -62,6 +96,18 @@ async def test_create_chat(chat_service, mock_chat_repository):
     )
     assert result == expected_chat
 
+@pytest.mark.asyncio
+async def test_create_chat_adds_participants(chat_service, mock_chat_repository):
+    # Arrange
+    chat_data = ChatCreate(type=ChatType.PRIVATE, participant_ids=[2])
+    mock_chat_repository.create.return_value = MagicMock(id=10)
+
+    # Act
+    await chat_service.create_chat(chat_data, current_user_id=1)
+
+    # Assert
+    mock_chat_repository.add_participants.assert_called_once_with(10, [2, 1])
+
 @pytest.mark.asyncio
 async def test_create_group(chat_service, mock_chat_repository, mock_group_repository):
     # Arrange
@@ -83,7 +129,9 @@ async def test_create_group(chat_service, mock_chat_repository, mock_group_repos
         creator_id=current_user_id,
         name=group_data.name
     )
-    mock_group_repository.add_member.assert_called_once_with(expected_group.id, current_user_id)
+    mock_group_repository.add_members.assert_called_once_with(expected_group, [current_user_id])
+    # Чат, группа и участник фиксируются одним commit
+    chat_service.db.commit.assert_called_once()
     assert result == expected_group
 
 @pytest.mark.asyncio
@@ -122,6 +170,346 @@ async def test_get_chat_history_access_denied(chat_service, mock_chat_repository
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
     assert exc_info.value.detail == "Access denied"
 
+@pytest.mark.asyncio
+async def test_mark_read_up_to_writes_cursor_when_buffer_stopped(
+    chat_service, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Act
+    await chat_service.mark_read_up_to(user_id=1, chat_id=2, message_id=30)
+
+    # Assert
+    mock_read_cursor_repository.advance_many.assert_called_once_with([
+        {"user_id": 1, "chat_id": 2, "last_read_message_id": 30}
+    ])
+    event, chat_id = mock_websocket_manager.send_message.call_args.args
+    assert chat_id == 2
+    assert event["type"] == "read_up_to"
+
+@pytest.mark.asyncio
+async def test_mark_read_up_to_is_buffered_when_buffer_running(
+    chat_service, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    with patch('app.services.chat_service.read_cursor_buffer') as mock_buffer:
+        mock_buffer.running = True
+
+        # Act
+        await chat_service.mark_read_up_to(user_id=1, chat_id=2, message_id=30)
+
+    # Assert
+    mock_buffer.mark_read.assert_called_once_with(1, 2, 30)
+    mock_read_cursor_repository.advance_many.assert_not_called()
+    mock_websocket_manager.send_message.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_inbox_returns_cursor_for_full_page(chat_service, mock_chat_repository):
+    # Arrange
+    active_at = datetime(2026, 10, 1, 12, 0)
+    chats = [{"id": 3, "last_activity_at": active_at}, {"id": 2, "last_activity_at": active_at}]
+    mock_chat_repository.get_inbox.return_value = chats
+
+    # Act
+    result, next_cursor = await chat_service.get_inbox(User(id=1), limit=2)
+
+    # Assert
+    mock_chat_repository.get_inbox.assert_called_once_with(1, 2, before=None)
+    assert result == chats
+    assert decode_inbox_cursor(next_cursor) == (active_at, 2)
+
+@pytest.mark.asyncio
+async def test_get_inbox_last_page_has_no_cursor(chat_service, mock_chat_repository):
+    # Arrange
+    mock_chat_repository.get_inbox.return_value = [{"id": 3, "last_activity_at": datetime(2026, 10, 1)}]
+
+    # Act
+    _, next_cursor = await chat_service.get_inbox(User(id=1), limit=2)
+
+    # Assert
+    assert next_cursor is None
+
+@pytest.mark.asyncio
+async def test_get_unread_counts(chat_service, mock_read_cursor_repository):
+    # Arrange
+    current_user = User(id=1)
+    expected_counts = [MagicMock(chat_id=1, unread_count=2)]
+    mock_read_cursor_repository.get_unread_counts.return_value = expected_counts
+
+    # Act
+    result = await chat_service.get_unread_counts(current_user)
+
+    # Assert
+    mock_read_cursor_repository.get_unread_counts.assert_called_once_with(current_user.id)
+    assert result == expected_counts
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_backward(chat_service, mock_chat_repository, mock_message_repository):
+    # Arrange
+    current_user = User(id=1)
+    mock_chat_repository.has_access.return_value = True
+    sent_at = datetime(2026, 10, 1, 12, 0)
+    mock_message_repository.get_chat_messages_page.return_value = [
+        MagicMock(id=8, timestamp=sent_at), MagicMock(id=9, timestamp=sent_at)
+    ]
+
+    # Act
+    messages, next_cursor, prev_cursor = await chat_service.get_chat_history_page(
+        1, limit=2, current_user=current_user, message_id=10, direction=Direction.BACKWARD,
+        message_ts=sent_at
+    )
+
+    # Assert
+    mock_message_repository.get_chat_messages_page.assert_called_once_with(
+        chat_id=1, limit=2, before_id=10, before_ts=sent_at
+    )
+    assert decode_cursor(next_cursor) == {"id": 8, "d": "backward", "ts": "2026-10-01T12:00:00"}
+    assert decode_cursor(prev_cursor) == {"id": 9, "d": "forward", "ts": "2026-10-01T12:00:00"}
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_last_page_has_no_next_cursor(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    current_user = User(id=1)
+    mock_chat_repository.has_access.return_value = True
+    sent_at = datetime(2026, 10, 1, 12, 0)
+    mock_message_repository.get_chat_messages_page.return_value = [MagicMock(id=11, timestamp=sent_at)]
+
+    # Act
+    messages, next_cursor, prev_cursor = await chat_service.get_chat_history_page(
+        1, limit=2, current_user=current_user, message_id=10, direction=Direction.FORWARD
+    )
+
+    # Assert
+    mock_message_repository.get_chat_messages_page.assert_called_once_with(
+        chat_id=1, limit=2, after_id=10, after_ts=None
+    )
+    assert next_cursor is None
+    assert decode_cursor(prev_cursor) == {"id": 11, "d": "backward", "ts": "2026-10-01T12:00:00"}
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_access_denied(chat_service, mock_chat_repository):
+    # Arrange
+    mock_chat_repository.has_access.return_value = False
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.get_chat_history_page(1, limit=2, current_user=User(id=1))
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_served_from_cache(
+    chat_service, mock_chat_repository, mock_message_repository, mock_history_cache
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    cached = [MagicMock(id=5, timestamp=datetime(2026, 10, 1)), MagicMock(id=6, timestamp=datetime(2026, 10, 1))]
+    mock_history_cache.get_latest.return_value = cached
+
+    # Act
+    messages, _, _ = await chat_service.get_chat_history_page(1, limit=2, current_user=User(id=1))
+
+    # Assert
+    assert messages == cached
+    mock_message_repository.get_chat_messages_page.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_seeds_cache_with_latest_page(
+    chat_service, mock_chat_repository, mock_message_repository, mock_history_cache
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    page = [MagicMock(id=5, timestamp=datetime(2026, 10, 1))]
+    mock_message_repository.get_chat_messages_page.return_value = page
+
+    # Act
+    await chat_service.get_chat_history_page(1, limit=50, current_user=User(id=1))
+
+    # Assert
+    mock_history_cache.begin_seed.assert_called_once_with(1)
+    mock_history_cache.seed.assert_called_once_with(1, page, requested=50)
+
+@pytest.mark.asyncio
+async def test_get_chat_history_page_cancels_seed_on_error(
+    chat_service, mock_chat_repository, mock_message_repository, mock_history_cache
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    mock_message_repository.get_chat_messages_page.side_effect = RuntimeError("db down")
+
+    # Act
+    with pytest.raises(RuntimeError):
+        await chat_service.get_chat_history_page(1, limit=50, current_user=User(id=1))
+
+    # Assert
+    mock_history_cache.cancel_seed.assert_called_once_with(1)
+    mock_history_cache.seed.assert_not_called()
+
+def make_stream(*batches):
+    async def stream(chat_id, since=None, until=None):
+        for batch in batches:
+            yield batch
+    return stream
+
+@pytest.mark.asyncio
+async def test_export_chat_history_streams_ndjson(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    mock_message_repository.stream_chat_messages = make_stream(
+        [{"id": 1, "text": "a"}, {"id": 2, "text": "b"}],
+        [{"id": 3, "text": "c"}]
+    )
+
+    # Act
+    chunks = await chat_service.export_chat_history(1, User(id=1))
+    body = b"".join([chunk async for chunk in chunks])
+
+    # Assert
+    lines = body.decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+@pytest.mark.asyncio
+async def test_export_chat_history_gzip(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    mock_message_repository.stream_chat_messages = make_stream([{"id": 1, "text": "a"}])
+
+    # Act
+    chunks = await chat_service.export_chat_history(1, User(id=1), compress=True)
+    body = b"".join([chunk async for chunk in chunks])
+
+    # Assert
+    assert json.loads(gzip.decompress(body)) == {"id": 1, "text": "a"}
+
+@pytest.mark.asyncio
+async def test_export_chat_history_checks_access_before_streaming(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = False
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.export_chat_history(1, User(id=1))
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.asyncio
+async def test_search_chat_messages_returns_next_cursor_for_full_page(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    mock_chat_repository.has_access.return_value = True
+    results = [{"id": 9, "rank": 0.8}, {"id": 4, "rank": 0.25}]
+    mock_message_repository.search.return_value = results
+
+    # Act
+    page, next_cursor = await chat_service.search_chat_messages(1, "hello", 2, User(id=1))
+
+    # Assert
+    mock_message_repository.search.assert_called_once_with(
+        "hello", 2, chat_id=1, after=None, since=None, until=None
+    )
+    assert page == results
+    assert decode_search_cursor(next_cursor) == (0.25, 4)
+
+@pytest.mark.asyncio
+async def test_search_chat_messages_access_denied(chat_service, mock_chat_repository):
+    # Arrange
+    mock_chat_repository.has_access.return_value = False
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.search_chat_messages(1, "hello", 20, User(id=1))
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.asyncio
+async def test_search_messages_across_user_chats(chat_service, mock_message_repository):
+    # Arrange
+    mock_message_repository.search.return_value = [{"id": 9, "rank": 0.8}]
+
+    # Act
+    page, next_cursor = await chat_service.search_messages("hello", 20, User(id=3))
+
+    # Assert
+    mock_message_repository.search.assert_called_once_with(
+        "hello", 20, user_id=3, after=None, since=None, until=None
+    )
+    assert next_cursor is None
+
+@pytest.mark.asyncio
+async def test_replay_missed_messages_from_db(chat_service, mock_message_repository):
+    # Arrange
+    manager = ConnectionManager(event_log=EventLog())
+    websocket = AsyncMock()
+    connection = Connection(websocket, 1, max_queue_size=10, overflow_policy=OverflowPolicy.DROP_NEW)
+    connection.hold()
+    connection.enqueue('{"type":"message","id":8}')
+    mock_message_repository.get_user_messages_since.return_value = [
+        MagicMock(id=6, chat_id=2, sender_id=3, text="a", timestamp=datetime(2026, 10, 1), is_read=False)
+    ]
+    mock_message_repository.get_by_id.return_value = MagicMock(id=5, timestamp=datetime(2026, 10, 1))
+    mock_message_repository.get_late_user_messages.return_value = [
+        MagicMock(id=4, chat_id=2, sender_id=3, text="late", timestamp=datetime(2026, 10, 1), is_read=False)
+    ]
+
+    # Act
+    with patch('app.services.chat_service.manager', manager):
+        await chat_service.replay_missed_messages(connection, "otherworker:9:5")
+
+    # Assert
+    assert mock_message_repository.get_user_messages_since.call_args.args[:2] == (1, 5)
+    # Партиции старше последнего полученного сообщения не читаются
+    assert mock_message_repository.get_user_messages_since.call_args.kwargs["after_ts"] == datetime(2026, 10, 1)
+    # Окно перед последним полученным сообщением перечитывается ради опоздавших commit
+    assert mock_message_repository.get_late_user_messages.call_args.args[:2] == (1, 5)
+    frames = [json.loads(connection.queue.popleft()) for _ in range(4)]
+    assert [frame["type"] for frame in frames] == ["message", "message", "resumed", "message"]
+    assert [frames[0]["id"], frames[1]["id"]] == [4, 6]
+    assert frames[2]["source"] == "db" and frames[2]["complete"] is True
+    assert frames[3]["id"] == 8
+    assert not connection.holding
+
+@pytest.mark.asyncio
+async def test_replay_missed_messages_is_capped_by_queue_size(chat_service, mock_message_repository):
+    # Arrange
+    manager = ConnectionManager(event_log=EventLog())
+    connection = Connection(AsyncMock(), 1, max_queue_size=10, overflow_policy=OverflowPolicy.DROP_NEW)
+    connection.hold()
+    connection.enqueue('{"type":"message","id":900}')
+
+    async def messages_since(user_id, after_id, after_ts=None, limit=500):
+        # База знает больше пропущенных сообщений, чем помещается в очередь
+        return [
+            MagicMock(id=after_id + n, chat_id=2, sender_id=3, text="a",
+                      timestamp=datetime(2026, 10, 1), is_read=False)
+            for n in range(1, limit + 1)
+        ]
+
+    mock_message_repository.get_user_messages_since.side_effect = messages_since
+    mock_message_repository.get_by_id.return_value = MagicMock(id=5, timestamp=datetime(2026, 10, 1))
+    mock_message_repository.get_late_user_messages.return_value = [
+        MagicMock(id=4, chat_id=2, sender_id=3, text="late", timestamp=datetime(2026, 10, 1), is_read=False)
+    ]
+
+    # Act
+    with patch('app.services.chat_service.manager', manager):
+        await chat_service.replay_missed_messages(connection, "otherworker:9:5")
+
+    # Assert
+    assert connection.dropped == 0
+    frames = [json.loads(frame) for frame in connection.queue]
+    assert len(frames) == 10
+    # Догружено сколько поместилось; клиент должен добрать остальное через /sync
+    assert [frame["id"] for frame in frames[:8]] == [4, 6, 7, 8, 9, 10, 11, 12]
+    assert frames[8]["type"] == "resumed" and frames[8]["complete"] is False
+    assert frames[9]["id"] == 900
+
 def make_async_side_effect(sequence):
     counter = {"i": 0}
     async def side_effect(*args, **kwargs):
@@ -134,3 +522,156 @@ def make_async_side_effect(sequence):
             raise value
         return value
     return side_effect
+
+def make_connection(user_id: int) -> Connection:
+    websocket = AsyncMock(spec=WebSocket)
+    return Connection(websocket, user_id, max_queue_size=10, overflow_policy=OverflowPolicy.DROP_NEW)
+
+@pytest.mark.asyncio
+async def test_access_decisions_are_cached(chat_service, mock_chat_repository, access_cache):
+    # Arrange
+    mock_chat_repository.has_access.return_value = False
+
+    # Act
+    first = await chat_service.has_access(1, 2)
+    second = await chat_service.has_access(1, 2)
+
+    # Assert
+    # Отказ тоже кэшируется: в базу уходит один запрос
+    assert first is False and second is False
+    mock_chat_repository.has_access.assert_called_once_with(1, 2)
+    assert access_cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_websocket_message_to_inaccessible_chat_is_rejected(
+    chat_service, mock_chat_repository, mock_message_repository
+):
+    # Arrange
+    connection = make_connection(user_id=2)
+    mock_chat_repository.has_access.return_value = False
+
+    # Act
+    await chat_service.handle_websocket_event(
+        connection, {"type": "message", "chat_id": 1, "text": "hi"}
+    )
+
+    # Assert
+    mock_message_repository.create.assert_not_called()
+    # Ответ идет через очередь соединения, а не напрямую в сокет
+    connection.websocket.send_json.assert_not_called()
+    assert json.loads(connection.queue.popleft()) == {
+        "type": "error", "chat_id": 1, "detail": "Access denied"
+    }
+
+@pytest.mark.asyncio
+async def test_legacy_read_receipt_checks_access_to_message_chat(
+    chat_service, mock_chat_repository, mock_message_repository, mock_websocket_manager
+):
+    # Arrange
+    connection = make_connection(user_id=2)
+    mock_message_repository.get_by_id.return_value = MagicMock(id=5, chat_id=7)
+    mock_chat_repository.has_access.return_value = False
+
+    # Act
+    await chat_service.handle_websocket_event(connection, {"type": "read_receipt", "message_id": 5})
+
+    # Assert
+    mock_chat_repository.has_access.assert_called_once_with(7, 2)
+    mock_message_repository.mark_as_read.assert_not_called()
+    mock_websocket_manager.send_read_receipt.assert_not_called()
+    assert json.loads(connection.queue.popleft()) == {
+        "type": "error", "message_id": 5, "detail": "Access denied"
+    }
+
+@pytest.mark.asyncio
+async def test_add_group_members(chat_service, mock_chat_repository, mock_group_repository):
+    # Arrange
+    group = MagicMock(id=1, chat_id=10)
+    mock_group_repository.get_by_id.return_value = group
+    mock_group_repository.add_members.return_value = [2, 3]
+    mock_chat_repository.has_access.return_value = True
+
+    # Act
+    result = await chat_service.add_group_members(1, [2, 3], User(id=1))
+
+    # Assert
+    mock_chat_repository.has_access.assert_called_once_with(10, 1)
+    mock_group_repository.add_members.assert_called_once_with(group, [2, 3])
+    assert result == [2, 3]
+
+@pytest.mark.asyncio
+async def test_remove_group_members_requires_membership(
+    chat_service, mock_chat_repository, mock_group_repository
+):
+    # Arrange
+    mock_group_repository.get_by_id.return_value = MagicMock(id=1, chat_id=10)
+    mock_chat_repository.has_access.return_value = False
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.remove_group_members(1, [2], User(id=5))
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+    mock_group_repository.remove_members.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_add_group_members_group_not_found(chat_service, mock_group_repository):
+    # Arrange
+    mock_group_repository.get_by_id.return_value = None
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.add_group_members(999, [2], User(id=1))
+
+    assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.asyncio
+async def test_websocket_message_and_sender_cursor_share_one_commit(
+    chat_service, mock_chat_repository, mock_message_repository,
+    mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    connection = make_connection(user_id=2)
+    mock_chat_repository.has_access.return_value = True
+    mock_message_repository.create.return_value = MagicMock(
+        id=5, chat_id=1, sender_id=2, text="hi", timestamp=datetime(2026, 10, 1), is_read=False
+    )
+
+    # Act
+    await chat_service.handle_websocket_event(
+        connection, {"type": "message", "chat_id": 1, "text": "hi"}
+    )
+
+    # Assert
+    mock_read_cursor_repository.advance_many.assert_called_once()
+    chat_service.db.commit.assert_called_once()
+    # Рассылка после commit: сначала сообщение, затем курсор отправителя
+    sent = [call.args[0]["type"] for call in mock_websocket_manager.send_message.call_args_list]
+    assert sent == ["message", "read_up_to"]
+
+@pytest.mark.asyncio
+async def test_websocket_message_through_writer_commits_only_sender_cursor(
+    chat_service, mock_chat_repository, mock_message_repository,
+    mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    connection = make_connection(user_id=2)
+    mock_chat_repository.has_access.return_value = True
+    message = MagicMock(
+        id=5, chat_id=1, sender_id=2, text="hi", timestamp=datetime(2026, 10, 1), is_read=False
+    )
+    writer = MagicMock(running=True)
+    writer.submit = AsyncMock(return_value=message)
+
+    # Act
+    with patch('app.services.chat_service.message_writer', writer):
+        await chat_service.handle_websocket_event(
+            connection, {"type": "message", "chat_id": 1, "text": "hi"}
+        )
+
+    # Assert
+    # Сообщение записал message_writer, сессия сервиса фиксирует только курсор
+    writer.submit.assert_awaited_once_with(chat_id=1, sender_id=2, text="hi")
+    mock_message_repository.create.assert_not_called()
+    mock_read_cursor_repository.advance_many.assert_called_once()
+    chat_service.db.commit.assert_called_once()
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.message_writer import MessageWriter
+
+@pytest.fixture
+def mock_message_repository():
+    with patch('app.services.message_writer.MessageRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        mock_instance.create_many.side_effect = lambda messages: [
+            MagicMock(id=i + 1, **values) for i, values in enumerate(messages)
+        ]
+        yield mock_instance
+
+@pytest.fixture
+def session_factory():
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = AsyncMock()
+    return factory
+
+@pytest.mark.asyncio
+async def test_messages_from_many_senders_share_one_insert(session_factory, mock_message_repository):
+    # Arrange
+    writer = MessageWriter(session_factory, flush_interval=0.01, batch_size=100)
+    writer.start()
+
+    # Act
+    rows = await asyncio.gather(*(
+        writer.submit(chat_id=1, sender_id=sender_id, text=f"hi {sender_id}")
+        for sender_id in range(5)
+    ))
+    await writer.stop()
+
+    # Assert
+    mock_message_repository.create_many.assert_called_once()
+    assert [row.id for row in rows] == [1, 2, 3, 4, 5]
+    assert [row.sender_id for row in rows] == [0, 1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting(session_factory, mock_message_repository):
+    # Arrange
+    writer = MessageWriter(session_factory, flush_interval=10, batch_size=2)
+    writer.start()
+
+    # Act
+    rows = await asyncio.wait_for(asyncio.gather(
+        writer.submit(chat_id=1, sender_id=1, text="a"),
+        writer.submit(chat_id=1, sender_id=2, text="b")
+    ), timeout=1)
+    await writer.stop()
+
+    # Assert
+    assert len(rows) == 2
+
+@pytest.mark.asyncio
+async def test_stop_flushes_buffered_messages(session_factory, mock_message_repository):
+    # Arrange
+    writer = MessageWriter(session_factory, flush_interval=10, batch_size=100)
+    writer.start()
+    pending = asyncio.create_task(writer.submit(chat_id=1, sender_id=1, text="a"))
+    await asyncio.sleep(0)
+
+    # Act
+    await writer.stop()
+
+    # Assert
+    assert (await pending).id == 1
+    assert not writer.running
+
+@pytest.mark.asyncio
+async def test_write_error_is_raised_to_senders(session_factory, mock_message_repository):
+    # Arrange
+    mock_message_repository.create_many.side_effect = RuntimeError("db is down")
+    writer = MessageWriter(session_factory, flush_interval=0.01, batch_size=100)
+    writer.start()
+
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        await writer.submit(chat_id=1, sender_id=1, text="a")
+    await writer.stop()
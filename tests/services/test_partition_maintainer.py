@@ -0,0 +1,37 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.partition_maintainer import PartitionMaintainer
+
+@pytest.fixture
+def engine():
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = AsyncMock()
+    return engine
+
+@pytest.mark.asyncio
+async def test_maintain_creates_future_partitions_without_retention(engine):
+    # Arrange
+    maintainer = PartitionMaintainer(engine, interval=0, months_ahead=3, retention_months=0)
+    with patch("app.services.partition_maintainer.create_partitions", AsyncMock(return_value=["messages_p2027_01"])) as create, \
+            patch("app.services.partition_maintainer.detach_partitions", AsyncMock()) as detach:
+        # Act
+        result = await maintainer.maintain(now=datetime(2026, 10, 18))
+
+    # Assert
+    assert create.call_args.args[1:] == (datetime(2026, 10, 18), 3)
+    detach.assert_not_called()
+    assert result == {"created": ["messages_p2027_01"], "detached": []}
+
+@pytest.mark.asyncio
+async def test_maintain_detaches_partitions_past_retention(engine):
+    # Arrange
+    maintainer = PartitionMaintainer(engine, interval=0, months_ahead=3, retention_months=12)
+    with patch("app.services.partition_maintainer.create_partitions", AsyncMock(return_value=[])), \
+            patch("app.services.partition_maintainer.detach_partitions", AsyncMock(return_value=["messages_p2025_09"])) as detach:
+        # Act
+        result = await maintainer.maintain(now=datetime(2026, 10, 18))
+
+    # Assert
+    detach.assert_called_once_with(engine, datetime(2025, 10, 1))
+    assert result["detached"] == ["messages_p2025_09"]
@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.read_cursor_buffer import ReadCursorBuffer
+
+@pytest.fixture
+def mock_read_cursor_repository():
+    with patch('app.services.read_cursor_buffer.ReadCursorRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def mock_websocket_manager():
+    with patch('app.services.read_cursor_buffer.manager') as mock:
+        mock.send_message = AsyncMock()
+        yield mock
+
+@pytest.fixture
+def read_cursor_buffer():
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = AsyncMock()
+    return ReadCursorBuffer(session_factory, flush_interval=60)
+
+@pytest.mark.asyncio
+async def test_scrolling_is_coalesced_into_one_write(
+    read_cursor_buffer, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    for message_id in range(1, 501):
+        read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=message_id)
+
+    # Act
+    await read_cursor_buffer.flush()
+
+    # Assert
+    mock_read_cursor_repository.advance_many.assert_called_once_with([
+        {"user_id": 1, "chat_id": 1, "last_read_message_id": 500}
+    ])
+    mock_websocket_manager.send_message.assert_called_once()
+    event, chat_id = mock_websocket_manager.send_message.call_args.args
+    assert chat_id == 1
+    assert event["type"] == "read_up_to"
+    assert event["message_id"] == 500
+
+@pytest.mark.asyncio
+async def test_older_mark_does_not_move_cursor_back(
+    read_cursor_buffer, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=10)
+    read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=3)
+    read_cursor_buffer.mark_read(user_id=2, chat_id=1, message_id=4)
+
+    # Act
+    await read_cursor_buffer.flush()
+
+    # Assert
+    cursors = mock_read_cursor_repository.advance_many.call_args.args[0]
+    assert sorted(cursor["last_read_message_id"] for cursor in cursors) == [4, 10]
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_marks_for_retry(
+    read_cursor_buffer, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    mock_read_cursor_repository.advance_many.side_effect = [RuntimeError("db is down"), None]
+    read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=10)
+
+    # Act
+    with pytest.raises(RuntimeError):
+        await read_cursor_buffer.flush()
+    await read_cursor_buffer.flush()
+
+    # Assert
+    assert mock_read_cursor_repository.advance_many.call_count == 2
+    mock_websocket_manager.send_message.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_flush_without_marks_does_nothing(read_cursor_buffer, mock_read_cursor_repository):
+    # Act
+    await read_cursor_buffer.flush()
+
+    # Assert
+    mock_read_cursor_repository.advance_many.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_stop_during_flush_keeps_marks(
+    read_cursor_buffer, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    read_cursor_buffer.flush_interval = 0
+    written = []
+    unblock = asyncio.Event()
+
+    async def advance_many(cursors):
+        await unblock.wait()
+        written.extend(cursors)
+
+    mock_read_cursor_repository.advance_many.side_effect = advance_many
+    read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=42)
+    read_cursor_buffer.start()
+    while not mock_read_cursor_repository.advance_many.called:
+        await asyncio.sleep(0)
+
+    # Act
+    # Остановка приходит, пока периодический сброс ждет базу
+    stopping = asyncio.create_task(read_cursor_buffer.stop())
+    await asyncio.sleep(0)
+    unblock.set()
+    await stopping
+
+    # Assert
+    assert written == [{"user_id": 1, "chat_id": 1, "last_read_message_id": 42}]
+    assert not read_cursor_buffer.running
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_returns_marks_to_buffer(
+    read_cursor_buffer, mock_read_cursor_repository, mock_websocket_manager
+):
+    # Arrange
+    blocked = asyncio.Event()
+
+    async def advance_many(cursors):
+        await blocked.wait()
+
+    mock_read_cursor_repository.advance_many.side_effect = advance_many
+    read_cursor_buffer.mark_read(user_id=1, chat_id=1, message_id=42)
+    flushing = asyncio.create_task(read_cursor_buffer.flush())
+    await asyncio.sleep(0)
+
+    # Act
+    flushing.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flushing
+
+    # Assert
+    assert read_cursor_buffer._pending == {(1, 1): 42}
@@ -0,0 +1,112 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.sync_service import SyncService
+from app.models.user import User
+from app.core.pagination import decode_sync_cursor
+
+@pytest.fixture
+def mock_message_repository():
+    with patch('app.services.sync_service.MessageRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def mock_read_cursor_repository():
+    with patch('app.services.sync_service.ReadCursorRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def mock_membership_event_repository():
+    with patch('app.services.sync_service.MembershipEventRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def sync_service(mock_message_repository, mock_read_cursor_repository, mock_membership_event_repository):
+    return SyncService(AsyncMock())
+
+@pytest.mark.asyncio
+async def test_first_sync_returns_current_position_only(
+    sync_service, mock_message_repository, mock_read_cursor_repository, mock_membership_event_repository
+):
+    # Arrange
+    sent_at = datetime(2026, 10, 1)
+    mock_message_repository.get_latest_position.return_value = (100, sent_at)
+    mock_read_cursor_repository.get_last_seq.return_value = 7
+    mock_membership_event_repository.get_last_id.return_value = 3
+
+    # Act
+    page = await sync_service.sync(User(id=1), None, limit=10)
+
+    # Assert
+    mock_message_repository.get_user_messages_since.assert_not_called()
+    assert page["messages"] == []
+    assert page["has_more"] is False
+    cursor = decode_sync_cursor(page["cursor"])
+    assert cursor.pop("at") is not None
+    assert cursor == {"m": 100, "ts": sent_at, "r": 7, "e": 3}
+
+@pytest.mark.asyncio
+async def test_sync_advances_each_feed_independently(
+    sync_service, mock_message_repository, mock_read_cursor_repository, mock_membership_event_repository
+):
+    # Arrange
+    sent_at = datetime(2026, 10, 2)
+    position = {"m": 100, "ts": datetime(2026, 10, 1), "r": 7, "e": 3, "at": None}
+    messages = [MagicMock(id=101, timestamp=sent_at), MagicMock(id=102, timestamp=sent_at)]
+    mock_message_repository.get_user_messages_since.return_value = messages
+    mock_read_cursor_repository.get_changes_since.return_value = [{"seq": 9}]
+    mock_membership_event_repository.get_since.return_value = []
+
+    # Act
+    page = await sync_service.sync(User(id=1), position, limit=2)
+
+    # Assert
+    mock_message_repository.get_user_messages_since.assert_called_once_with(
+        1, 100, datetime(2026, 10, 1), 2
+    )
+    assert page["messages"] == messages
+    # Лента сообщений заполнена до limit: клиент должен запросить продолжение
+    assert page["has_more"] is True
+    cursor = decode_sync_cursor(page["cursor"])
+    assert cursor.pop("at") is not None
+    assert cursor == {"m": 102, "ts": sent_at, "r": 9, "e": 3}
+    # Курсор без времени выдачи: окно опоздавших записей не перечитывается
+    mock_message_repository.get_late_user_messages.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_sync_rereads_late_commits_before_previous_read(
+    sync_service, mock_message_repository, mock_read_cursor_repository, mock_membership_event_repository
+):
+    # Arrange
+    read_at = datetime(2026, 10, 2, 12, 0, 30)
+    position = {"m": 100, "ts": datetime(2026, 10, 2, 12), "r": 7, "e": 3, "at": read_at}
+    late = MagicMock(id=99, timestamp=datetime(2026, 10, 2, 12, 0, 10))
+    new = MagicMock(id=101, timestamp=datetime(2026, 10, 2, 12, 1))
+    mock_message_repository.get_user_messages_since.return_value = [new]
+    mock_message_repository.get_late_user_messages.return_value = [late]
+    mock_read_cursor_repository.get_changes_since.return_value = []
+    mock_read_cursor_repository.get_late_changes.return_value = [{"seq": 6}]
+    mock_membership_event_repository.get_since.return_value = []
+    mock_membership_event_repository.get_late.return_value = []
+
+    # Act
+    with patch('app.services.sync_service.settings.LATE_COMMIT_WINDOW_SECONDS', 30):
+        page = await sync_service.sync(User(id=1), position, limit=2)
+
+    # Assert
+    mock_message_repository.get_late_user_messages.assert_called_once_with(
+        1, 100, datetime(2026, 10, 2, 12), 2
+    )
+    assert page["messages"] == [late, new]
+    assert page["read_cursors"] == [{"seq": 6}]
+    # Перечитанные записи не сдвигают позицию и не означают продолжения
+    assert page["has_more"] is False
+    cursor = decode_sync_cursor(page["cursor"])
+    assert (cursor["m"], cursor["r"], cursor["e"]) == (101, 7, 3)
+    assert cursor["at"] > read_at
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.unread_reconciler import UnreadCountReconciler
+
+@pytest.fixture
+def mock_chat_repository():
+    with patch('app.services.unread_reconciler.ChatRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def mock_read_cursor_repository():
+    with patch('app.services.unread_reconciler.ReadCursorRepository') as mock:
+        mock_instance = AsyncMock()
+        mock.return_value = mock_instance
+        yield mock_instance
+
+@pytest.fixture
+def reconciler():
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = AsyncMock()
+    return UnreadCountReconciler(session_factory, interval=0)
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_both_counters(
+    reconciler, mock_chat_repository, mock_read_cursor_repository
+):
+    # Arrange
+    mock_chat_repository.reconcile_message_counts.return_value = 2
+    mock_read_cursor_repository.reconcile_read_counts.return_value = 5
+
+    # Act
+    result = await reconciler.reconcile()
+
+    # Assert
+    assert result == {"chats": 2, "read_cursors": 5}
+
+@pytest.mark.asyncio
+async def test_zero_interval_disables_background_job(reconciler):
+    # Act
+    reconciler.start()
+
+    # Assert
+    assert reconciler._task is None
+    await reconciler.stop()
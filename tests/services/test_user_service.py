@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi import HTTPException, status
 from app.services.user_service import UserService
 from app.schemas.user import UserCreate
+from app.core.security import PasswordHasherBusy
 
 @pytest.fixture
 def mock_db():
@@ -16,7 +17,14 @@ def mock_user_repository():
         yield mock_instance
 
 @pytest.fixture
-def user_service(mock_db, mock_user_repository):
+def mock_password_hasher():
+    with patch('app.services.user_service.password_hasher') as mock:
+        mock.hash = AsyncMock(return_value="hashed")
+        mock.verify_and_update = AsyncMock(return_value=(True, None))
+        yield mock
+
+@pytest.fixture
+def user_service(mock_db, mock_user_repository, mock_password_hasher):
     return UserService(mock_db)
 
 @pytest.mark.asyncio
@@ -85,7 +93,7 @@ async def test_create_user_email_exists(user_service, mock_user_repository):
     mock_user_repository.create.assert_not_called()
 
 @pytest.mark.asyncio
-async def test_authenticate_user_success(user_service, mock_user_repository):
+async def test_authenticate_user_success(user_service, mock_user_repository, mock_password_hasher):
     # Arrange
     username = "testuser"
     password = "password123"
@@ -96,16 +104,16 @@ async def test_authenticate_user_success(user_service, mock_user_repository):
     )
     mock_user_repository.get_by_username.return_value = user
 
-    with patch('app.services.user_service.verify_password', return_value=True) as mock_verify:
-        with patch('app.services.user_service.create_access_token', return_value="test_token") as mock_create_token:
-            # Act
-            result = await user_service.authenticate_user(username, password)
+    with patch('app.services.user_service.create_access_token', return_value="test_token") as mock_create_token:
+        # Act
+        result = await user_service.authenticate_user(username, password)
 
-            # Assert
-            mock_user_repository.get_by_username.assert_called_once_with(username)
-            mock_verify.assert_called_once_with(password, hashed_password)
-            mock_create_token.assert_called_once_with(data={"sub": username})
-            assert result == {"access_token": "test_token", "token_type": "bearer"}
+        # Assert
+        mock_user_repository.get_by_username.assert_called_once_with(username)
+        mock_password_hasher.verify_and_update.assert_called_once_with(password, hashed_password)
+        mock_user_repository.update_password_hash.assert_not_called()
+        mock_create_token.assert_called_once_with(data={"sub": username})
+        assert result == {"access_token": "test_token", "token_type": "bearer"}
 
 @pytest.mark.asyncio
 async def test_authenticate_user_invalid_credentials(user_service, mock_user_repository):
@@ -124,7 +132,7 @@ async def test_authenticate_user_invalid_credentials(user_service, mock_user_rep
     mock_user_repository.get_by_username.assert_called_once_with(username)
 
 @pytest.mark.asyncio
-async def test_authenticate_user_wrong_password(user_service, mock_user_repository):
+async def test_authenticate_user_wrong_password(user_service, mock_user_repository, mock_password_hasher):
     # Arrange
     username = "testuser"
     password = "wrongpassword"
@@ -134,13 +142,38 @@ async def test_authenticate_user_wrong_password(user_service, mock_user_reposito
         hashed_password=hashed_password
     )
     mock_user_repository.get_by_username.return_value = user
+    mock_password_hasher.verify_and_update.return_value = (False, None)
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await user_service.authenticate_user(username, password)
+
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert exc_info.value.detail == "Incorrect username or password"
+    assert exc_info.value.headers == {"WWW-Authenticate": "Bearer"}
+    mock_user_repository.get_by_username.assert_called_once_with(username)
+
+@pytest.mark.asyncio
+async def test_authenticate_user_upgrades_outdated_hash(user_service, mock_user_repository, mock_password_hasher):
+    # Arrange
+    mock_user_repository.get_by_username.return_value = MagicMock(id=7, username="testuser")
+    mock_password_hasher.verify_and_update.return_value = (True, "new_hash")
+
+    # Act
+    await user_service.authenticate_user("testuser", "password123")
+
+    # Assert
+    mock_user_repository.update_password_hash.assert_called_once_with(7, "new_hash")
+
+@pytest.mark.asyncio
+async def test_authenticate_user_when_hasher_is_busy(user_service, mock_user_repository, mock_password_hasher):
+    # Arrange
+    mock_user_repository.get_by_username.return_value = MagicMock()
+    mock_password_hasher.verify_and_update.side_effect = PasswordHasherBusy()
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await user_service.authenticate_user("testuser", "password123")
 
-    with patch('app.services.user_service.verify_password', return_value=False):
-        # Act & Assert
-        with pytest.raises(HTTPException) as exc_info:
-            await user_service.authenticate_user(username, password)
-        
-        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
-        assert exc_info.value.detail == "Incorrect username or password"
-        assert exc_info.value.headers == {"WWW-Authenticate": "Bearer"}
-        mock_user_repository.get_by_username.assert_called_once_with(username) 
\ No newline at end of file
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert exc_info.value.headers == {"Retry-After": "1"}